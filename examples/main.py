@@ -2,6 +2,8 @@ import discord
 from discord.ext import commands
 from model import Counter
 
+from surreal import WriteBehind
+
 try:
     from dotenv import load_dotenv
 
@@ -22,6 +24,15 @@ class Bot(commands.Bot):
             command_prefix="!",
             intents=intents,
         )
+        self.writes = WriteBehind(interval=1.0)
+
+    async def setup_hook(self):
+        self.writes.start()
+
+    async def close(self):
+        # 終了前にためた更新を書き込む
+        await self.writes.close()
+        await super().close()
 
     async def on_ready(self):
         print("起動")
@@ -37,7 +48,7 @@ async def db(ctx: commands.Context): ...
 @db.command()
 async def create(ctx: commands.Context):
     db = Counter()
-    await db.create_table(True)
+    await db.create_table()
 
     await ctx.send("テーブルを作成しました")
 
@@ -63,11 +74,11 @@ async def _update(ctx: commands.Context, message_id: str):
 
     message = await ctx.fetch_message(int(message_id))
 
-    db.count.set_value(db.count.value + 1)
-
-    await message.edit(content=str(db.count.value))
+    # 手元の値は変えずに差分だけをためる。まとめて書き込む時に count = count + n になる
+    bot.writes.increment(db, db.count)
 
-    await db.update()
+    # 読み込んだ値には、まだ書き込んでいない加算が反映されていない
+    await message.edit(content=str(db.count.value + bot.writes.pending(db, db.count)))
 
 
 bot.run(TOKEN)
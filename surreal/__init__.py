@@ -1 +1,58 @@
-__version__ = "0.0.1"
\ No newline at end of file
+__version__ = "0.0.1"
+
+from .aggregate import Agg, GroupBy
+from .analyzer import Analyzer
+from .auth import Token, TokenAuth
+from .cache import QueryCache, read_tables, written_tables
+from .changefeed import Change, ChangeFeed
+from .column import Column
+from .columnar import ColumnarScan, ColumnBatch
+from .compression import Compression, CompressionStats
+from .index import Index
+from .query import Query
+from .router import Endpoint, Router
+from .select import Select
+from .session import Session
+from .shard import Shard, ShardRouter
+from .slowlog import SlowQuery, SlowQueryLog, fingerprint, parse_duration
+from .table import BaseTable
+from .transfer import dump, load
+from .utils import MISSING, UNLOADED, is_read_query
+from .writebehind import WriteBehind
+
+__all__ = (
+    "MISSING",
+    "UNLOADED",
+    "Agg",
+    "Analyzer",
+    "BaseTable",
+    "Change",
+    "ChangeFeed",
+    "Column",
+    "ColumnBatch",
+    "ColumnarScan",
+    "Compression",
+    "CompressionStats",
+    "Endpoint",
+    "GroupBy",
+    "Index",
+    "Query",
+    "QueryCache",
+    "Router",
+    "Select",
+    "Session",
+    "Shard",
+    "ShardRouter",
+    "SlowQuery",
+    "SlowQueryLog",
+    "Token",
+    "TokenAuth",
+    "WriteBehind",
+    "dump",
+    "fingerprint",
+    "is_read_query",
+    "load",
+    "parse_duration",
+    "read_tables",
+    "written_tables",
+)
@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib
+import logging
+from typing import Any
+
+from .table import BaseTable
+from .transfer import dump, load
+
+
+def import_model(path: str) -> type[BaseTable]:
+    """ "module:Class" の形式でモデルをimportする。"""
+
+    module_name, _, class_name = path.partition(":")
+    if not class_name:
+        raise SystemExit(f"モデルは module:Class の形式で指定してください: {path}")
+
+    model = getattr(importlib.import_module(module_name), class_name)
+    if not (isinstance(model, type) and issubclass(model, BaseTable)):
+        raise SystemExit(f"{path}はBaseTableのサブクラスではありません")
+    return model
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(prog="surreal")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    def common(command: argparse.ArgumentParser) -> None:
+        command.add_argument("model", help="module:Class")
+        command.add_argument("path", help="NDJSONファイル。.gzならgzip")
+        command.add_argument("--ns")
+        command.add_argument("--db")
+        command.add_argument("--host")
+        command.add_argument("-v", "--verbose", action="store_true")
+
+    dump_parser = commands.add_parser("dump", help="テーブルをNDJSONに書き出す")
+    common(dump_parser)
+    dump_parser.add_argument("--batch-size", type=int, default=1000)
+    dump_parser.add_argument("--where")
+
+    load_parser = commands.add_parser("load", help="NDJSONをテーブルに読み込む")
+    common(load_parser)
+    load_parser.add_argument("--chunk-size", type=int, default=500)
+    load_parser.add_argument("--concurrency", type=int, default=4)
+    load_parser.add_argument("--checkpoint")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO)
+
+    model = import_model(args.model)
+    options: dict[str, Any] = {
+        key: value
+        for key in ("ns", "db", "host")
+        if (value := getattr(args, key)) is not None
+    }
+
+    if args.command == "dump":
+        count = asyncio.run(
+            dump(
+                model,
+                args.path,
+                batch_size=args.batch_size,
+                where=args.where,
+                **options,
+            )
+        )
+    else:
+        count = asyncio.run(
+            load(
+                model,
+                args.path,
+                chunk_size=args.chunk_size,
+                concurrency=args.concurrency,
+                checkpoint=args.checkpoint,
+                **options,
+            )
+        )
+
+    print(f"{args.command}: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,22 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import TYPE_CHECKING, Self, TypedDict
 from typing import Any as typingAny
+from typing import Self, TypedDict
 
 from .utils import MISSING
 
-if TYPE_CHECKING:
-    pass
-
 __all__ = (
-    "DBType",
     "Array",
     "Bool",
+    "Bytes",
+    "DBType",
     "Datetime",
     "Float",
     "Int",
     "Number",
-    "String",
     "Record",
-    "Bytes"
+    "String",
 )
 
 
@@ -28,6 +25,7 @@ class ManyResultResponseType(TypedDict):
 
     result: list[dict]
     time: str
+    status: str
     code: int | None
     description: str | None
 
@@ -42,6 +40,13 @@ class OneResultResponseType(TypedDict):
 
 
 class DBType:
+    """SurrealDBの型
+
+    インスタンスは変更できない。型の文字列は作成時に1回だけ組み立てる。
+    """
+
+    __slots__ = ("_is_none", "_key", "_name", "_or", "_type_string", "sub_type")
+
     def __init__(
         self,
         *,
@@ -49,61 +54,130 @@ class DBType:
         is_none: bool | None = None,
         _or: list[Self] = [],
     ):
-        self.sub_type = sub_type
-        self._is_none = is_none
-        self._or = None
-        if self._or:
-            self._or = " | ".join(str(__or) for __or in _or)
+        object.__setattr__(self, "sub_type", sub_type)
+        object.__setattr__(self, "_is_none", is_none)
+        object.__setattr__(self, "_or", tuple(_or))
 
-    def __repr__(self) -> str:
-        value = self.__class__.__qualname__
+        name = self._base_name()
+        type_string = name.lower()
+        if sub_type is not MISSING and isinstance(sub_type, (DBType, type, str)):
+            type_string += f"<{_sub_type_string(sub_type)}>"
 
         if self._or:
-            value += f"{value} | {self._or}"
+            name += " | " + " | ".join(str(__or) for __or in self._or)
+            type_string += " | " + " | ".join(__or.type_string for __or in self._or)
+
+        if is_none:
+            name = f"option<{name}>"
+            type_string = f"option<{type_string}>"
+
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_type_string", type_string)
+        object.__setattr__(
+            self,
+            "_key",
+            (self.__class__, sub_type, bool(is_none), self._or, *self._extra_key()),
+        )
 
-        if self._is_none:
-            return f"option<{value}>"
+    def _base_name(self) -> str:
+        return self.__class__.__qualname__
 
-        else:
-            return value
+    def _extra_key(self) -> tuple:
+        return ()
+
+    @property
+    def type_string(self) -> str:
+        """DEFINE FIELDのTYPEに使う型の文字列"""
+        return self._type_string
+
+    def __setattr__(self, name: str, value: typingAny) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__}は変更できません")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError(f"{self.__class__.__qualname__}は変更できません")
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DBType):
+            return NotImplemented
+        return self._key == other._key
+
+    def __hash__(self) -> int:
+        return hash(self._key)
+
+    def __copy__(self) -> Self:
+        return self
+
+    def __deepcopy__(self, memo: dict) -> Self:
+        return self
+
+    def __reduce__(self):
+        return (_rebuild, (self.__class__, self._state()))
+
+    def _state(self) -> dict[str, typingAny]:
+        return {"is_none": self._is_none, "_or": list(self._or)}
+
+    def __repr__(self) -> str:
+        return self._name
 
     def __str__(self) -> str:
-        value = self.__class__.__qualname__
+        return self._name
+
+
+def _sub_type_string(sub_type: typingAny) -> str:
+    if isinstance(sub_type, DBType):
+        return sub_type.type_string
+    if isinstance(sub_type, type):
+        return getattr(sub_type, "__table__", sub_type.__qualname__.lower())
+    return str(sub_type).lower()
 
-        if self._or:
-            value += f"{value} | {self._or}"
 
-        if self._is_none:
-            return f"option<{value}>"
-        else:
-            return value
+def _rebuild(cls: type[DBType], state: dict[str, typingAny]) -> DBType:
+    return cls(**state)
 
 
 class Array(DBType):
     """リスト"""
 
+    __slots__ = ()
+
     def __init__(self, sub_type: typingAny = MISSING):
         super().__init__(sub_type=sub_type)
 
+    def _state(self) -> dict[str, typingAny]:
+        return {"sub_type": self.sub_type}
+
 
 class Bool(DBType):
     """真偽値"""
 
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
+    def _state(self) -> dict[str, typingAny]:
+        return {}
+
 
 class Datetime(DBType):
     """日時"""
 
+    __slots__ = ("datetime_format",)
+
     def __init__(
         self,
         datetime_format: str = "%Y/%m/%dT%H:%M:%SZ",
         is_none: bool | None = None,
         _or: list = [],
     ):
+        object.__setattr__(self, "datetime_format", datetime_format)
         super().__init__(is_none=is_none, _or=_or)
-        self.datetime_format = datetime_format
+
+    def _extra_key(self) -> tuple:
+        return (self.datetime_format,)
+
+    def _state(self) -> dict[str, typingAny]:
+        return {**super()._state(), "datetime_format": self.datetime_format}
 
     def strftime(self, value: datetime):
         return value.strftime(self.datetime_format)
@@ -112,6 +186,8 @@ class Datetime(DBType):
 class Float(DBType):
     """小数"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -123,6 +199,8 @@ class Float(DBType):
 class Int(DBType):
     """整数(64bit)"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -134,6 +212,8 @@ class Int(DBType):
 class Number(DBType):
     """数値(自動変換)"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -145,6 +225,8 @@ class Number(DBType):
 class String(DBType):
     """文字列"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -152,9 +234,12 @@ class String(DBType):
     ):
         super().__init__(is_none=is_none, _or=_or)
 
+
 class Bytes(DBType):
     """バイト"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -166,6 +251,8 @@ class Bytes(DBType):
 class Object(DBType):
     """dict"""
 
+    __slots__ = ()
+
     def __init__(
         self,
         is_none: bool | None = None,
@@ -177,25 +264,27 @@ class Object(DBType):
 class Record(DBType):
     """レコード"""
 
+    __slots__ = ()
+
     def __init__(
         self, sub_type: typingAny = MISSING, is_none: bool | None = None, _or: list = []
     ):
         super().__init__(sub_type=sub_type, is_none=is_none, _or=_or)
 
+    def _state(self) -> dict[str, typingAny]:
+        return {**super()._state(), "sub_type": self.sub_type}
+
 
 class RecordId(DBType):
     """レコードID"""
 
+    __slots__ = ()
+
     def __init__(self, is_none: bool = False):
         super().__init__(is_none=is_none)
 
-    def __str__(self) -> str:
-        value = "Record"
-
-        if self._or:
-            value += f"{value} | {self._or}"
+    def _base_name(self) -> str:
+        return "Record"
 
-        if self._is_none:
-            return f"option<{value}>"
-        else:
-            return value
+    def _state(self) -> dict[str, typingAny]:
+        return {"is_none": self._is_none}
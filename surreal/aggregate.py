@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any
+
+from .column import Column
+from .query import Query
+from .utils import log_res, log_select
+
+if TYPE_CHECKING:
+    from .select import Select
+
+__all__ = ("Agg", "GroupBy")
+
+
+class Agg:
+    """集計関数
+
+    .. code-block:: python
+
+        rows = await Counter.group_by("message_id").agg(total=Agg.sum("count"))
+    """
+
+    def __init__(self, function: str, column: Column | str | None = None):
+        self.function = function
+        self.column = column
+
+    def to_string(self) -> str:
+        if self.column is None:
+            return f"{self.function}()"
+
+        name = self.column if isinstance(self.column, str) else self.column.name
+        return f"{self.function}({name})"
+
+    @classmethod
+    def count(cls) -> Agg:
+        """行数"""
+        return cls("count")
+
+    @classmethod
+    def sum(cls, column: Column | str) -> Agg:
+        """合計"""
+        return cls("math::sum", column)
+
+    @classmethod
+    def avg(cls, column: Column | str) -> Agg:
+        """平均"""
+        return cls("math::mean", column)
+
+    @classmethod
+    def min(cls, column: Column | str) -> Agg:
+        """最小値"""
+        return cls("math::min", column)
+
+    @classmethod
+    def max(cls, column: Column | str) -> Agg:
+        """最大値"""
+        return cls("math::max", column)
+
+
+class GroupBy:
+    """GROUP BYで集計する
+
+    結果はモデルにせず、dictのリストで返す。
+    """
+
+    def __init__(self, select: Select, columns: list[Column]):
+        self.select = select
+        self.columns = columns
+
+    def to_query(self, **aggregates: Agg) -> Query:
+        """sqlを組み立てる。
+
+        Parameters
+        ----------
+        **aggregates : Agg
+            結果のキーと集計関数
+
+        Returns
+        -------
+        Query
+            クエリ
+        """
+
+        expressions = [str(column.name) for column in self.columns]
+        expressions += [
+            f"{agg.to_string()} AS {key}" for key, agg in aggregates.items()
+        ]
+
+        q = Query()
+        q.aggregate(self.select.template, expressions)
+
+        if self.select._where:
+            q.where(self.select._where)
+
+        if self.columns:
+            q.group_by(self.columns)
+        else:
+            q.group_all()
+
+        return q
+
+    async def agg(self, **aggregates: Agg) -> list[dict[str, Any]]:
+        """集計する。
+
+        Parameters
+        ----------
+        **aggregates : Agg
+            結果のキーと集計関数
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            グループごとの集計結果
+        """
+
+        q = self.to_query(**aggregates)
+        log_select(q)
+
+        response = (
+            await self.select.template.executes(q.to_string(), cache=self.select._cache)
+        )["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return response
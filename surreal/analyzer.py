@@ -0,0 +1,24 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+__all__ = ("Analyzer",)
+
+
+class Analyzer(BaseModel):
+    """全文検索のアナライザー
+
+    カラムの ``search`` に指定すると、アナライザーとSEARCHインデックスが
+    テーブルと一緒に定義され、 ``BaseTable.search`` で検索できるようになる。
+
+    .. code-block:: python
+
+        class Panel(BaseTable):
+            title: Column[str] = Column(
+                name="title", type=String(), search=Analyzer(name="simple")
+            )
+    """
+
+    name: str
+    tokenizers: list[str] = ["blank", "class"]
+    filters: list[str] = ["lowercase", "ascii"]
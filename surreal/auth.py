@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Literal
+
+from .utils import log
+
+__all__ = ("Token", "TokenAuth")
+
+Sender = Callable[[str, str, dict[str, str]], Awaitable[Any]]
+
+
+class Token:
+    """signinで取得したJWT"""
+
+    def __init__(self, value: str, expires_at: float):
+        self.value = value
+        self.expires_at = expires_at
+        self.lifetime = expires_at - time.time()
+
+    def __repr__(self) -> str:
+        return f"<Token expires_at={self.expires_at}>"
+
+    @classmethod
+    def from_jwt(cls, value: str, default_ttl: float) -> Token:
+        """JWTのexpから有効期限を取得する。取得できなければdefault_ttl秒後とする。
+
+        サーバーと時計がずれていても期限の前に更新できるように、iatがあれば
+        exp - iatを有効期間として手元の時刻に足す。
+        """
+
+        now = time.time()
+        expires_at = now + default_ttl
+        try:
+            payload = value.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            claims = json.loads(base64.urlsafe_b64decode(payload))
+            exp, iat = claims.get("exp"), claims.get("iat")
+            if isinstance(exp, (int, float)):
+                if isinstance(iat, (int, float)) and exp > iat:
+                    expires_at = now + (exp - iat)
+                else:
+                    expires_at = float(exp)
+        except (
+            IndexError,
+            ValueError,
+            UnicodeDecodeError,
+            TypeError,
+            KeyError,
+            AttributeError,
+        ):
+            # 壊れたトークンやdictでないpayloadはdefault_ttlを使う
+            pass
+
+        return cls(value, expires_at)
+
+    def expires_in(self) -> float:
+        return self.expires_at - time.time()
+
+    def is_fresh(self, margin: float) -> bool:
+        """更新しなくてよいか。有効期間が短いトークンは半分を過ぎたら更新する。"""
+        return self.expires_in() > min(margin, max(self.lifetime, 0.0) / 2)
+
+
+class TokenAuth:
+    """signinを1回だけ行い、JWTをBearerトークンとして使い回す
+
+    パスワードのハッシュの検証はサーバーの負荷が高いため、
+    リクエストごとのBasic認証の代わりに使う。有効期限の ``refresh_margin`` 秒前になったら
+    次のリクエストの前にsigninし直す。signinに失敗した場合は ``retry_after`` 秒の間
+    Basic認証を使う。
+
+    ``BaseTable.token_auth`` に設定した時だけ使われる。
+
+    Parameters
+    ----------
+    level : Literal["root", "namespace", "database"], optional
+        ユーザーの種類, by default "root"
+    refresh_margin : float, optional
+        有効期限の何秒前に更新するか, by default 60.0
+    default_ttl : float, optional
+        JWTに有効期限がない時の有効期間(秒), by default 3600.0
+    retry_after : float, optional
+        signinに失敗した時に、次にsigninするまでの秒数, by default 300.0
+    """
+
+    def __init__(
+        self,
+        *,
+        level: Literal["root", "namespace", "database"] = "root",
+        refresh_margin: float = 60.0,
+        default_ttl: float = 3600.0,
+        retry_after: float = 300.0,
+    ):
+        self.level = level
+        self.refresh_margin = refresh_margin
+        self.default_ttl = default_ttl
+        self.retry_after = retry_after
+        self._tokens: dict[tuple[str, ...], Token] = {}
+        self._failed: dict[tuple[str, ...], float] = {}
+        self._locks: dict[tuple[str, ...], asyncio.Lock] = {}
+
+    def _key(self, host: str, user: str, ns: str, db: str) -> tuple[str, ...]:
+        if self.level == "root":
+            return (host, user)
+        if self.level == "namespace":
+            return (host, user, ns)
+        return (host, user, ns, db)
+
+    def _credentials(self, user: str, password: str, ns: str, db: str) -> dict:
+        credentials = {"user": user, "pass": password}
+        if self.level in ("namespace", "database"):
+            credentials["ns"] = ns
+        if self.level == "database":
+            credentials["db"] = db
+        return credentials
+
+    def invalidate(self, host: str, user: str, ns: str, db: str) -> None:
+        """キャッシュしたトークンを破棄する。"""
+        self._tokens.pop(self._key(host, user, ns, db), None)
+
+    async def get_token(
+        self, host: str, user: str, password: str, ns: str, db: str, send: Sender
+    ) -> str | None:
+        """有効なトークンを取得する。必要ならsigninする。
+
+        Parameters
+        ----------
+        host : str
+            接続先
+        user : str
+            ユーザー名
+        password : str
+            パスワード
+        ns : str
+            ネームスペース
+        db : str
+            データベース
+        send : Sender
+            パス、ボディ、ヘッダーを受け取ってPOSTし、jsonを返す関数
+
+        Returns
+        -------
+        str | None
+            トークン。signinできなければNone
+        """
+
+        key = self._key(host, user, ns, db)
+
+        token = self._tokens.get(key)
+        if token is not None and token.is_fresh(self.refresh_margin):
+            return token.value
+
+        if time.time() < self._failed.get(key, 0.0):
+            return None
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # 待っている間に他のリクエストが更新しているかもしれない
+            token = self._tokens.get(key)
+            if token is not None and token.is_fresh(self.refresh_margin):
+                return token.value
+
+            try:
+                res = await send(
+                    "/signin",
+                    json.dumps(self._credentials(user, password, ns, db)),
+                    {"Accept": "application/json", "content-type": "application/json"},
+                )
+            except Exception as e:
+                res = {"details": repr(e)}
+
+            value = res.get("token") if isinstance(res, dict) else None
+            if not isinstance(value, str):
+                log.warning(f"signin failed, falling back to basic auth: {res}")
+                self._failed[key] = time.time() + self.retry_after
+                self._tokens.pop(key, None)
+                return None
+
+            self._tokens[key] = Token.from_jwt(value, self.default_ttl)
+            self._failed.pop(key, None)
+            return value
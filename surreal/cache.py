@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import re
+import time
+from collections import OrderedDict
+from typing import Any
+
+from .utils import MISSING, is_read_query, log
+
+__all__ = ("QueryCache", "read_tables", "written_tables")
+
+Scope = tuple[str, str, str]
+
+# どのテーブルを読んだか分からないクエリのタグ。全ての書き込みで無効になる
+ALL_TABLES = "*"
+
+_SPACE = re.compile(r"\s+")
+_FROM = re.compile(r"\bFROM\s+(\[[^\]]*\]|[\w:⟨⟩`-]+)", re.IGNORECASE)
+_RECORD_TABLE = re.compile(r"(\w+):")
+_WRITE_TARGET = re.compile(
+    r"^\s*(?:CREATE|UPDATE|UPSERT|DELETE(?:\s+FROM)?|INSERT(?:\s+IGNORE)?\s+INTO|RELATE)"
+    r"\s+(?:ONLY\s+)?(\[[^\]]*\]|[\w:⟨⟩`-]+)",
+    re.IGNORECASE,
+)
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+# owner.nameのようなレコードリンクのパスやグラフの辿り方。FROM以外のテーブルを読む
+_LINK = re.compile(r"\b[A-Za-z_]\w*\.[A-Za-z_]|->|<-")
+_UNCACHEABLE = re.compile(r"\b(?:rand|time::now|sleep|FETCH)\b|rand::", re.IGNORECASE)
+_TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "CANCEL")
+
+
+def _statements(sql: str) -> list[str]:
+    return [s.strip() for s in sql.split(";") if s.strip()]
+
+
+def _target_tables(target: str) -> set[str]:
+    """``counter``、``counter:abc``、``[counter:a, panel:b]`` からテーブル名を取得する。"""
+
+    if target.startswith("["):
+        return set(_RECORD_TABLE.findall(target))
+    return {target.split(":", 1)[0].strip("`")}
+
+
+def read_tables(sql: str) -> set[str]:
+    """SELECTが読み込むテーブル名を取得する。
+
+    レコードリンクのパスなどでFROM以外のテーブルを読む時は、どのテーブルか分からないので
+    ``{"*"}`` にする。
+
+    Returns
+    -------
+    set[str]
+        テーブル名。分からなければ ``{"*"}``
+    """
+
+    if _LINK.search(_STRING.sub("''", sql)):
+        return {ALL_TABLES}
+
+    tables: set[str] = set()
+    for statement in _statements(sql):
+        targets = _FROM.findall(statement)
+        if not targets:
+            return {ALL_TABLES}
+        for target in targets:
+            found = _target_tables(target)
+            if not found:
+                return {ALL_TABLES}
+            tables |= found
+    return tables or {ALL_TABLES}
+
+
+def written_tables(sql: str) -> set[str]:
+    """書き込みのsqlが変更するテーブル名を取得する。
+
+    Returns
+    -------
+    set[str]
+        テーブル名。読み込みだけなら空、分からなければ ``{"*"}``
+    """
+
+    tables: set[str] = set()
+    for statement in _statements(sql):
+        keyword = statement.split(None, 1)[0].upper()
+        if keyword in _TRANSACTION_STATEMENTS or is_read_query(statement):
+            continue
+
+        match = _WRITE_TARGET.match(statement)
+        if match is None:
+            # DEFINEやREMOVEなど、対象が分からないものは全て無効にする
+            return {ALL_TABLES}
+
+        found = _target_tables(match.group(1))
+        if not found:
+            return {ALL_TABLES}
+        tables |= found
+    return tables
+
+
+def normalize(sql: str) -> str:
+    return _SPACE.sub(" ", sql).strip()
+
+
+class _Entry:
+    __slots__ = ("expires_at", "tables", "value")
+
+    def __init__(self, value: Any, tables: set[str], expires_at: float):
+        self.value = value
+        self.tables = tables
+        self.expires_at = expires_at
+
+
+class QueryCache:
+    """読み込みのクエリの結果をキャッシュする
+
+    SELECTだけのsqlの結果を、接続先(host, ns, db)と空白を正規化したsqlをキーに保存する。
+    値はsqlに埋め込まれているので、値が違えば別のキーになる。エントリーには読み込んだ
+    テーブルのタグを付け、このライブラリから同じテーブルへの書き込みがあると無効にする。
+    ``ChangeFeed`` で受け取った変更でも無効になる。ライブラリを通さない書き込みは
+    ``ttl`` 秒で反映される。
+
+    ``rand()``、 ``time::now()``、 ``FETCH`` などを含むクエリはキャッシュしない。
+    ``Select`` 、 ``fetch()`` 、 ``load_columns()`` はキャッシュを使い、 ``executes()`` は
+    ``cache=True`` を指定した時だけ使う。 ``Select.no_cache()`` で使わないようにできる。
+
+    レスポンスはコピーせずに共有する。インスタンスに読み込む時にリストや辞書の値は
+    コピーされるが、 ``executes()`` や ``Select.values()`` の結果は変更しないこと。
+
+    .. code-block:: python
+
+        BaseTable.query_cache = QueryCache(maxsize=1024, ttl=30.0)
+
+    Parameters
+    ----------
+    maxsize : int, optional
+        保存するエントリーの最大数。超えたら使われていない順に削除する, by default 1024
+    ttl : float, optional
+        エントリーの有効期間(秒), by default 60.0
+    """
+
+    def __init__(self, *, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[tuple[Scope, str], _Entry] = OrderedDict()
+        # 接続先ごとの書き込みの回数。読み込み中に書き込まれた結果を保存しないために使う
+        self._generations: dict[Scope, int] = {}
+
+    def __repr__(self) -> str:
+        return (
+            f"<QueryCache size={len(self._entries)} hits={self.hits} "
+            f"misses={self.misses} evictions={self.evictions}>"
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def is_cacheable(self, sql: str) -> bool:
+        """キャッシュできるsqlか。全てのステートメントがSELECTの時だけTrue"""
+
+        statements = _statements(sql)
+        if not statements:
+            return False
+        if any(s.split(None, 1)[0].upper() != "SELECT" for s in statements):
+            return False
+        return _UNCACHEABLE.search(sql) is None
+
+    def get(self, scope: Scope, sql: str) -> Any:
+        """キャッシュした結果を取得する。
+
+        Returns
+        -------
+        Any
+            共有している結果。なければ ``MISSING``
+        """
+
+        key = (scope, normalize(sql))
+        entry = self._entries.get(key)
+        if entry is None or entry.expires_at <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return MISSING
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def generation(self, scope: Scope) -> int:
+        return self._generations.get(scope, 0)
+
+    def put(self, scope: Scope, sql: str, value: Any, generation: int) -> None:
+        """結果を保存する。読み込み中に同じ接続先への書き込みがあれば保存しない。
+
+        Parameters
+        ----------
+        scope : Scope
+            host, ns, db
+        sql : str
+            sql
+        value : Any
+            レスポンス
+        generation : int
+            読み込みを始める前の ``generation()``
+        """
+
+        if not isinstance(value, list) or any(
+            not isinstance(r, dict) or r.get("status") != "OK" for r in value
+        ):
+            return
+
+        if self.generation(scope) != generation:
+            return
+
+        tables = read_tables(sql)
+        key = (scope, normalize(sql))
+        self._entries[key] = _Entry(value, tables, time.monotonic() + self.ttl)
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, scope: Scope, tables: set[str] | str) -> None:
+        """テーブルを読み込んだエントリーを無効にする。
+
+        Parameters
+        ----------
+        scope : Scope
+            host, ns, db
+        tables : set[str] | str
+            テーブル名。 ``"*"`` なら全て
+        """
+
+        if isinstance(tables, str):
+            tables = {tables}
+
+        self._generations[scope] = self._generations.get(scope, 0) + 1
+
+        if ALL_TABLES in tables:
+            stale = [key for key in self._entries if key[0] == scope]
+        else:
+            stale = [
+                key
+                for key, entry in self._entries.items()
+                if key[0] == scope
+                and (entry.tables & tables or ALL_TABLES in entry.tables)
+            ]
+
+        for key in stale:
+            del self._entries[key]
+
+        if stale:
+            log.debug(f"query cache: invalidated {len(stale)} entries for {tables}")
+
+    def invalidate_sql(self, scope: Scope, sql: str) -> None:
+        """書き込みのsqlが変更するテーブルのエントリーを無効にする。"""
+
+        tables = written_tables(sql)
+        if tables:
+            self.invalidate(scope, tables)
+
+    def clear(self) -> None:
+        self._entries.clear()
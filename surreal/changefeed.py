@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any, Generic, Literal, TypeVar
+
+from .query import Query
+from .table import BaseTable
+from .utils import log, log_res, log_select
+
+__all__ = ("Change", "ChangeFeed")
+
+T = TypeVar("T", bound=BaseTable)
+
+ChangeKind = Literal["update", "delete"]
+
+
+class Change(Generic[T]):
+    """CHANGEFEEDの1件の変更
+
+    Attributes
+    ----------
+    kind : ChangeKind
+        "update"(作成と更新)か"delete"
+    versionstamp : int
+        変更のversionstamp
+    record : T
+        変更後のレコード。deleteならidだけが設定され、is_noneがTrue
+    data : dict[str, Any]
+        サーバーから返ってきた値
+    """
+
+    def __init__(
+        self, kind: ChangeKind, versionstamp: int, record: T, data: dict[str, Any]
+    ):
+        self.kind = kind
+        self.versionstamp = versionstamp
+        self.record = record
+        self.data = data
+
+    def __repr__(self) -> str:
+        return (
+            f"<Change kind={self.kind} versionstamp={self.versionstamp} "
+            f"record={self.record.table_name}>"
+        )
+
+
+class ChangeFeed(Generic[T]):
+    """``SHOW CHANGES FOR TABLE`` で変更を順に読み込む非同期イテレーター
+
+    読み込んだversionstampの次をcheckpointに保存するので、同じcheckpointを
+    指定すれば前回の続きから読み込める。checkpointはversionstampの変更を全て
+    返し終わってから保存するため、途中で止まった場合は同じ変更をもう一度返すことがある。
+
+    ``BaseTable.changes()`` から作成する。
+
+    Parameters
+    ----------
+    model : type[T]
+        モデル
+    since : int | datetime | None, optional
+        読み込みを始めるversionstampか日時, by default None
+    checkpoint : str | Path | None, optional
+        読み込んだversionstampを保存するファイル, by default None
+    batch_size : int, optional
+        1回に取得する変更の数, by default 100
+    interval : float, optional
+        変更がない時に次に確認するまでの秒数, by default 1.0
+    follow : bool, optional
+        Falseなら最新の変更まで読み込んだら終了する, by default True
+    **options : Any
+        ns, db, hostなど接続先の設定
+    """
+
+    def __init__(
+        self,
+        model: type[T],
+        since: int | datetime | None = None,
+        *,
+        checkpoint: str | Path | None = None,
+        batch_size: int = 100,
+        interval: float = 1.0,
+        follow: bool = True,
+        **options: Any,
+    ):
+        self.model = model
+        self.options = options
+        self.template = model(**options)
+        self.checkpoint = Path(checkpoint) if checkpoint is not None else None
+        self.batch_size = batch_size
+        self.interval = interval
+        self.follow = follow
+        self.since: int | datetime = since if since is not None else 0
+
+        if self.checkpoint is not None and self.checkpoint.exists():
+            data = json.loads(self.checkpoint.read_text())
+            if data.get("table") == self.model.__table__:
+                self.since = int(data["versionstamp"])
+
+    def __aiter__(self) -> AsyncIterator[Change[T]]:
+        return self._iterate()
+
+    def _since(self) -> str:
+        if isinstance(self.since, datetime):
+            since = self.since
+            if since.tzinfo is not None:
+                since = since.astimezone(UTC)
+            return f'd"{since.strftime("%Y-%m-%dT%H:%M:%SZ")}"'
+        return str(self.since)
+
+    def save(self) -> None:
+        """読み込んだ位置をcheckpointに保存する。"""
+        if self.checkpoint is None or isinstance(self.since, datetime):
+            return
+
+        tmp = self.checkpoint.with_suffix(self.checkpoint.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps({"table": self.model.__table__, "versionstamp": self.since})
+        )
+        os.replace(tmp, self.checkpoint)
+
+    async def fetch(self) -> list[dict[str, Any]]:
+        """まだ読み込んでいない変更を1回分取得する。
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            versionstampごとの変更
+        """
+
+        q = Query()
+        q.show_changes(self.template, self._since(), self.batch_size)
+        log_select(q)
+
+        response = (await self.template.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return response
+
+    def _hydrate(self, versionstamp: int, change: dict[str, Any]) -> Change[T] | None:
+        if "update" in change:
+            record = self.model(**self.options).set_data(change["update"])
+            return Change("update", versionstamp, record, change["update"])
+
+        if "delete" in change:
+            data = change["delete"]
+            record = self.model(id=data.get("id"), **self.options)
+            return Change("delete", versionstamp, record, data)
+
+        # define_tableなどのスキーマの変更
+        return None
+
+    async def _iterate(self) -> AsyncIterator[Change[T]]:
+        while True:
+            entries = await self.fetch()
+
+            if entries and self.model.query_cache is not None:
+                template = self.template
+                self.model.query_cache.invalidate(
+                    (template.host, template.ns, template.db), self.model.__table__
+                )
+
+            for entry in entries:
+                versionstamp = int(entry["versionstamp"])
+                for change in entry.get("changes", []):
+                    hydrated = self._hydrate(versionstamp, change)
+                    if hydrated is not None:
+                        yield hydrated
+
+                self.since = versionstamp + 1
+                self.save()
+
+            if len(entries) >= self.batch_size:
+                continue
+            if not self.follow:
+                return
+
+            log.debug(f"changefeed {self.model.__table__}: waiting at {self.since}")
+            await asyncio.sleep(self.interval)
@@ -6,7 +6,8 @@ from typing import Annotated, Any, Generic, Self, TypeVar
 from pydantic import BaseModel, PlainValidator
 
 from ._types import DBType
-from .utils import validate
+from .analyzer import Analyzer
+from .utils import UNLOADED, validate
 
 __all__ = ("Column",)
 
@@ -19,6 +20,9 @@ class Column(BaseModel, Generic[T]):
     value: Any = None
     datetime_format: str = "%Y/%m/%dT%H:%M:%SZ"
     default: T | None = None
+    index: bool = False
+    unique: bool = False
+    search: Analyzer | None = None
 
     def __str__(self):
         return str(self.get_value())
@@ -39,6 +43,11 @@ class Column(BaseModel, Generic[T]):
         self.value = new_value
         return self
 
+    @property
+    def is_loaded(self) -> bool:
+        """値を取得済みか。SELECTで取得しなかったカラムはFalse"""
+        return self.value is not UNLOADED
+
     def get_value(self, is_datetime_to_str: bool = False) -> T:
         """値を取得する。型ヒントが欲しい時用
 
@@ -46,8 +55,18 @@ class Column(BaseModel, Generic[T]):
         -------
         T
             値
+
+        Raises
+        ------
+        Exception
+            SELECTで取得していないカラム
         """
 
+        if self.value is UNLOADED:
+            raise Exception(
+                f"{self.name}は取得されていません。load_columns()で取得してください"
+            )
+
         if is_datetime_to_str and isinstance(self.value, datetime):
             return self.value.strftime(self.datetime_format)  # type: ignore
 
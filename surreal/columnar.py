@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+from array import array
+from collections.abc import AsyncIterator, Iterable
+from datetime import UTC, datetime, timedelta
+from typing import Any, Generic, Literal, TypeVar
+
+from ._types import Bool, Datetime, DBType, Float, Int, Number
+from .column import Column
+from .query import Query
+from .table import BaseTable
+from .utils import log, log_select
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+__all__ = ("ColumnBatch", "ColumnarScan")
+
+T = TypeVar("T", bound=BaseTable)
+
+Backend = Literal["auto", "array", "numpy"]
+
+# DBTypeごとのarray.arrayのtypecode。ここにない型はlistにする
+_TYPECODES: dict[type[DBType], str] = {
+    Int: "q",
+    Float: "d",
+    Number: "d",
+    Bool: "b",
+    # UTCのエポックからのマイクロ秒
+    Datetime: "q",
+}
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=UTC)
+
+
+def _epoch_us(value: Any) -> int:
+    """SurrealDBの日時の文字列をUTCのエポックからのマイクロ秒にする。"""
+
+    if isinstance(value, datetime):
+        dt = value
+    else:
+        text = str(value).replace("Z", "+00:00")
+        # ナノ秒までの小数はfromisoformatで読めないのでマイクロ秒までにする
+        if "." in text:
+            head, tail = text.split(".", 1)
+            digits = len(tail) - len(tail.lstrip("0123456789"))
+            text = f"{head}.{tail[: min(digits, 6)]}{tail[digits:]}"
+        dt = datetime.fromisoformat(text)
+
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=UTC)
+
+    delta = dt - _EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+class _ColumnBuilder:
+    """1つのカラムの値を型付きのバッファにためる"""
+
+    def __init__(self, column: Column):
+        self.name = str(column.name)
+        self.type = type(column.type)
+        self.typecode = _TYPECODES.get(self.type)
+        self.values: array | list[Any] = array(self.typecode) if self.typecode else []
+        # Noneがあった時だけ作る。1なら値がある
+        self.valid: array | None = None
+
+    def append(self, value: Any) -> None:
+        if self.typecode is None:
+            self.values.append(value)
+            return
+
+        if value is None:
+            if self.valid is None:
+                self.valid = array("B", [1]) * len(self.values)
+            self.valid.append(0)
+            self.values.append(0)
+            return
+
+        try:
+            if self.type is Datetime:
+                converted = _epoch_us(value)
+            elif self.type is Bool:
+                converted = 1 if value else 0
+            else:
+                converted = value
+            self.values.append(converted)
+        except (TypeError, ValueError, OverflowError):
+            # スキーマレスのテーブルでは型に合わない値が入っていることがある
+            self._fallback()
+            self.values.append(value)
+            return
+
+        if self.valid is not None:
+            self.valid.append(1)
+
+    def _fallback(self) -> None:
+        """型付きのバッファをやめて、ここまでの値をNoneを含むlistに戻す。"""
+
+        values: list[Any] = self.values.tolist()  # type: ignore
+        if self.type is Datetime:
+            values = [_EPOCH + timedelta(microseconds=v) for v in values]
+        elif self.type is Bool:
+            values = [bool(v) for v in values]
+        if self.valid is not None:
+            values = [v if ok else None for v, ok in zip(values, self.valid)]
+
+        log.debug(f"columnar {self.name}: value does not fit {self.type.__name__}")
+        self.values = values
+        self.typecode = None
+        self.valid = None
+
+
+class ColumnBatch:
+    """カラムごとのバッファにしたSELECTの結果
+
+    数値、真偽値、日時のカラムは ``array.array`` (numpyを使う場合は ``numpy.ndarray``)、
+    それ以外のカラムと、型に合わない値(Intのカラムの小数や文字列など)があったカラムは
+    Noneを含むlistになる。日時はUTCのエポックからのマイクロ秒で、numpyでは
+    ``datetime64[us]`` になる。Noneがあるカラムは ``nulls`` にマスクが入る。
+
+    Attributes
+    ----------
+    ids : list[str]
+        レコードID
+    columns : dict[str, Any]
+        カラム名とバッファ
+    nulls : dict[str, Any]
+        Noneがあるカラムのマスク。Trueなら値がある
+    types : dict[str, type[DBType]]
+        カラムの型
+    """
+
+    def __init__(
+        self,
+        ids: list[str],
+        columns: dict[str, Any],
+        nulls: dict[str, Any],
+        types: dict[str, type[DBType]],
+    ):
+        self.ids = ids
+        self.columns = columns
+        self.nulls = nulls
+        self.types = types
+
+    def __repr__(self) -> str:
+        return f"<ColumnBatch rows={len(self)} columns={list(self.columns)}>"
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.columns[name]
+
+    @classmethod
+    def _build(
+        cls, builders: list[_ColumnBuilder], ids: list[str], backend: Backend
+    ) -> ColumnBatch:
+        use_numpy = backend == "numpy" or (backend == "auto" and numpy is not None)
+        if backend == "numpy" and numpy is None:
+            raise Exception("numpyをインストールしてください")
+
+        columns: dict[str, Any] = {}
+        nulls: dict[str, Any] = {}
+        types: dict[str, type[DBType]] = {}
+        for builder in builders:
+            values, valid = builder.values, builder.valid
+            if use_numpy and builder.typecode is not None:
+                dtype = numpy.dtype(values.typecode)  # type: ignore
+                values = numpy.frombuffer(values, dtype=dtype)
+                if builder.type is Bool:
+                    values = values.astype(bool)
+                elif builder.type is Datetime:
+                    values = values.view("datetime64[us]")
+                if valid is not None:
+                    valid = numpy.frombuffer(valid, dtype=numpy.uint8).astype(bool)
+
+            columns[builder.name] = values
+            types[builder.name] = builder.type
+            if valid is not None:
+                nulls[builder.name] = valid
+
+        return cls(ids, columns, nulls, types)
+
+    def _arrow_type(self, name: str) -> Any:
+        _type = self.types[name]
+        if _type is Int:
+            return pyarrow.int64()  # type: ignore
+        if _type in (Float, Number):
+            return pyarrow.float64()  # type: ignore
+        if _type is Bool:
+            return pyarrow.bool_()  # type: ignore
+        if _type is Datetime:
+            return pyarrow.timestamp("us", tz="UTC")  # type: ignore
+        return None
+
+    def to_arrow(self) -> Any:
+        """pyarrowのRecordBatchにする。
+
+        Returns
+        -------
+        pyarrow.RecordBatch
+            idと各カラムの列
+
+        Raises
+        ------
+        Exception
+            pyarrowがインストールされていない
+        """
+
+        if pyarrow is None:
+            raise Exception("to_arrowを使うにはpyarrowをインストールしてください")
+
+        arrays = [pyarrow.array(self.ids, type=pyarrow.string())]
+        for name, values in self.columns.items():
+            arrow_type = self._arrow_type(name)
+            if arrow_type is None or isinstance(values, list):
+                arrays.append(pyarrow.array(values))
+                continue
+
+            is_datetime = self.types[name] is Datetime
+            # 日時はint64のマイクロ秒のまま渡してからtimestampにする
+            value_type = pyarrow.int64() if is_datetime else arrow_type
+            valid = self.nulls.get(name)
+
+            if hasattr(values, "dtype"):
+                raw = values.view("int64") if is_datetime else values
+                mask = None if valid is None else ~valid
+                arrow_values = pyarrow.array(raw, type=value_type, mask=mask)
+            else:
+                rows = values.tolist()
+                if self.types[name] is Bool:
+                    rows = [bool(v) for v in rows]
+                if valid is not None:
+                    rows = [v if valid[i] else None for i, v in enumerate(rows)]
+                arrow_values = pyarrow.array(rows, type=value_type)
+
+            if is_datetime:
+                arrow_values = arrow_values.cast(arrow_type)
+            arrays.append(arrow_values)
+
+        return pyarrow.RecordBatch.from_arrays(arrays, names=["id", *self.columns])
+
+
+class ColumnarScan(Generic[T]):
+    """SELECTの結果をid順にbatch_size件ずつ ``ColumnBatch`` にする非同期イテレーター
+
+    行ごとのインスタンスやdictを保持しないので、メモリの使用量は1回分のレスポンスと
+    バッファだけになる。 ``BaseTable.columnar()`` から作成する。
+
+    Parameters
+    ----------
+    model : type[T]
+        モデル
+    where : str | None, optional
+        WHERE句, by default None
+    columns : Iterable[Column | str] | None, optional
+        取得するカラム。Noneなら全て, by default None
+    batch_size : int, optional
+        1回に取得する件数, by default 10000
+    backend : Backend, optional
+        "numpy"ならnumpyの配列、"array"ならarray.array。
+        "auto"はnumpyがあればnumpy, by default "auto"
+    **options : Any
+        ns, db, hostなど接続先の設定
+    """
+
+    def __init__(
+        self,
+        model: type[T],
+        where: str | None = None,
+        *,
+        columns: Iterable[Column | str] | None = None,
+        batch_size: int = 10000,
+        backend: Backend = "auto",
+        **options: Any,
+    ):
+        self.model = model
+        self.template = model(**options)
+        self.where = where
+        self.batch_size = batch_size
+        self.backend = backend
+
+        if columns is None:
+            self.columns = self.template.get_columns()
+        else:
+            self.columns = [
+                self.template.get_column(c) if isinstance(c, str) else c
+                for c in columns
+            ]
+
+    def __aiter__(self) -> AsyncIterator[ColumnBatch]:
+        return self._iterate()
+
+    def _query(self, last_id: str | None) -> Query:
+        q = Query()
+        q.select(self.template, True, self.columns)
+
+        conditions = [
+            c for c in (self.where, f"id > {last_id}" if last_id else None) if c
+        ]
+        if conditions:
+            q.where(" AND ".join(f"({c})" for c in conditions))
+
+        q.order_by("id")
+        q.limit(self.batch_size)
+        return q
+
+    async def _iterate(self) -> AsyncIterator[ColumnBatch]:
+        last_id: str | None = None
+        total = 0
+
+        while True:
+            q = self._query(last_id)
+            log_select(q)
+
+            response = await self.template.executes(q.to_string(), cache=False)
+            rows = response["result"]
+            if not isinstance(rows, list):
+                raise Exception(rows)
+            if not rows:
+                return
+
+            builders = [_ColumnBuilder(column) for column in self.columns]
+            ids: list[str] = []
+            for row in rows:
+                ids.append(row["id"])
+                for builder in builders:
+                    builder.append(row.get(builder.name))
+
+            last_id = ids[-1]
+            total += len(ids)
+            log.debug(f"columnar {self.model.__table__}: {total}")
+
+            # 次のバッチを取得する前に行のdictを解放する
+            del response, rows
+            yield ColumnBatch._build(builders, ids, self.backend)
+
+            if len(ids) < self.batch_size:
+                return
+
+    async def collect(self) -> list[ColumnBatch]:
+        """全てのバッチを取得する。"""
+        return [batch async for batch in self]
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import gzip
+import json
+import time
+import zlib
+from typing import Any, Literal
+
+import aiohttp
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+__all__ = ("Compression", "CompressionStats")
+
+Algorithm = Literal["gzip", "deflate", "zstd"]
+
+
+class CompressionStats:
+    """圧縮の統計"""
+
+    def __init__(self):
+        self.requests = 0
+        self.compressed_requests = 0
+        self.request_bytes = 0
+        self.request_wire_bytes = 0
+        self.compress_seconds = 0.0
+
+        self.responses = 0
+        self.compressed_responses = 0
+        self.response_bytes = 0
+        self.response_wire_bytes = 0
+        self.decompress_seconds = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"<CompressionStats request_ratio={self.request_ratio:.3f} "
+            f"response_ratio={self.response_ratio:.3f} "
+            f"compress_seconds={self.compress_seconds:.4f} "
+            f"decompress_seconds={self.decompress_seconds:.4f}>"
+        )
+
+    @property
+    def request_ratio(self) -> float:
+        """送信したバイト数 / 圧縮前のバイト数"""
+        if not self.request_bytes:
+            return 1.0
+        return self.request_wire_bytes / self.request_bytes
+
+    @property
+    def response_ratio(self) -> float:
+        """受信したバイト数 / 展開後のバイト数"""
+        if not self.response_bytes:
+            return 1.0
+        return self.response_wire_bytes / self.response_bytes
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **vars(self),
+            "request_ratio": self.request_ratio,
+            "response_ratio": self.response_ratio,
+        }
+
+
+class Compression:
+    """リクエストとレスポンスのボディを圧縮する
+
+    ``threshold`` バイト以上のリクエストボディを圧縮して ``Content-Encoding`` を付け、
+    ``Accept-Encoding`` で圧縮されたレスポンスを受け取り、チャンクごとに展開する。
+    リクエストの圧縮はサーバー(またはリバースプロキシ)が対応している必要がある。
+
+    .. code-block:: python
+
+        BaseTable.compression = Compression("gzip", threshold=4096)
+
+    Parameters
+    ----------
+    algorithm : Algorithm, optional
+        リクエストの圧縮方式, by default "gzip"
+    threshold : int, optional
+        圧縮するボディの最小バイト数, by default 1024
+    level : int | None, optional
+        圧縮レベル, by default None
+    compress_requests : bool, optional
+        リクエストを圧縮するか, by default True
+    """
+
+    def __init__(
+        self,
+        algorithm: Algorithm = "gzip",
+        *,
+        threshold: int = 1024,
+        level: int | None = None,
+        compress_requests: bool = True,
+    ):
+        if algorithm == "zstd" and zstandard is None:
+            raise Exception("zstdを使うにはzstandardをインストールしてください")
+
+        self.algorithm = algorithm
+        self.threshold = threshold
+        self.level = level
+        self.compress_requests = compress_requests
+        self.stats = CompressionStats()
+
+    @property
+    def accept_encoding(self) -> str:
+        encodings = ["gzip", "deflate"]
+        if zstandard is not None:
+            encodings.insert(0, "zstd")
+        return ", ".join(encodings)
+
+    def compress(self, body: bytes) -> bytes:
+        if self.algorithm == "gzip":
+            return gzip.compress(body, 6 if self.level is None else self.level)
+        if self.algorithm == "deflate":
+            return zlib.compress(body, -1 if self.level is None else self.level)
+        return zstandard.ZstdCompressor(  # type: ignore
+            level=3 if self.level is None else self.level
+        ).compress(body)
+
+    def encode(self, data: Any, headers: dict[str, str]) -> tuple[Any, dict[str, str]]:
+        """リクエストのボディを圧縮し、ヘッダーを追加する。
+
+        Parameters
+        ----------
+        data : Any
+            ボディ
+        headers : dict[str, str]
+            ヘッダー
+
+        Returns
+        -------
+        tuple[Any, dict[str, str]]
+            ボディとヘッダー
+        """
+
+        headers = {**headers, "Accept-Encoding": self.accept_encoding}
+
+        if not isinstance(data, (str, bytes)):
+            return data, headers
+
+        body = data.encode() if isinstance(data, str) else data
+        self.stats.requests += 1
+        self.stats.request_bytes += len(body)
+
+        if not self.compress_requests or len(body) < self.threshold:
+            self.stats.request_wire_bytes += len(body)
+            return body, headers
+
+        started = time.perf_counter()
+        compressed = self.compress(body)
+        self.stats.compress_seconds += time.perf_counter() - started
+
+        # 圧縮しても小さくならないなら圧縮しない
+        if len(compressed) >= len(body):
+            self.stats.request_wire_bytes += len(body)
+            return body, headers
+
+        self.stats.compressed_requests += 1
+        self.stats.request_wire_bytes += len(compressed)
+        return compressed, {**headers, "Content-Encoding": self.algorithm}
+
+    def _decoder(self, encoding: str) -> Any:
+        if encoding in ("gzip", "x-gzip"):
+            return zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if encoding == "deflate":
+            return zlib.decompressobj(zlib.MAX_WBITS)
+        if encoding == "zstd" and zstandard is not None:
+            return zstandard.ZstdDecompressor().decompressobj()
+        return None
+
+    async def read_json(self, response: aiohttp.ClientResponse) -> Any:
+        """レスポンスをチャンクごとに展開してjsonにする。
+
+        aiohttpの自動展開を無効にしたセッションのレスポンスに使う。
+
+        Parameters
+        ----------
+        response : aiohttp.ClientResponse
+            レスポンス
+
+        Returns
+        -------
+        Any
+            json
+
+        Raises
+        ------
+        aiohttp.ContentTypeError
+            jsonではないレスポンス
+        """
+
+        if "json" not in response.content_type:
+            raise aiohttp.ContentTypeError(
+                response.request_info,
+                response.history,
+                message=f"Attempt to decode JSON with unexpected mimetype: {response.content_type}",
+                headers=response.headers,
+            )
+
+        encoding = response.headers.get("Content-Encoding", "").lower()
+        decoder = self._decoder(encoding)
+
+        chunks: list[bytes] = []
+        wire_bytes = 0
+        spent = 0.0
+        async for chunk in response.content.iter_chunked(64 * 1024):
+            wire_bytes += len(chunk)
+            if decoder is None:
+                chunks.append(chunk)
+                continue
+
+            started = time.perf_counter()
+            chunks.append(decoder.decompress(chunk))
+            spent += time.perf_counter() - started
+
+        if decoder is not None and hasattr(decoder, "flush"):
+            chunks.append(decoder.flush())
+
+        body = b"".join(chunks)
+
+        self.stats.responses += 1
+        self.stats.response_wire_bytes += wire_bytes
+        self.stats.response_bytes += len(body)
+        if decoder is not None:
+            self.stats.compressed_responses += 1
+            self.stats.decompress_seconds += spent
+
+        return json.loads(body)
@@ -0,0 +1,188 @@
+from __future__ import annotations
+
+from typing import Any, Literal, Self
+
+from pydantic import BaseModel, model_validator
+
+from .column import Column
+
+__all__ = ("Index",)
+
+
+class Index(BaseModel):
+    """インデックス
+
+    1つ以上のカラムに対するインデックスを定義する。
+    モデルの ``__indexes__`` に指定すると複合インデックスになる。
+
+    .. code-block:: python
+
+        class Counter(BaseTable):
+            __indexes__ = [Index("guild_id", "message_id", unique=True)]
+
+    ``vector`` を指定するとベクトルのインデックスになり、 ``BaseTable.knn`` で使われる。
+
+    .. code-block:: python
+
+        class Document(BaseTable):
+            __indexes__ = [Index.hnsw("embedding", dimension=384)]
+    """
+
+    columns: list[str]
+    name: str | None = None
+    unique: bool = False
+    vector: Literal["mtree", "hnsw"] | None = None
+    dimension: int | None = None
+    distance: str = "cosine"
+    efc: int | None = None
+    m: int | None = None
+    analyzer: str | None = None
+    bm25: bool = True
+    highlights: bool = True
+
+    def __init__(
+        self, *columns: Column | str, name: str | None = None, **data: Any
+    ) -> None:
+        super().__init__(
+            columns=[
+                column if isinstance(column, str) else str(column.name)
+                for column in columns
+            ],
+            name=name,
+            **data,
+        )
+
+    @classmethod
+    def mtree(
+        cls, column: Column | str, dimension: int, distance: str = "cosine", **data: Any
+    ) -> Index:
+        """MTREEのベクトルインデックスを作成する。
+
+        Parameters
+        ----------
+        column : Column | str
+            Array(Float())のカラム
+        dimension : int
+            ベクトルの次元数
+        distance : str, optional
+            距離の種類, by default "cosine"
+
+        Returns
+        -------
+        Index
+            インデックス
+        """
+
+        return cls(
+            column, vector="mtree", dimension=dimension, distance=distance, **data
+        )
+
+    @classmethod
+    def hnsw(
+        cls,
+        column: Column | str,
+        dimension: int,
+        distance: str = "cosine",
+        *,
+        efc: int | None = None,
+        m: int | None = None,
+        **data: Any,
+    ) -> Index:
+        """HNSWのベクトルインデックスを作成する。
+
+        Parameters
+        ----------
+        column : Column | str
+            Array(Float())のカラム
+        dimension : int
+            ベクトルの次元数
+        distance : str, optional
+            距離の種類, by default "cosine"
+        efc : int | None, optional
+            構築時の候補数。Noneならサーバーのデフォルト, by default None
+        m : int | None, optional
+            ノードごとの最大の接続数。Noneならサーバーのデフォルト, by default None
+
+        Returns
+        -------
+        Index
+            インデックス
+        """
+
+        return cls(
+            column,
+            vector="hnsw",
+            dimension=dimension,
+            distance=distance,
+            efc=efc,
+            m=m,
+            **data,
+        )
+
+    @classmethod
+    def fulltext(
+        cls,
+        column: Column | str,
+        analyzer: str,
+        *,
+        bm25: bool = True,
+        highlights: bool = True,
+        **data: Any,
+    ) -> Index:
+        """全文検索のSEARCHインデックスを作成する。
+
+        アナライザーはモデルの ``__analyzers__`` かカラムの ``search`` で定義する。
+
+        Parameters
+        ----------
+        column : Column | str
+            Stringのカラム
+        analyzer : str
+            アナライザー名
+        bm25 : bool, optional
+            BM25でスコアを計算する, by default True
+        highlights : bool, optional
+            search::highlightを使えるようにする, by default True
+
+        Returns
+        -------
+        Index
+            インデックス
+        """
+
+        return cls(column, analyzer=analyzer, bm25=bm25, highlights=highlights, **data)
+
+    @model_validator(mode="after")
+    def check_vector(self) -> Self:
+        """ベクトルのインデックスには次元数が必要"""
+
+        if self.vector is not None and (self.dimension is None or self.dimension < 1):
+            raise Exception(
+                f"{self.vector}のインデックスにはdimensionを指定してください"
+            )
+        return self
+
+    def get_name(self, table_name: str) -> str:
+        """インデックス名を取得する。指定がなければテーブル名とカラム名から作る。
+
+        Parameters
+        ----------
+        table_name : str
+            テーブル名
+
+        Returns
+        -------
+        str
+            インデックス名
+        """
+
+        if self.name:
+            return self.name
+
+        if self.vector is not None:
+            suffix = self.vector
+        elif self.analyzer is not None:
+            suffix = "search"
+        else:
+            suffix = "unique" if self.unique else "idx"
+        return "_".join([table_name, *self.columns, suffix]).replace(".", "_")
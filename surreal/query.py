@@ -1,19 +1,39 @@
 from __future__ import annotations
 
-import copy
 import json
+import struct
+from array import array
+from collections.abc import Callable, Container
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
-from ._types import Array, Bool, Datetime, Object, Record, String,Bytes
+from ._types import Array, Bool, Bytes, Datetime, Object, Record, String
 from .table import BaseTable
-from .utils import MISSING
+from .utils import UNLOADED
 
 if TYPE_CHECKING:
+    from ._types import DBType
+    from .analyzer import Analyzer
     from .column import Column
+    from .index import Index
 
 __all__ = ("Query",)
 
+Render = Callable[["Query", Any], str]
+# 属性名、"カラム名 = "、値をリテラルにする関数
+WritePlan = tuple[tuple[str, str, Render], ...]
+
+
+def _float32(value: float) -> str:
+    """float32の値を、float32に戻した時に同じ値になる最短の文字列にする。"""
+
+    packed = struct.pack("f", value)
+    for precision in (6, 7, 8):
+        text = format(value, f".{precision}g")
+        if struct.pack("f", float(text)) == packed:
+            return text
+    return format(value, ".9g")
+
 
 class Query:
     def __init__(self):
@@ -63,8 +83,22 @@ class Query:
 
         return sql + "]"
 
-    def schemafull(self, table: BaseTable) -> None:
-        self.__query += f"DEFINE TABLE {table.table_name} SCHEMAFULL;\n"
+    def schemafull(self, table: BaseTable, changefeed: str | None = None) -> None:
+        table_name = table.table_name.split(":")[0]
+        define_query = f"DEFINE TABLE {table_name} SCHEMAFULL"
+        if changefeed:
+            define_query += f" CHANGEFEED {changefeed}"
+        self.__query += define_query + ";\n"
+
+    def changefeed(self, table: BaseTable, duration: str) -> None:
+        table_name = table.table_name.split(":")[0]
+        self.__query += f"DEFINE TABLE {table_name} CHANGEFEED {duration};\n"
+
+    def show_changes(self, table: BaseTable, since: int | str, limit: int) -> None:
+        table_name = table.table_name.split(":")[0]
+        self.__query += (
+            f"SHOW CHANGES FOR TABLE {table_name} SINCE {since} LIMIT {limit}"
+        )
 
     def remove_field(self, table: BaseTable, col: Column) -> None:
         self.__query += (
@@ -74,95 +108,233 @@ class Query:
     def add_field(self, table: BaseTable, col: Column) -> None:
         self.define_field(table, col)
 
-    def add_string(self, col: Column) -> None:
-        if col.value is None:
-            self.__query += f"{col.name} = None,"
-            return
-        elif col.value == "":
-            self.__query += f"{col.name} = '',"
-            return
+    def string_literal(self, value: Any) -> str:
+        if value is None:
+            return "None"
+        return f"'{value}'"
+
+    def normal_literal(self, value: Any) -> str:
+        if value is None or value == "":
+            return "None"
+        return f"{value}"
+
+    def bytes_literal(self, value: Any) -> str:
+        if value is None or value == "":
+            return "None"
+        return f'<bytes>"{value}"'
+
+    def object_literal(self, value: Any) -> str:
+        if value is None or value == "":
+            return "None"
+        return json.dumps(value)
+
+    def record_literal(self, value: Any) -> str:
+        if value is None or value == "":
+            return "None"
+        if isinstance(value, str):
+            return value
+        return value.table_name
+
+    def array_literal(self, value: Any) -> str:
+        if value is None or value == "":
+            return "[]"
+        return self.list_join(value)
+
+    def datetime_literal(self, value: Any, _format: str = "%Y-%m-%dT%H:%M:%SZ") -> str:
+        if value is None or value == "":
+            return "None"
+        return f"return type::datetime('{value.strftime(_format)}')"
+
+    @staticmethod
+    def literal(_type: DBType) -> Render:
+        """型に合わせて値をsqlのリテラルにする関数を取得する。"""
+        return _LITERALS.get(type(_type), Query.normal_literal)
+
+    @staticmethod
+    def write_plan(columns: list[tuple[str, Column]]) -> WritePlan:
+        """カラムの値を書き込むSETの組み立て方を作成する。
+
+        Parameters
+        ----------
+        columns : list[tuple[str, Column]]
+            属性名とカラム
+
+        Returns
+        -------
+        WritePlan
+            属性名、``カラム名 = `` 、値をリテラルにする関数
+        """
+
+        return tuple(
+            (attr, f"{column.name or attr} = ", Query.literal(column.type))
+            for attr, column in columns
+        )
+
+    def add_values(
+        self,
+        plan: WritePlan,
+        table: BaseTable,
+        attrs: Container[str] | None = None,
+    ) -> None:
+        """write_planの順にカラムの値をSETに追加する。取得していないカラムは追加しない。
+
+        Parameters
+        ----------
+        plan : WritePlan
+            ``write_plan()`` で作成したもの
+        table : BaseTable
+            インスタンス
+        attrs : Container[str] | None, optional
+            追加するカラムの属性名。Noneなら全て, by default None
+        """
+
+        parts = []
+        for attr, prefix, render in plan:
+            if attrs is not None and attr not in attrs:
+                continue
+            value = getattr(table, attr).value
+            if value is UNLOADED:
+                continue
+            parts.append(prefix + render(self, value))
+
+        if parts:
+            self.__query += ",".join(parts) + ","
 
-        self.__query += f"{col.name} = '{col.value}',"
+    def add_string(self, col: Column) -> None:
+        self.__query += f"{col.name} = {self.string_literal(col.value)},"
 
     def add_normal(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
-            return
+        self.__query += f"{col.name} = {self.normal_literal(col.value)},"
 
-        self.__query += f"{col.name} = {col.value},"
-    
     def add_byte(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
-            return
-        value = col.value
-        self.__query += f'{col.name} = <bytes>"{value}",'
+        self.__query += f"{col.name} = {self.bytes_literal(col.value)},"
 
     def add_object(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
-            return
-        self.__query += f"{col.name} = {json.dumps(col.value)},"
+        self.__query += f"{col.name} = {self.object_literal(col.value)},"
 
     def add_bool(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
-            return
-        self.__query += f"{col.name} = {col.value},"
+        self.__query += f"{col.name} = {self.normal_literal(col.value)},"
 
     def add_record(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
-            return
-
-        if isinstance(col.value, str):
-            self.__query += f"{col.name} = {col.value},"
-        else:
-            self.__query += f"{col.name} = {col.value.table_name},"
+        self.__query += f"{col.name} = {self.record_literal(col.value)},"
 
     def add_array(self, col: Column) -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = [],"
+        self.__query += f"{col.name} = {self.array_literal(col.value)},"
+
+    def add_datetime(self, col: Column, _format: str = "%Y-%m-%dT%H:%M:%SZ") -> None:
+        self.__query += f"{col.name} = {self.datetime_literal(col.value, _format)},"
+
+    def add_increment(self, col: Column, amount: float) -> None:
+        if amount < 0:
+            self.__query += f"{col.name} -= {-amount},"
             return
 
-        self.__query += str(col.name) + "=" + self.list_join(col.value) + ","
+        self.__query += f"{col.name} += {amount},"
 
-    def add_datetime(self, col: Column, _format: str = "%Y-%m-%dT%H:%M:%SZ") -> None:
-        if col.value is None or col.value == "":
-            self.__query += f"{col.name} = None,"
+    def add_append(self, col: Column, value: Any, remove: bool = False) -> None:
+        operator = "-=" if remove else "+="
+
+        if isinstance(value, datetime):
+            # 文字列ではなくadd_valuesと同じ日時のリテラルにする
+            literal = _LITERALS[Datetime](self, value)
+            self.__query += f"{col.name} {operator} {literal},"
             return
 
-        value = col.value.strftime(_format)
-        self.__query += f"{col.name} = return type::datetime('{value}'),"
+        self.__query += f"{col.name} {operator} {self.list_join([value])},"
 
     def add_sqlvalue(self, col: Column, _format: str = "%Y-%m-%dT%H:%M:%SZ") -> None:
-        _type = type(col.type)
-        if _type is Array:
-            self.add_array(col)
-        elif _type is String:
-            self.add_string(col)
-        elif _type is Bool:
-            self.add_bool(col)
-        elif _type is Record:
-            self.add_record(col)
-        elif _type is Object:
-            self.add_object(col)
-        elif _type is Datetime:
+        if col.value is UNLOADED:
+            return
+
+        if type(col.type) is Datetime:
             self.add_datetime(col, _format)
-        elif _type is Bytes:
-            self.add_byte(col)
+            return
+
+        self.__query += f"{col.name} = {self.literal(col.type)(self, col.value)},"
+
+    def select(
+        self,
+        table: BaseTable,
+        ignore_id: bool = False,
+        columns: list[Column] | None = None,
+    ) -> None:
+        if ignore_id:
+            table_name = table.table_name.split(":")[0]
         else:
-            self.add_normal(col)
+            table_name = table.table_name
+
+        if columns:
+            projection = ", ".join(["id", *(str(col.name) for col in columns)])
+        else:
+            projection = "*"
+
+        self.__query += f"SELECT {projection} FROM {table_name}"
+
+    def select_value(
+        self, table: BaseTable, column: Column, ignore_id: bool = False
+    ) -> None:
+        if ignore_id:
+            table_name = table.table_name.split(":")[0]
+        else:
+            table_name = table.table_name
 
-    def select(self, table: BaseTable, ignore_id: bool = False) -> None:
+        self.__query += f"SELECT VALUE {column.name} FROM {table_name}"
+
+    def aggregate(
+        self, table: BaseTable, expressions: list[str], ignore_id: bool = True
+    ) -> None:
         if ignore_id:
-            table_name = list(table.table_name.split(":"))[0]
+            table_name = table.table_name.split(":")[0]
         else:
             table_name = table.table_name
 
-        self.__query += f"SELECT * FROM {table_name}"
+        self.__query += f"SELECT {', '.join(expressions)} FROM {table_name}"
+
+    def group_by(self, columns: list[Column]) -> None:
+        self.__query += f" GROUP BY {', '.join(str(col.name) for col in columns)} "
+
+    def group_all(self) -> None:
+        self.__query += " GROUP ALL "
+
+    def select_knn(self, table: BaseTable) -> None:
+        table_name = table.table_name.split(":")[0]
+        self.__query += (
+            f"SELECT *, vector::distance::knn() AS distance FROM {table_name}"
+        )
+
+    def vector(self, values: Any) -> str:
+        """ベクトルをsqlの配列にする。float32のバッファは有効桁数を減らして送る。"""
+
+        if isinstance(values, (bytes, bytearray)):
+            values = array("f", values)
+
+        compact = getattr(values, "typecode", None) == "f" or (
+            getattr(values, "format", None) == "f"
+        )
+        dtype = getattr(values, "dtype", None)
+        if dtype is not None and dtype.kind == "f" and dtype.itemsize == 4:
+            compact = True
+
+        if hasattr(values, "tolist"):
+            values = values.tolist()
+
+        if compact:
+            return "[" + ",".join(_float32(v) for v in values) + "]"
+        return "[" + ",".join(repr(float(v)) for v in values) + "]"
+
+    def knn(self, col: Column, values: Any, k: int, ef: int | None = None) -> str:
+        option = f"{k},{ef}" if ef is not None else str(k)
+        return f"{col.name} <|{option}|> {self.vector(values)}"
+
+    def select_ids(self, table: BaseTable) -> None:
+        table_name = table.table_name.split(":")[0]
+        self.__query += f"SELECT VALUE id FROM {table_name}"
+
+    def select_records(self, record_ids: list[str]) -> None:
+        self.__query += f"SELECT * FROM [{', '.join(record_ids)}]"
 
     def where(self, where: str) -> None:
+        self.__query = self.__query.rstrip(",")
         self.__query += f" WHERE {where} "
 
     def fetch(self, fetch: str) -> None:
@@ -174,47 +346,61 @@ class Query:
     def update(self, table: BaseTable) -> None:
         self.__query += f"UPDATE {table.table_name} SET "
 
+    def upsert(self, table: BaseTable) -> None:
+        self.__query += f"UPSERT {table.table_name} SET "
+
+    def upsert_content(self, record_id: str, content: str) -> None:
+        self.__query += f"UPSERT {record_id} CONTENT {content};"
+
+    def returns(self, mode: str) -> None:
+        self.__query = self.__query.rstrip(",")
+        self.__query += f" RETURN {mode.upper()}"
+
     def delete(self, table: BaseTable) -> None:
         self.__query += f"DELETE FROM {table.table_name} "
 
+    def update_records(self, record_ids: list[str]) -> None:
+        self.__query += f"UPDATE [{', '.join(record_ids)}] SET "
+
+    def delete_records(self, record_ids: list[str]) -> None:
+        self.__query += f"DELETE [{', '.join(record_ids)}] "
+
+    def begin(self) -> None:
+        self.__query += "BEGIN TRANSACTION;"
+
+    def commit(self) -> None:
+        self.__query += "COMMIT TRANSACTION;"
+
+    def end(self) -> None:
+        self.__query += ";"
+
     def limit(self, limit: int) -> None:
-        self.__query += f"LIMIT {limit}"
+        self.__query += f" LIMIT {limit} "
 
     def asc(self, column: Column) -> None:
-        self.__query += f"ORDER BY {column.name} ASC "
+        self.__query += f" ORDER BY {column.name} ASC "
 
     def desc(self, column: Column) -> None:
-        self.__query += f"ORDER BY {column.name} DESC "
+        self.__query += f" ORDER BY {column.name} DESC "
+
+    def order_by(self, name: str, desc: bool = False) -> None:
+        self.__query += f" ORDER BY {name} {'DESC' if desc else 'ASC'} "
+
+    def insert_values(self, table: BaseTable, values: list[str]) -> None:
+        table_name = table.table_name.split(":")[0]
+        self.__query += f"INSERT INTO {table_name} [{', '.join(values)}]"
 
     def original(self, original_sql: str) -> None:
         self.q += original_sql
+        self.__query += original_sql
 
     def define_field(self, table: BaseTable, col: Column) -> None:
         if ":" in table.table_name:
-            table_name = list(table.table_name.split(":"))[0]
+            table_name = table.table_name.split(":")[0]
         else:
             table_name = table.table_name
 
-        _type = col.type
-        __type = col.type
-
-        while __type is not MISSING:
-            if str(_type).endswith(">"):
-                parent_type = (
-                    str(copy.deepcopy(_type)).replace(">", "") + "<{sub_type}>>"
-                )
-            else:
-                parent_type = str(copy.deepcopy(_type)) + "<{sub_type}>"
-            try:
-                _sub_type = list(str(__type.sub_type).split("."))[-1]
-                sub_type = list(str(_sub_type).split("'"))[0]
-
-                _type = f"{parent_type}".format(sub_type=sub_type)
-            except AttributeError:
-                break
-            __type = __type.sub_type
-
-        define_query = f"DEFINE FIELD {col.name} ON TABLE {table_name} TYPE {str(_type).lower().replace('<>', '')} "
+        define_query = f"DEFINE FIELD {col.name} ON TABLE {table_name} TYPE {col.type.type_string} "
 
         if col.default is not None and col.default != "":
             if isinstance(col.type, String):
@@ -229,12 +415,59 @@ class Query:
 
         self.__query += define_query + ";"
 
-    def to_string(self) -> str:
+    def define_index(self, table: BaseTable, index: Index) -> None:
+        table_name = table.table_name.split(":")[0]
+
+        define_query = (
+            f"DEFINE INDEX {index.get_name(table_name)} ON TABLE {table_name} "
+            f"FIELDS {', '.join(index.columns)}"
+        )
+
+        if index.vector is not None:
+            define_query += (
+                f" {index.vector.upper()} DIMENSION {index.dimension}"
+                f" DIST {index.distance.upper()}"
+            )
+            if index.efc is not None:
+                define_query += f" EFC {index.efc}"
+            if index.m is not None:
+                define_query += f" M {index.m}"
+        elif index.analyzer is not None:
+            define_query += f" SEARCH ANALYZER {index.analyzer}"
+            if index.bm25:
+                define_query += " BM25"
+            if index.highlights:
+                define_query += " HIGHLIGHTS"
+        elif index.unique:
+            define_query += " UNIQUE"
+
+        self.__query += define_query + ";"
+
+    def define_analyzer(self, analyzer: Analyzer) -> None:
+        define_query = f"DEFINE ANALYZER {analyzer.name}"
+        if analyzer.tokenizers:
+            define_query += f" TOKENIZERS {','.join(analyzer.tokenizers)}"
+        if analyzer.filters:
+            define_query += f" FILTERS {','.join(analyzer.filters)}"
+
+        self.__query += define_query + ";"
+
+    def matches(self, col: Column, text: str, ref: int = 1) -> str:
+        return f"{col.name} @{ref}@ {json.dumps(text, ensure_ascii=False)}"
+
+    def explain(self, full: bool = False) -> None:
+        self.__query += " EXPLAIN FULL " if full else " EXPLAIN "
+
+    def to_string(self, clean: bool = True) -> str:
         query = self.__query
 
         if not query.endswith(";"):
             query += ";"
 
+        # 値にjsonをそのまま埋め込んだ時は、文字列の中身を変えないように整形しない
+        if not clean:
+            return query
+
         return (
             query
             # .replace(", ", " ")
@@ -243,3 +476,14 @@ class Query:
             .replace(",;", ";")
             .replace(";\n", ";")
         )
+
+
+_LITERALS: dict[type, Render] = {
+    Array: Query.array_literal,
+    String: Query.string_literal,
+    Bool: Query.normal_literal,
+    Record: Query.record_literal,
+    Object: Query.object_literal,
+    Datetime: Query.datetime_literal,
+    Bytes: Query.bytes_literal,
+}
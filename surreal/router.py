@@ -0,0 +1,340 @@
+from __future__ import annotations
+
+import asyncio
+import random
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any, Literal, Self
+
+import aiohttp
+
+from .utils import is_read_query, log
+
+__all__ = ("Endpoint", "Router")
+
+
+class Endpoint:
+    """接続先のノード"""
+
+    def __init__(self, url: str):
+        self.url = url.rstrip("/")
+        self.healthy = True
+        self.outstanding = 0
+        self.latency = 0.0
+        self.failures = 0
+
+    def __repr__(self) -> str:
+        return (
+            f"<Endpoint url={self.url} healthy={self.healthy} "
+            f"outstanding={self.outstanding} latency={self.latency:.4f}>"
+        )
+
+    def record_latency(self, seconds: float, alpha: float = 0.2) -> None:
+        """レイテンシの指数移動平均を更新する。"""
+        if self.latency == 0.0:
+            self.latency = seconds
+        else:
+            self.latency = alpha * seconds + (1 - alpha) * self.latency
+
+    def score(self, strategy: str) -> float:
+        if strategy == "latency":
+            # 計測前のノードも選ばれるように、最低値を入れておく
+            return max(self.latency, 1e-4) * (self.outstanding + 1)
+        return float(self.outstanding)
+
+
+class Router:
+    """複数のSurrealDBノードにリクエストを振り分ける
+
+    読み込みは正常なノードのどれかに、書き込みは ``write_host`` を指定すれば
+    そのノードに固定して送る。失敗したノードは正常でないとみなし、
+    読み込みだけのsqlは別のノードでリトライする。書き込みはリトライしない。
+
+    ``host`` を変更したインスタンスのリクエストは、そのhostがノードに含まれていなければ
+    振り分けずにそのhostに送る。
+
+    .. code-block:: python
+
+        BaseTable.router = Router(
+            ["http://db1:8000", "http://db2:8000", "http://db3:8000"],
+            write_host="http://db1:8000",
+        )
+
+    Parameters
+    ----------
+    hosts : list[str]
+        ノードのURL
+    strategy : Literal["least_outstanding", "latency"], optional
+        振り分け方法, by default "least_outstanding"
+    write_host : str | None, optional
+        書き込みを送るノード。Noneなら読み込みと同じく振り分ける, by default None
+    health_interval : float, optional
+        ヘルスチェックの間隔(秒), by default 5.0
+    timeout : float, optional
+        リクエストのタイムアウト(秒), by default 30.0
+    """
+
+    def __init__(
+        self,
+        hosts: list[str],
+        *,
+        strategy: Literal["least_outstanding", "latency"] = "least_outstanding",
+        write_host: str | None = None,
+        health_interval: float = 5.0,
+        timeout: float = 30.0,
+    ):
+        if not hosts:
+            raise Exception("hostsが空です")
+
+        self.endpoints = [Endpoint(host) for host in hosts]
+        self.strategy = strategy
+        self.write_endpoint: Endpoint | None = None
+        if write_host is not None:
+            self.write_endpoint = self._find(write_host) or Endpoint(write_host)
+
+        self.health_interval = health_interval
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self._session: aiohttp.ClientSession | None = None
+        self._raw_session: aiohttp.ClientSession | None = None
+        self._health_task: asyncio.Task | None = None
+
+    def _find(self, url: str) -> Endpoint | None:
+        for endpoint in self.endpoints:
+            if endpoint.url == url.rstrip("/"):
+                return endpoint
+        return None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=self.timeout)
+        return self._session
+
+    @property
+    def raw_session(self) -> aiohttp.ClientSession:
+        """レスポンスを自動で展開しないセッション"""
+        if self._raw_session is None or self._raw_session.closed:
+            self._raw_session = aiohttp.ClientSession(
+                timeout=self.timeout, auto_decompress=False
+            )
+        return self._raw_session
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
+
+    def start(self) -> None:
+        """ヘルスチェックを開始する。"""
+        if self._health_task is None or self._health_task.done():
+            self._health_task = asyncio.get_running_loop().create_task(
+                self._health_loop()
+            )
+
+    async def close(self) -> None:
+        """ヘルスチェックを止め、コネクションを閉じる。"""
+        if self._health_task is not None:
+            self._health_task.cancel()
+            try:
+                await self._health_task
+            except asyncio.CancelledError:
+                pass
+            self._health_task = None
+
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+        if self._raw_session is not None:
+            await self._raw_session.close()
+            self._raw_session = None
+
+    async def check(self, endpoint: Endpoint) -> bool:
+        """ノードの /health を確認する。
+
+        Parameters
+        ----------
+        endpoint : Endpoint
+            ノード
+
+        Returns
+        -------
+        bool
+            正常ならTrue
+        """
+
+        started = time.perf_counter()
+        try:
+            async with self.session.get(
+                endpoint.url + "/health",
+                timeout=aiohttp.ClientTimeout(total=self.health_interval),
+            ) as response:
+                healthy = response.status == 200
+        except (TimeoutError, aiohttp.ClientError):
+            healthy = False
+
+        if healthy:
+            endpoint.record_latency(time.perf_counter() - started)
+            endpoint.failures = 0
+        elif endpoint.healthy:
+            log.warning(f"{endpoint.url} is unhealthy")
+
+        endpoint.healthy = healthy
+        return healthy
+
+    async def _health_loop(self) -> None:
+        endpoints = list(self.endpoints)
+        if self.write_endpoint is not None and self.write_endpoint not in endpoints:
+            endpoints.append(self.write_endpoint)
+
+        while True:
+            await asyncio.gather(*(self.check(endpoint) for endpoint in endpoints))
+            await asyncio.sleep(self.health_interval)
+
+    def choose(
+        self, write: bool = False, exclude: list[Endpoint] | None = None
+    ) -> Endpoint:
+        """リクエストを送るノードを選ぶ。
+
+        Parameters
+        ----------
+        write : bool, optional
+            書き込みかどうか, by default False
+        exclude : list[Endpoint] | None, optional
+            除外するノード, by default None
+
+        Returns
+        -------
+        Endpoint
+            ノード
+
+        Raises
+        ------
+        Exception
+            選べるノードがない
+        """
+
+        exclude = exclude or []
+
+        if write and self.write_endpoint is not None:
+            if self.write_endpoint not in exclude:
+                return self.write_endpoint
+            raise Exception(f"{self.write_endpoint.url}に接続できません")
+
+        candidates = [e for e in self.endpoints if e not in exclude]
+        if not candidates:
+            raise Exception("接続できるノードがありません")
+
+        # 全て正常でない時は、ヘルスチェックが間に合っていないだけの可能性があるので全て候補にする
+        healthy = [e for e in candidates if e.healthy] or candidates
+
+        best = min(e.score(self.strategy) for e in healthy)
+        return random.choice([e for e in healthy if e.score(self.strategy) == best])
+
+    async def request(
+        self,
+        path: str,
+        data: Any,
+        headers: dict[str, str],
+        *,
+        sql: str | None = None,
+        read: Callable[[aiohttp.ClientResponse], Awaitable[Any]] | None = None,
+        host: str | None = None,
+        **kwargs: Any,
+    ) -> Any:
+        """ノードを選んでPOSTし、レスポンスのjsonを返す。
+
+        失敗した場合、読み込みだけのsqlは別のノードでリトライする。
+        書き込みは反映されている可能性があるのでリトライしない。
+
+        Parameters
+        ----------
+        path : str
+            パス。"/sql"など
+        data : Any
+            ボディ
+        headers : dict[str, str]
+            ヘッダー
+        sql : str | None, optional
+            振り分けの判定に使うsql。Noneならdataを使う, by default None
+        read : Callable[[aiohttp.ClientResponse], Awaitable[Any]] | None, optional
+            レスポンスを読む関数。指定すると自動で展開しないセッションを使う, by default None
+        host : str | None, optional
+            インスタンスで指定された接続先。ノードに含まれていなければ
+            振り分けずにそのhostに送る, by default None
+        **kwargs : Any
+            aiohttpのpostに渡す引数
+
+        Returns
+        -------
+        Any
+            レスポンス
+        """
+
+        if host is not None and not self.has(host):
+            return await self._post(Endpoint(host), path, data, headers, read, kwargs)
+
+        if self._health_task is None:
+            self.start()
+
+        write = not is_read_query(sql if sql is not None else str(data))
+        tried: list[Endpoint] = []
+        last_error: Exception | None = None
+
+        while True:
+            try:
+                endpoint = self.choose(write, tried)
+            except Exception:
+                if last_error is not None:
+                    raise last_error
+                raise
+            tried.append(endpoint)
+
+            try:
+                return await self._post(endpoint, path, data, headers, read, kwargs)
+            except aiohttp.ContentTypeError:
+                raise
+            except (TimeoutError, aiohttp.ClientError) as e:
+                endpoint.healthy = False
+                endpoint.failures += 1
+                log.warning(f"{endpoint.url}: {e!r}")
+                last_error = e
+
+                if write:
+                    raise
+                continue
+
+    def has(self, host: str) -> bool:
+        """hostがこのルーターのノードか"""
+        url = host.rstrip("/")
+        if self.write_endpoint is not None and self.write_endpoint.url == url:
+            return True
+        return self._find(url) is not None
+
+    async def _post(
+        self,
+        endpoint: Endpoint,
+        path: str,
+        data: Any,
+        headers: dict[str, str],
+        read: Callable[[aiohttp.ClientResponse], Awaitable[Any]] | None,
+        kwargs: dict[str, Any],
+    ) -> Any:
+        endpoint.outstanding += 1
+        started = time.perf_counter()
+        try:
+            session = self.session if read is None else self.raw_session
+            async with session.post(
+                endpoint.url + path, data=data, headers=headers, **kwargs
+            ) as response:
+                if read is None:
+                    result = await response.json()
+                else:
+                    result = await read(response)
+        finally:
+            endpoint.outstanding -= 1
+
+        endpoint.record_latency(time.perf_counter() - started)
+        return result
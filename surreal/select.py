@@ -0,0 +1,478 @@
+from __future__ import annotations
+
+from collections.abc import Generator
+from typing import Any, Generic, Self, TypeVar
+
+from ._types import Array, Record
+from .aggregate import Agg, GroupBy
+from .column import Column
+from .query import Query
+from .table import BaseTable
+from .utils import UNLOADED, log_res, log_select
+
+__all__ = ("Select",)
+
+T = TypeVar("T", bound=BaseTable)
+
+
+def _record_target(column: Column) -> type[BaseTable] | None:
+    """Recordカラム(またはRecordの配列)のリンク先のモデルを取得する。"""
+
+    _type = column.type
+
+    if isinstance(_type, Array):
+        _type = _type.sub_type
+
+    if not isinstance(_type, Record):
+        return None
+
+    target = _type.sub_type
+    if isinstance(target, type) and issubclass(target, BaseTable):
+        return target
+
+    return None
+
+
+def _find_column(obj: BaseTable, name: str) -> Column | None:
+    for column in obj.get_columns():
+        if column.name == name:
+            return column
+    return None
+
+
+class Select(Generic[T]):
+    """モデルを取得するSELECTのビルダー
+
+    .. code-block:: python
+
+        panels = await Panel.select("guild_id = 1").include("owner", "owner.guild")
+    """
+
+    def __init__(self, model: type[T], where: str | None = None, **options: Any):
+        self.model = model
+        self.template = model(**options)
+        self._where = where
+        self._includes: list[str] = []
+        self._batch = False
+        self._order: tuple[Column, bool] | None = None
+        self._limit: int | None = None
+        self._columns: list[Column] = []
+        self._value: Column | None = None
+        self._cache = True
+
+    def where(self, where: str) -> Self:
+        """WHERE句を設定する。"""
+        self._where = where
+        return self
+
+    def _resolve(self, column: Column | str) -> Column:
+        name = column if isinstance(column, str) else column.name
+        resolved = _find_column(self.template, str(name))
+        if resolved is None:
+            raise Exception(f"{name}は{self.model.__qualname__}のカラムではありません")
+        return resolved
+
+    def only(self, *columns: Column | str) -> Self:
+        """取得するカラムを指定する。
+
+        指定しなかったカラムの値は ``UNLOADED`` になり、
+        ``BaseTable.load_columns`` で後から取得できる。
+
+        Parameters
+        ----------
+        *columns : Column | str
+            取得するカラム、またはカラム名
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        self._columns = [self._resolve(column) for column in columns]
+        return self
+
+    def include(self, *paths: str, batch: bool = False) -> Self:
+        """Recordカラムのリンク先も一緒に取得する。
+
+        Parameters
+        ----------
+        *paths : str
+            カラム名。ドット区切りでリンク先のカラムも指定できる。
+        batch : bool, optional
+            FETCHではなく、リンク先ごとに ``SELECT * FROM [ids]`` でまとめて取得する, by default False
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        for path in paths:
+            parts = path.split(".")
+            # owner.guildの場合はownerも取得する必要がある
+            for i in range(1, len(parts) + 1):
+                prefix = ".".join(parts[:i])
+                if prefix not in self._includes:
+                    self._includes.append(prefix)
+
+        self._batch = batch
+        return self
+
+    def asc(self, column: Column) -> Self:
+        self._order = (column, True)
+        return self
+
+    def desc(self, column: Column) -> Self:
+        self._order = (column, False)
+        return self
+
+    def limit(self, limit: int) -> Self:
+        self._limit = limit
+        return self
+
+    def no_cache(self) -> Self:
+        """このSELECTでは ``BaseTable.query_cache`` を使わない。"""
+        self._cache = False
+        return self
+
+    def to_query(self) -> Query:
+        """sqlを組み立てる。
+
+        Returns
+        -------
+        Query
+            クエリ
+        """
+
+        q = Query()
+        if self._value is not None:
+            q.select_value(self.template, self._value, True)
+        else:
+            columns = list(self._columns)
+            # FETCHするカラムも取得しないと展開できない
+            for name in self._children(""):
+                column = _find_column(self.template, name)
+                if (
+                    columns
+                    and column is not None
+                    and all(c.name != column.name for c in columns)
+                ):
+                    columns.append(column)
+            q.select(self.template, True, columns)
+
+        if self._where:
+            q.where(self._where)
+
+        if self._order is not None:
+            column, is_asc = self._order
+            if is_asc:
+                q.asc(column)
+            else:
+                q.desc(column)
+
+        if self._limit is not None:
+            q.limit(self._limit)
+
+        if self._includes and not self._batch:
+            q.fetch(", ".join(self._includes))
+
+        return q
+
+    async def all(self) -> list[T]:
+        """条件に一致するレコードを全て取得する。
+
+        Returns
+        -------
+        list[T]
+            インスタンスのリスト
+        """
+
+        q = self.to_query()
+        log_select(q)
+
+        response = (await self.template.executes(q.to_string(), cache=self._cache))[
+            "result"
+        ]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        loaded: dict[str, BaseTable] = {}
+        objects = [self._hydrate(self.model, row, loaded) for row in response]
+
+        if self._includes:
+            if self._batch:
+                await self._load_batch(objects, loaded)
+            else:
+                for obj in objects:
+                    self._link(obj, "", loaded)
+
+        return objects  # type: ignore
+
+    async def first(self) -> T | None:
+        """条件に一致する最初のレコードを取得する。
+
+        Returns
+        -------
+        T | None
+            インスタンス。見つからなければNone
+        """
+
+        objects = await self.limit(1).all()
+        return objects[0] if objects else None
+
+    async def values(self, column: Column | str) -> list[Any]:
+        """1つのカラムの値だけを ``SELECT VALUE`` で取得する。
+
+        Parameters
+        ----------
+        column : Column | str
+            取得するカラム、またはカラム名
+
+        Returns
+        -------
+        list[Any]
+            値のリスト
+        """
+
+        self._value = self._resolve(column)
+        try:
+            q = self.to_query()
+        finally:
+            self._value = None
+        log_select(q)
+
+        response = (await self.template.executes(q.to_string(), cache=self._cache))[
+            "result"
+        ]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return response
+
+    def group_by(self, *columns: Column | str) -> GroupBy:
+        """GROUP BYで集計する。カラムを指定しなければGROUP ALLになる。
+
+        Parameters
+        ----------
+        *columns : Column | str
+            グループ化するカラム、またはカラム名
+
+        Returns
+        -------
+        GroupBy
+            集計のビルダー
+        """
+
+        return GroupBy(self, [self._resolve(column) for column in columns])
+
+    async def count(self) -> int:
+        """条件に一致するレコード数をデータベースで数える。
+
+        Returns
+        -------
+        int
+            レコード数
+        """
+
+        rows = await self.group_by().agg(count=Agg.count())
+        return int(rows[0]["count"]) if rows else 0
+
+    async def exists(self) -> bool:
+        """条件に一致するレコードがあるか
+
+        Returns
+        -------
+        bool
+            あればTrue
+        """
+
+        q = Query()
+        q.aggregate(self.template, ["id"])
+        if self._where:
+            q.where(self._where)
+        q.limit(1)
+        log_select(q)
+
+        response = (await self.template.executes(q.to_string(), cache=self._cache))[
+            "result"
+        ]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return bool(response)
+
+    async def explain(self, full: bool = False) -> list[dict[str, Any]]:
+        """SELECTの実行計画を取得する。どのインデックスが使われるか確認できる。
+
+        Parameters
+        ----------
+        full : bool, optional
+            EXPLAIN FULLにする, by default False
+
+        Returns
+        -------
+        list[dict[str, Any]]
+            実行計画
+        """
+
+        q = self.to_query()
+        q.explain(full)
+        log_select(q)
+
+        response = (await self.template.executes(q.to_string(), cache=self._cache))[
+            "result"
+        ]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return response
+
+    def __await__(self) -> Generator[Any, None, list[T]]:
+        return self.all().__await__()
+
+    def _hydrate(
+        self, model: type[BaseTable], row: dict, loaded: dict[str, BaseTable]
+    ) -> BaseTable:
+        """レスポンスの行をインスタンスにする。同じレコードIDは同じインスタンスにする。"""
+
+        record_id = row.get("id")
+        if record_id is not None and str(record_id) in loaded:
+            return loaded[str(record_id)]
+
+        obj = model(
+            id=record_id,
+            ns=self.template.ns,
+            db=self.template.db,
+            host=self.template.host,
+        ).set_data(row)
+
+        if model is self.model and self._columns:
+            names = {column.name for column in self._columns}
+            for column in obj.get_columns():
+                if column.name not in names and column.name not in row:
+                    column.set_value(UNLOADED)
+
+        if record_id is not None:
+            loaded[str(record_id)] = obj
+
+        return obj
+
+    def _children(self, prefix: str) -> list[str]:
+        """includeのうち、prefixの直下のカラム名を取得する。"""
+
+        depth = prefix.count(".") + 1 if prefix else 0
+        names = []
+        for path in self._includes:
+            parts = path.split(".")
+            if len(parts) != depth + 1:
+                continue
+            if prefix and ".".join(parts[:depth]) != prefix:
+                continue
+            names.append(parts[-1])
+        return names
+
+    def _link(self, obj: BaseTable, prefix: str, loaded: dict[str, BaseTable]) -> None:
+        """FETCHで展開されたリンク先をモデルのインスタンスにする。"""
+
+        for name in self._children(prefix):
+            column = _find_column(obj, name)
+            if column is None:
+                continue
+
+            target = _record_target(column)
+            if target is None:
+                continue
+
+            path = f"{prefix}.{name}" if prefix else name
+            values = column.value if isinstance(column.value, list) else [column.value]
+
+            linked = []
+            for value in values:
+                if isinstance(value, dict):
+                    value = self._hydrate(target, value, loaded)
+                    self._link(value, path, loaded)
+                linked.append(value)
+
+            column.set_value(linked if isinstance(column.value, list) else linked[0])
+
+    async def _load_batch(
+        self, objects: list[BaseTable], loaded: dict[str, BaseTable]
+    ) -> None:
+        """リンク先をリンクごとに1回のSELECTでまとめて取得する。"""
+
+        level: list[tuple[BaseTable, str]] = [(obj, "") for obj in objects]
+
+        while level:
+            # 同じ階層のリンク先のIDを重複なく集める
+            pending: dict[tuple[str, type[BaseTable]], list[Column]] = {}
+            for obj, prefix in level:
+                for name in self._children(prefix):
+                    column = _find_column(obj, name)
+                    if column is None:
+                        continue
+
+                    target = _record_target(column)
+                    if target is None:
+                        continue
+
+                    path = f"{prefix}.{name}" if prefix else name
+                    pending.setdefault((path, target), []).append(column)
+
+            next_level: list[tuple[BaseTable, str]] = []
+            for (path, target), columns in pending.items():
+                ids = {
+                    str(v)
+                    for column in columns
+                    for v in (
+                        column.value
+                        if isinstance(column.value, list)
+                        else [column.value]
+                    )
+                    if isinstance(v, str) and v not in loaded
+                }
+
+                if ids:
+                    q = Query()
+                    q.select_records(sorted(ids))
+                    log_select(q)
+
+                    response = (
+                        await self.template.executes(q.to_string(), cache=self._cache)
+                    )["result"]
+                    log_res(response)
+
+                    if isinstance(response, list):
+                        for row in response:
+                            self._hydrate(target, row, loaded)
+
+                for column in columns:
+                    values = (
+                        column.value
+                        if isinstance(column.value, list)
+                        else [column.value]
+                    )
+                    linked = [loaded.get(str(v), v) for v in values]
+                    for value in linked:
+                        if isinstance(value, BaseTable):
+                            next_level.append((value, path))
+
+                    column.set_value(
+                        linked if isinstance(column.value, list) else linked[0]
+                    )
+
+            # 同じインスタンスを同じ階層で何度も辿らないようにする
+            seen: set[tuple[int, str]] = set()
+            level = []
+            for obj, prefix in next_level:
+                if (id(obj), prefix) not in seen:
+                    seen.add((id(obj), prefix))
+                    level.append((obj, prefix))
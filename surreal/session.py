@@ -0,0 +1,309 @@
+from __future__ import annotations
+
+import copy
+from typing import TYPE_CHECKING, Any, Self, TypeVar
+
+from .query import Query
+from .table import BaseTable
+from .utils import log_flush, log_res
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+__all__ = ("Session",)
+
+T = TypeVar("T", bound=BaseTable)
+
+
+def _contains(objects: list[BaseTable], obj: BaseTable) -> bool:
+    """BaseModelの==は値で比較するため、同一インスタンスかどうかで判定する。"""
+    return any(o is obj for o in objects)
+
+
+class Session:
+    """Unit of Workを管理するセッション
+
+    同じレコードIDのインスタンスは1つだけ保持し(アイデンティティマップ)、
+    追加・変更・削除されたインスタンスをflush時に1つのトランザクションとして送信する。
+
+    .. code-block:: python
+
+        async with Session() as session:
+            counter = await session.get(Counter, "abc")
+            counter.count.set_value(counter.count.value + 1)
+            session.add(Counter())
+    """
+
+    def __init__(self, *, autoflush: bool = True):
+        self.autoflush = autoflush
+        self.identity_map: dict[str, BaseTable] = {}
+        self._new: list[BaseTable] = []
+        self._deleted: list[BaseTable] = []
+        self._snapshots: dict[str, dict[str, Any]] = {}
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        if exc_type is None and self.autoflush:
+            await self.flush()
+
+        self.clear()
+
+    def _snapshot(self, obj: BaseTable) -> dict[str, Any]:
+        return {
+            str(column.name): copy.deepcopy(column.value)
+            for column in obj.get_columns()
+        }
+
+    def _key(self, obj: BaseTable) -> str | None:
+        if obj.id is None:
+            return None
+
+        return obj.table_name
+
+    def clear(self) -> None:
+        """管理しているインスタンスを全て破棄する。"""
+
+        self.identity_map.clear()
+        self._new.clear()
+        self._deleted.clear()
+        self._snapshots.clear()
+
+    def add(self, obj: BaseTable) -> BaseTable:
+        """新規作成するインスタンスを追加する。
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+
+        Returns
+        -------
+        BaseTable
+            追加したインスタンス
+        """
+
+        if not _contains(self._new, obj):
+            self._new.append(obj)
+
+        return obj
+
+    def merge(self, obj: T) -> T:
+        """既に存在するレコードのインスタンスをセッションの管理下に置く。
+
+        同じレコードIDのインスタンスがあれば、そちらを返す。
+
+        Parameters
+        ----------
+        obj : T
+            インスタンス
+
+        Returns
+        -------
+        T
+            セッションが管理するインスタンス
+
+        Raises
+        ------
+        Exception
+            idが設定されていない
+        """
+
+        key = self._key(obj)
+
+        if key is None:
+            raise Exception("idが設定されていないインスタンスはmergeできません")
+
+        if key in self.identity_map:
+            return self.identity_map[key]  # type: ignore
+
+        self.identity_map[key] = obj
+        self._snapshots[key] = self._snapshot(obj)
+        return obj
+
+    def delete(self, obj: BaseTable) -> None:
+        """削除するインスタンスを追加する。
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+
+        Raises
+        ------
+        Exception
+            追加していないインスタンスでidが設定されていない
+        """
+
+        if _contains(self._new, obj):
+            self._new = [new for new in self._new if new is not obj]
+            return
+
+        if self._key(obj) is None:
+            raise Exception("idが設定されていないインスタンスは削除できません")
+
+        if not _contains(self._deleted, obj):
+            self._deleted.append(obj)
+
+    async def get(self, model: type[T], id: str | int) -> T | None:
+        """レコードIDでインスタンスを取得する。
+
+        アイデンティティマップにあればリクエストせずにそれを返す。
+
+        Parameters
+        ----------
+        model : type[T]
+            モデル
+        id : str | int
+            レコードID
+
+        Returns
+        -------
+        T | None
+            インスタンス。見つからなければNone
+        """
+
+        obj = model(id=id)
+
+        if (key := self._key(obj)) in self.identity_map:
+            return self.identity_map[key]  # type: ignore
+
+        q = Query()
+        q.select(obj)
+
+        response = (await obj.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list) or not response:
+            return None
+
+        obj.set_data(response[0])
+        return self.merge(obj)
+
+    def is_dirty(self, obj: BaseTable) -> bool:
+        """前回読み込んだ時から値が変更されているか
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+
+        Returns
+        -------
+        bool
+            変更されていればTrue
+        """
+
+        key = self._key(obj)
+        if key is None or key not in self._snapshots:
+            return False
+
+        return self._snapshot(obj) != self._snapshots[key]
+
+    @property
+    def dirty(self) -> list[BaseTable]:
+        """変更されたインスタンス"""
+
+        return [
+            obj
+            for obj in self.identity_map.values()
+            if not _contains(self._deleted, obj) and self.is_dirty(obj)
+        ]
+
+    def _build(self) -> dict[tuple[str, str, str], tuple[Query, list[BaseTable]]]:
+        """接続先ごとにトランザクションのsqlを組み立てる。"""
+
+        batches: dict[tuple[str, str, str], tuple[Query, list[BaseTable]]] = {}
+
+        def batch(obj: BaseTable) -> Query:
+            key = (obj.route().host, obj.ns, obj.db)
+            if key not in batches:
+                q = Query()
+                q.begin()
+                batches[key] = (q, [])
+
+            q, objects = batches[key]
+            objects.append(obj)
+            return q
+
+        for obj in self._new:
+            q = batch(obj)
+            q.insert(obj)
+            for column in obj.get_columns():
+                q.add_sqlvalue(column)
+            q.end()
+
+        for obj in self.dirty:
+            snapshot = self._snapshots[obj.table_name]
+            q = batch(obj)
+            q.update(obj)
+            for column in obj.get_columns():
+                if snapshot.get(str(column.name)) != column.value:
+                    q.add_sqlvalue(column)
+            q.end()
+
+        for obj in self._deleted:
+            q = batch(obj)
+            q.delete(obj)
+            q.end()
+
+        for q, _ in batches.values():
+            q.commit()
+
+        return batches
+
+    async def flush(self) -> None:
+        """追加・変更・削除を1つのトランザクションでデータベースに反映する。
+
+        接続先ごとに1つのトランザクションになる。途中の接続先で失敗した場合、
+        COMMITできた接続先の変更は反映済みとして扱い、再度flushしても送信しない。
+
+        Raises
+        ------
+        Exception
+            トランザクションが失敗した
+        """
+
+        deleted = set(map(id, self._deleted))
+
+        for q, objects in self._build().values():
+            log_flush(q)
+
+            responses = await objects[0].execute_batch(q.to_string())
+            # BEGIN/COMMITの結果が含まれる場合は取り除く
+            if len(responses) == len(objects) + 2:
+                responses = responses[1:-1]
+
+            errors = [r["result"] for r in responses if r.get("status") == "ERR"]
+            if errors:
+                raise Exception(*errors)
+
+            for obj, response in zip(objects, responses):
+                log_res(response)
+
+                if id(obj) in deleted:
+                    self.identity_map.pop(obj.table_name, None)
+                    self._snapshots.pop(obj.table_name, None)
+                    obj.is_none = True
+                    continue
+
+                result = response["result"]
+                if isinstance(result, list) and result:
+                    obj.id = result[0].get("id", obj.id)
+                    obj.set_table_name()
+                    obj.set_data(result[0])
+
+                self.identity_map[obj.table_name] = obj
+                self._snapshots[obj.table_name] = self._snapshot(obj)
+
+            # COMMITできた分は、後の接続先で失敗しても再送しない
+            self._new = [obj for obj in self._new if not _contains(objects, obj)]
+            self._deleted = [
+                obj for obj in self._deleted if not _contains(objects, obj)
+            ]
@@ -0,0 +1,351 @@
+from __future__ import annotations
+
+import asyncio
+import bisect
+import hashlib
+from collections.abc import Awaitable, Callable, Iterable
+from typing import TYPE_CHECKING, Any, TypeVar
+
+from .query import Query
+from .utils import log, log_delete, log_insert, log_res, log_select
+
+if TYPE_CHECKING:
+    from .column import Column
+    from .table import BaseTable
+
+__all__ = ("Shard", "ShardRouter")
+
+R = TypeVar("R")
+
+
+def _hash(value: str) -> int:
+    digest = hashlib.blake2b(value.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+class Shard:
+    """シャードの接続先"""
+
+    def __init__(
+        self, name: str, *, host: str | None = None, ns: str = "same", db: str = "same"
+    ):
+        self.name = name
+        self.host = host
+        self.ns = ns
+        self.db = db
+
+    def __repr__(self) -> str:
+        return f"<Shard name={self.name} host={self.host} ns={self.ns} db={self.db}>"
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Shard) and self.options() == other.options()
+
+    def __hash__(self) -> int:
+        return hash((self.host, self.ns, self.db))
+
+    def options(self) -> dict[str, Any]:
+        """モデルに渡す接続先の設定。hostがNoneならモデルのデフォルトを使う。"""
+        options: dict[str, Any] = {"ns": self.ns, "db": self.db}
+        if self.host is not None:
+            options["host"] = self.host
+        return options
+
+
+class ShardRouter:
+    """シャードキーからシャードを決める
+
+    ``mapping`` に指定したキーはそのシャードに固定し、それ以外はコンシステントハッシュで
+    決める。シャードを追加しても移動するキーは一部だけになる。
+
+    モデルの ``__shard_key__`` にシャードキーのカラムの属性名を設定すると、インスタンスの操作は
+    送信する前にそのカラムの値でシャードに振り分けられる。クラスの操作は
+    ``Model.shard(key)`` の設定を渡すか、 ``fan_out`` で全てのシャードに送る。
+
+    .. code-block:: python
+
+        class Counter(BaseTable):
+            __shard_key__ = "guild_id"
+
+        BaseTable.shard_router = ShardRouter(
+            [Shard("a", db="guilds_a"), Shard("b", host="http://db2:8000", db="guilds_b")],
+            mapping={"123456789": "b"},
+        )
+
+        rows = await Counter.select("count > 10", **Counter.shard(guild_id)).all()
+        everything = await BaseTable.shard_router.select(Counter, "count > 10")
+
+    Parameters
+    ----------
+    shards : Iterable[Shard]
+        シャード
+    mapping : dict[str, str] | None, optional
+        シャードキーとシャード名の対応, by default None
+    vnodes : int, optional
+        ハッシュリング上の1シャードあたりの仮想ノード数, by default 64
+    """
+
+    def __init__(
+        self,
+        shards: Iterable[Shard],
+        *,
+        mapping: dict[str, str] | None = None,
+        vnodes: int = 64,
+    ):
+        self.shards = {shard.name: shard for shard in shards}
+        if not self.shards:
+            raise Exception("シャードを1つ以上指定してください")
+
+        self.mapping = {str(k): v for k, v in (mapping or {}).items()}
+        for name in self.mapping.values():
+            if name not in self.shards:
+                raise Exception(f"{name}というシャードはありません")
+
+        self.vnodes = vnodes
+        self._ring: list[tuple[int, str]] = sorted(
+            (_hash(f"{name}#{i}"), name) for name in self.shards for i in range(vnodes)
+        )
+        self._points = [point for point, _ in self._ring]
+
+    def __repr__(self) -> str:
+        return f"<ShardRouter shards={list(self.shards)} mapping={len(self.mapping)}>"
+
+    def shard_for(self, key: Any) -> Shard:
+        """シャードキーのシャードを取得する。
+
+        Parameters
+        ----------
+        key : Any
+            シャードキー
+
+        Returns
+        -------
+        Shard
+            シャード
+        """
+
+        key = str(key)
+        name = self.mapping.get(key)
+        if name is not None:
+            return self.shards[name]
+
+        i = bisect.bisect(self._points, _hash(key)) % len(self._ring)
+        return self.shards[self._ring[i][1]]
+
+    def options_for(self, key: Any) -> dict[str, Any]:
+        """シャードキーの接続先の設定を取得する。"""
+        return self.shard_for(key).options()
+
+    async def fan_out(
+        self, func: Callable[[Shard], Awaitable[R]], *, concurrency: int | None = None
+    ) -> list[R]:
+        """全てのシャードで並列に実行する。
+
+        Parameters
+        ----------
+        func : Callable[[Shard], Awaitable[R]]
+            シャードを受け取る関数
+        concurrency : int | None, optional
+            同時に実行する数。Noneなら全て同時, by default None
+
+        Returns
+        -------
+        list[R]
+            シャードごとの結果
+        """
+
+        shards = list(self.shards.values())
+        if concurrency is None:
+            return list(await asyncio.gather(*(func(shard) for shard in shards)))
+
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(shard: Shard) -> R:
+            async with semaphore:
+                return await func(shard)
+
+        return list(await asyncio.gather(*(run(shard) for shard in shards)))
+
+    async def select(
+        self,
+        model: type[BaseTable],
+        where: str | None = None,
+        *,
+        order_by: str | None = None,
+        desc: bool = False,
+        limit: int | None = None,
+    ) -> list[Any]:
+        """全てのシャードでSELECTし、結果をまとめる。
+
+        order_byを指定すると、シャードごとの結果をまとめてから並べ替える。
+        limitはシャードごとに適用してから、まとめた結果にも適用する。
+
+        Parameters
+        ----------
+        model : type[BaseTable]
+            モデル
+        where : str | None, optional
+            WHERE句, by default None
+        order_by : str | None, optional
+            並べ替えるカラム名, by default None
+        desc : bool, optional
+            降順にする, by default False
+        limit : int | None, optional
+            取得する件数, by default None
+
+        Returns
+        -------
+        list[Any]
+            インスタンス
+        """
+
+        async def run(shard: Shard) -> list[Any]:
+            select = model.select(where, **shard.options())
+            if order_by is not None:
+                column = select.template.get_column(order_by)
+                select = select.desc(column) if desc else select.asc(column)
+            if limit is not None:
+                select = select.limit(limit)
+            return await select.all()
+
+        merged = [obj for objects in await self.fan_out(run) for obj in objects]
+
+        if order_by is not None:
+            present = [o for o in merged if o.get_column(order_by).value is not None]
+            missing = [o for o in merged if o.get_column(order_by).value is None]
+            present.sort(key=lambda obj: obj.get_column(order_by).value, reverse=desc)
+            merged = present + missing
+
+        if limit is not None:
+            merged = merged[:limit]
+
+        return merged
+
+    async def rebalance(
+        self,
+        model: type[BaseTable],
+        target: ShardRouter | None = None,
+        *,
+        batch_size: int = 500,
+    ) -> int:
+        """シャードキーが別のシャードに移ったレコードを移動する。
+
+        各シャードのレコードをid順にbatch_size件ずつ読み込み、移動先のシャードに
+        ``UPSERT ... CONTENT`` で書き込んでから元のシャードから削除する。
+        書き込んだ後に失敗した場合は、もう一度実行すれば続きから移動できる。
+        移動中のキーへの書き込みは止めておくこと。
+
+        Parameters
+        ----------
+        model : type[BaseTable]
+            ``__shard_key__`` を設定したモデル
+        target : ShardRouter | None, optional
+            移動先のシャードの設定。Noneならこのルーター
+            (mappingやシャードを変更した後に使う), by default None
+        batch_size : int, optional
+            1回に読み込む件数, by default 500
+
+        Returns
+        -------
+        int
+            移動した件数
+        """
+
+        key = model.__shard_key__
+        if key is None:
+            raise Exception(f"{model.__qualname__}に__shard_key__が設定されていません")
+        if key not in model.__columns__:
+            raise Exception(f"{key}は{model.__qualname__}のカラムではありません")
+
+        target = target or self
+        sources = list(self.shards.values())
+        for shard in target.shards.values():
+            if shard not in sources:
+                sources.append(shard)
+
+        moved = 0
+        for source in sources:
+            moved += await self._move(model, key, source, target, batch_size)
+        return moved
+
+    async def _move(
+        self,
+        model: type[BaseTable],
+        key: str,
+        source: Shard,
+        target: ShardRouter,
+        batch_size: int,
+    ) -> int:
+        template = model(**source.options())
+        # route()と同じく属性名でカラムを取得する
+        column: Column = getattr(template, key)
+        last_id: str | None = None
+        moved = 0
+
+        while True:
+            q = Query()
+            q.select(template, True)
+            if last_id is not None:
+                q.where(f"id > {last_id}")
+            q.order_by("id")
+            q.limit(batch_size)
+            log_select(q)
+
+            rows = (await template.executes(q.to_string(), cache=False))["result"]
+            if not isinstance(rows, list):
+                raise Exception(rows)
+            if not rows:
+                break
+            last_id = rows[-1]["id"]
+
+            destinations: dict[Shard, list[dict[str, Any]]] = {}
+            for row in rows:
+                value = row.get(str(column.name))
+                if value is None:
+                    continue
+                destination = target.shard_for(value)
+                if destination != source:
+                    destinations.setdefault(destination, []).append(row)
+
+            for destination, batch in destinations.items():
+                await self._copy(model, destination, batch)
+
+                q = Query()
+                q.delete_records([row["id"] for row in batch])
+                q.returns("none")
+                log_delete(q)
+                res = (await template.executes(q.to_string()))["result"]
+                log_res(res)
+                if not isinstance(res, list):
+                    raise Exception(res)
+
+                moved += len(batch)
+                log.info(
+                    f"rebalance {model.__table__}: "
+                    f"{source.name} -> {destination.name} {len(batch)}"
+                )
+
+            if len(rows) < batch_size:
+                break
+
+        return moved
+
+    async def _copy(
+        self, model: type[BaseTable], destination: Shard, rows: list[dict[str, Any]]
+    ) -> None:
+        from .transfer import _Literal
+
+        template = model(**destination.options())
+        literal = _Literal(template)
+
+        q = Query()
+        for row in rows:
+            content = {k: v for k, v in row.items() if k != "id"}
+            q.upsert_content(row["id"], literal(content))
+        log_insert(q)
+
+        responses = await template.execute_batch(q.to_string(clean=False))
+        log_res(responses)
+
+        errors = [r["result"] for r in responses if r.get("status") == "ERR"]
+        if errors:
+            raise Exception(*errors)
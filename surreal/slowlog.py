@@ -0,0 +1,281 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import random
+import re
+import time
+from collections import deque
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from .utils import is_read_query, log
+
+__all__ = ("SlowQuery", "SlowQueryLog", "fingerprint", "parse_duration")
+
+Sender = Callable[[str], Awaitable[Any]]
+
+_STRING = re.compile(r"'(?:[^'\\]|\\.)*'|\"(?:[^\"\\]|\\.)*\"")
+_RECORD_ID = re.compile(r"\b(\w+):(?:⟨[^⟩]*⟩|`[^`]*`|\w+)")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:e-?\d+)?\b", re.IGNORECASE)
+_LIST = re.compile(r"\[\s*\?(?:\s*,\s*\?)*\s*\]")
+_SPACE = re.compile(r"\s+")
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ns|µs|us|ms|s|m|h)")
+_UNITS = {
+    "ns": 1e-9,
+    "µs": 1e-6,
+    "us": 1e-6,
+    "ms": 1e-3,
+    "s": 1.0,
+    "m": 60.0,
+    "h": 3600.0,
+}
+
+
+def fingerprint(sql: str) -> str:
+    """sqlからリテラルを取り除き、同じ形のクエリが同じ文字列になるようにする。
+
+    .. code-block:: python
+
+        fingerprint("SELECT * FROM counter WHERE message_id = 123;")
+        # "SELECT * FROM counter WHERE message_id = ?;"
+    """
+
+    sql = _STRING.sub("?", sql)
+    sql = _RECORD_ID.sub(r"\1:?", sql)
+    sql = _NUMBER.sub("?", sql)
+    sql = _LIST.sub("[?]", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def parse_duration(value: Any) -> float:
+    """SurrealDBのtime("1.234ms"や"1m2s"など)を秒にする。"""
+
+    if not isinstance(value, str):
+        return 0.0
+    return sum(float(n) * _UNITS[unit] for n, unit in _DURATION.findall(value))
+
+
+class SlowQuery:
+    """閾値を超えたクエリの記録
+
+    sqlにはリテラルとして個人情報などが含まれることがあるので、
+    ``include_sql`` がTrueの時だけ残す。普段はfingerprintだけを使う。
+    """
+
+    def __init__(
+        self,
+        *,
+        sql: str,
+        include_sql: bool = False,
+        host: str,
+        ns: str,
+        db: str,
+        client_time: float,
+        server_time: float,
+        rows: int,
+        payload_bytes: int,
+    ):
+        self.sql = sql if include_sql else None
+        self.fingerprint = fingerprint(sql)
+        self.host = host
+        self.ns = ns
+        self.db = db
+        self.client_time = client_time
+        self.server_time = server_time
+        self.rows = rows
+        self.payload_bytes = payload_bytes
+        self.explain: Any = None
+        self.created_at = time.time()
+
+    def __repr__(self) -> str:
+        return (
+            f"<SlowQuery client_time={self.client_time:.4f} "
+            f"server_time={self.server_time:.4f} rows={self.rows} "
+            f"fingerprint={self.fingerprint!r}>"
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        data = dict(vars(self))
+        if data["sql"] is None:
+            del data["sql"]
+        return data
+
+
+class SlowQueryLog:
+    """実行に時間がかかったクエリを記録する
+
+    クライアントで計測した時間が ``threshold`` 秒以上のクエリを、
+    リテラルを取り除いたfingerprint、サーバーのtime、行数、レスポンスの大きさと一緒に
+    WARNINGでログに出し、``handler`` に渡す。SELECTだけのクエリは
+    ``explain_rate`` の確率で、fingerprintごとに ``explain_interval`` 秒に1回まで
+    EXPLAINを実行して実行計画も記録する。EXPLAINはバックグラウンドで実行するので
+    元のクエリの応答は遅くならない。
+
+    .. code-block:: python
+
+        BaseTable.slow_query_log = SlowQueryLog(threshold=0.2, handler=print)
+
+    Parameters
+    ----------
+    threshold : float, optional
+        記録する最小の時間(秒), by default 0.5
+    explain_rate : float, optional
+        EXPLAINを実行する確率, by default 1.0
+    explain_interval : float, optional
+        同じfingerprintのEXPLAINを実行する最小の間隔(秒), by default 60.0
+    handler : Callable[[SlowQuery], Any] | None, optional
+        記録を受け取る関数, by default None
+    maxlen : int, optional
+        ``records`` に残す件数, by default 100
+    include_sql : bool, optional
+        リテラルを含むsqlをそのまま記録するか, by default False
+    """
+
+    def __init__(
+        self,
+        *,
+        threshold: float = 0.5,
+        explain_rate: float = 1.0,
+        explain_interval: float = 60.0,
+        handler: Callable[[SlowQuery], Any] | None = None,
+        maxlen: int = 100,
+        include_sql: bool = False,
+    ):
+        self.threshold = threshold
+        self.explain_rate = explain_rate
+        self.explain_interval = explain_interval
+        self.handler = handler
+        self.include_sql = include_sql
+        self.records: deque[SlowQuery] = deque(maxlen=maxlen)
+        self._explained: dict[str, float] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def observe(
+        self,
+        sql: str,
+        response: Any,
+        client_time: float,
+        *,
+        host: str,
+        ns: str,
+        db: str,
+        send: Sender,
+    ) -> SlowQuery | None:
+        """実行したクエリを確認し、閾値を超えていれば記録する。
+
+        Parameters
+        ----------
+        sql : str
+            実行したsql
+        response : Any
+            レスポンス
+        client_time : float
+            クライアントで計測した時間(秒)
+        host : str
+            接続先
+        ns : str
+            ネームスペース
+        db : str
+            データベース
+        send : Sender
+            EXPLAINを実行する関数。slow query logを通さずに送信するもの
+
+        Returns
+        -------
+        SlowQuery | None
+            記録。閾値を超えていなければNone
+        """
+
+        if client_time < self.threshold:
+            return None
+
+        statements = response if isinstance(response, list) else [response]
+        server_time = 0.0
+        rows = 0
+        for statement in statements:
+            if not isinstance(statement, dict):
+                continue
+            server_time += parse_duration(statement.get("time"))
+            if isinstance(statement.get("result"), list):
+                rows += len(statement["result"])
+
+        record = SlowQuery(
+            sql=sql,
+            include_sql=self.include_sql,
+            host=host,
+            ns=ns,
+            db=db,
+            client_time=client_time,
+            server_time=server_time,
+            rows=rows,
+            payload_bytes=len(json.dumps(response, default=str).encode()),
+        )
+        log.warning(
+            f"slow query {client_time:.3f}s (server {server_time:.3f}s, "
+            f"{rows} rows, {record.payload_bytes} bytes): {record.fingerprint}"
+        )
+
+        if self._should_explain(record, sql):
+            try:
+                task = asyncio.get_running_loop().create_task(
+                    self._explain(record, sql, send)
+                )
+            except RuntimeError:
+                self._emit(record)
+            else:
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        else:
+            self._emit(record)
+
+        return record
+
+    def _should_explain(self, record: SlowQuery, sql: str) -> bool:
+        statements = [s for s in sql.split(";") if s.strip()]
+        if len(statements) != 1 or not is_read_query(sql):
+            return False
+        if statements[0].split(None, 1)[0].upper() != "SELECT":
+            return False
+        if "EXPLAIN" in statements[0].upper():
+            return False
+
+        now = time.monotonic()
+        if now - self._explained.get(record.fingerprint, -self.explain_interval) < (
+            self.explain_interval
+        ):
+            return False
+        if random.random() >= self.explain_rate:
+            return False
+
+        self._explained[record.fingerprint] = now
+        return True
+
+    async def _explain(self, record: SlowQuery, sql: str, send: Sender) -> None:
+        sql = sql.strip().rstrip(";") + " EXPLAIN;"
+        try:
+            response = await send(sql)
+            if isinstance(response, list) and response:
+                record.explain = response[0].get("result")
+            else:
+                record.explain = response
+        except Exception as e:
+            log.warning(f"failed to explain slow query: {e!r}")
+
+        self._emit(record)
+
+    def _emit(self, record: SlowQuery) -> None:
+        self.records.append(record)
+        if self.handler is None:
+            return
+
+        try:
+            self.handler(record)
+        except Exception as e:
+            log.warning(f"slow query handler failed: {e!r}")
+
+    async def wait(self) -> None:
+        """実行中のEXPLAINが終わるまで待つ。"""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
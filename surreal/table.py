@@ -1,15 +1,44 @@
 from __future__ import annotations
 
+import asyncio
+import copy
+import json
 import os
+import time
 from datetime import datetime
-from typing import Any, Self
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, ClassVar, Literal, Self
 
 import aiohttp
 from pydantic import BaseModel, Field, model_validator
 
 from ._types import ManyResultResponseType, OneResultResponseType
+from .analyzer import Analyzer
+from .auth import TokenAuth
+from .cache import QueryCache
 from .column import Column
-from .utils import log
+from .compression import Compression
+from .index import Index
+from .router import Router
+from .slowlog import SlowQueryLog
+from .utils import (
+    MISSING,
+    UNLOADED,
+    log,
+    log_delete,
+    log_insert,
+    log_res,
+    log_select,
+    log_update,
+)
+
+if TYPE_CHECKING:
+    from .aggregate import GroupBy
+    from .changefeed import ChangeFeed
+    from .columnar import Backend, ColumnarScan
+    from .query import Query, WritePlan
+    from .select import Select
+    from .shard import ShardRouter
 
 try:
     from dotenv import load_dotenv
@@ -30,6 +59,15 @@ assert isinstance(DB, str)
 assert isinstance(USER, str)
 assert isinstance(PASSWORD, str)
 
+ReturnMode = Literal["after", "diff", "none"]
+
+
+def _owned(value: Any) -> Any:
+    """query_cacheと共有しているリストや辞書をインスタンス用にコピーする。"""
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
+
 
 class BaseTable(BaseModel):
     table_name: str = Field(default="", exclude=True)
@@ -42,6 +80,44 @@ class BaseTable(BaseModel):
     is_none: bool = Field(default=True, exclude=True)
     result_time: str = Field(default="", exclude=True)
 
+    __indexes__: ClassVar[list[Index]] = []
+    __analyzers__: ClassVar[list[Analyzer]] = []
+    router: ClassVar[Router | None] = None
+    # TokenAuth()を設定すると、Basic認証の代わりにsigninで取得したJWTを使う
+    token_auth: ClassVar[TokenAuth | None] = None
+    compression: ClassVar[Compression | None] = None
+    slow_query_log: ClassVar[SlowQueryLog | None] = None
+    query_cache: ClassVar[QueryCache | None] = None
+    shard_router: ClassVar[ShardRouter | None] = None
+    # シャードキーのカラムの属性名。shard_routerがあれば、この値で接続先を決める
+    __shard_key__: ClassVar[str | None] = None
+    __schemafull__: ClassVar[bool] = False
+    # "7d"などの変更を保持する期間。設定するとCHANGEFEEDを有効にする
+    __changefeed__: ClassVar[str | None] = None
+
+    # __pydantic_init_subclass__でクラスごとに1回だけ計算する
+    __table__: ClassVar[str] = "basetable"
+    __columns__: ClassVar[tuple[str, ...]] = ()
+    __write_plan__: ClassVar[WritePlan] = ()
+    __ddl__: ClassVar[str | None] = None
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: Any) -> None:
+        """クラス作成時にテーブル名、カラムの一覧、SETの組み立て方を計算しておく。"""
+        from .query import Query
+
+        super().__pydantic_init_subclass__(**kwargs)
+
+        cls.__table__ = cls.__qualname__.lower()
+        cls.__columns__ = tuple(
+            name
+            for name, field in cls.model_fields.items()
+            if isinstance(field.default, Column)
+        )
+        cls.__write_plan__ = Query.write_plan(
+            [(name, cls.model_fields[name].default) for name in cls.__columns__]
+        )
+        cls.__ddl__ = None
 
     def str_to_datetime(self, res: Any, key: str | None = "") -> datetime:
         """文字列からdatetime型に変換する。
@@ -84,8 +160,7 @@ class BaseTable(BaseModel):
         return list(str(self.id).split(":"))[1]
 
     def set_default(self):
-        """デフォルト値をプロパティに設定する。
-        """
+        """デフォルト値をプロパティに設定する。"""
 
         datas = self.model_dump()
 
@@ -107,18 +182,25 @@ class BaseTable(BaseModel):
                     ),
                 )
 
-    def set_schemafull(self) -> str:
+    def set_schemafull(self, changefeed: str | None = None) -> str:
         """スキーマフルに設定する。
 
+        Parameters
+        ----------
+        changefeed : str | None, optional
+            "7d"などの変更を保持する期間。指定するとCHANGEFEEDを有効にする, by default None
+
         Returns
         -------
         str
             sql
         """
 
+        if changefeed:
+            return f"DEFINE TABLE {self.table_name} SCHEMAFULL CHANGEFEED {changefeed};"
         return f"DEFINE TABLE {self.table_name} SCHEMAFULL;"
 
-    def set_table_name(self) -> "BaseTable":
+    def set_table_name(self) -> BaseTable:
         """テーブル名を設定する。
 
         Returns
@@ -127,7 +209,7 @@ class BaseTable(BaseModel):
             インスタンス
         """
 
-        self.table_name = self.__class__.__qualname__.lower()
+        self.table_name = self.__table__
 
         if self.id is not None:
             if ":" in str(self.id):
@@ -151,105 +233,1466 @@ class BaseTable(BaseModel):
 
         return self.set_table_name()
 
-    async def __request(self, sql: str, headers: dict[str, str]) -> list[dict]:
-        """sqlを実行する。
+    def get_columns(self) -> list[Column]:
+        """モデルに定義されているカラムを取得する。
+
+        Returns
+        -------
+        list[Column]
+            定義順のカラム
+        """
+
+        return [getattr(self, name) for name in self.__columns__]
+
+    def get_column(self, name: str) -> Column:
+        """カラム名からカラムを取得する。
 
         Parameters
         ----------
-        sql : str
-            実行するsql
-        headers : dict[str, str]
-            ヘッダー
+        name : str
+            カラム名
 
         Returns
         -------
-        レスポンス
+        Column
+            カラム
+
+        Raises
+        ------
+        Exception
+            カラムがない
         """
 
-        async with aiohttp.ClientSession(
-            auth=aiohttp.BasicAuth(login=self.user, password=self.password)
-        ) as session:
-            async with session.post(
-                self.host + "/sql",
-                data=sql,
-                headers=headers,
-            ) as response:
-                return await response.json()
+        for column in self.get_columns():
+            if column.name == name:
+                return column
+        raise Exception(f"{name}は{type(self).__qualname__}のカラムではありません")
 
-    async def executes(self, sql: str) -> ManyResultResponseType:
-        """sqlを実行する
+    @classmethod
+    def get_indexes(cls) -> list[Index]:
+        """カラムの ``index`` / ``unique`` と ``__indexes__`` に定義されたインデックスを取得する。
+
+        Returns
+        -------
+        list[Index]
+            インデックス
+        """
+
+        indexes = []
+        for name in cls.__columns__:
+            column: Column = cls.model_fields[name].default
+
+            if column.unique:
+                indexes.append(Index(column.name or name, unique=True))
+            elif column.index:
+                indexes.append(Index(column.name or name))
+
+            if column.search is not None:
+                indexes.append(Index.fulltext(column.name or name, column.search.name))
+
+        return indexes + list(cls.__indexes__)
+
+    @classmethod
+    def get_analyzers(cls) -> list[Analyzer]:
+        """カラムの ``search`` と ``__analyzers__`` に定義されたアナライザーを取得する。
+
+        Returns
+        -------
+        list[Analyzer]
+            名前が重複しないアナライザー
+        """
+
+        analyzers: dict[str, Analyzer] = {}
+        for name in cls.__columns__:
+            column: Column = cls.model_fields[name].default
+            if column.search is not None:
+                analyzers.setdefault(column.search.name, column.search)
+
+        for analyzer in cls.__analyzers__:
+            analyzers.setdefault(analyzer.name, analyzer)
+
+        return list(analyzers.values())
+
+    @classmethod
+    def select(cls, where: str | None = None, **options: Any) -> Select[Self]:
+        """モデルを取得するSELECTを作成する。
 
         Parameters
         ----------
-        sql : str
-            任意のsql
+        where : str | None, optional
+            WHERE句, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
 
         Returns
         -------
-        ManyResultResponseType
-            resultがリスト
+        Select[Self]
+            SELECTのビルダー
+        """
+        from .select import Select
+
+        return Select(cls, where, **options)
+
+    @classmethod
+    def changes(
+        cls,
+        since: int | datetime | None = None,
+        *,
+        checkpoint: str | Path | None = None,
+        batch_size: int = 100,
+        interval: float = 1.0,
+        follow: bool = True,
+        **options: Any,
+    ) -> ChangeFeed[Self]:
+        """CHANGEFEEDの変更を読み込む。 ``__changefeed__`` を設定したテーブルで使う。
+
+        .. code-block:: python
+
+            async for change in Counter.changes(checkpoint="counter.cursor"):
+                cache[change.record.table_name] = change.record
+
+        Parameters
+        ----------
+        since : int | datetime | None, optional
+            読み込みを始めるversionstampか日時。checkpointがあればcheckpointを優先する, by default None
+        checkpoint : str | Path | None, optional
+            読み込んだversionstampを保存するファイル, by default None
+        batch_size : int, optional
+            1回に取得する変更の数, by default 100
+        interval : float, optional
+            変更がない時に次に確認するまでの秒数, by default 1.0
+        follow : bool, optional
+            Falseなら最新の変更まで読み込んだら終了する, by default True
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        ChangeFeed[Self]
+            変更を返す非同期イテレーター
+        """
+        from .changefeed import ChangeFeed
+
+        return ChangeFeed(
+            cls,
+            since,
+            checkpoint=checkpoint,
+            batch_size=batch_size,
+            interval=interval,
+            follow=follow,
+            **options,
+        )
+
+    @classmethod
+    def columnar(
+        cls,
+        where: str | None = None,
+        *,
+        columns: list[Column | str] | None = None,
+        batch_size: int = 10000,
+        backend: Backend = "auto",
+        **options: Any,
+    ) -> ColumnarScan[Self]:
+        """SELECTの結果をカラムごとのバッファで取得する。集計やレポート用。
+
+        .. code-block:: python
+
+            async for batch in Counter.columnar(columns=["count"]):
+                total += sum(batch["count"])
+
+        Parameters
+        ----------
+        where : str | None, optional
+            WHERE句, by default None
+        columns : list[Column | str] | None, optional
+            取得するカラム。Noneなら全て, by default None
+        batch_size : int, optional
+            1回に取得する件数, by default 10000
+        backend : Backend, optional
+            "numpy"、"array"、"auto"(numpyがあればnumpy), by default "auto"
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        ColumnarScan[Self]
+            ``ColumnBatch`` を返す非同期イテレーター
+        """
+        from .columnar import ColumnarScan
+
+        return ColumnarScan(
+            cls,
+            where,
+            columns=columns,
+            batch_size=batch_size,
+            backend=backend,
+            **options,
+        )
+
+    @classmethod
+    async def count_rows(cls, where: str | None = None, **options: Any) -> int:
+        """条件に一致するレコード数をデータベースで数える。
+
+        Counterなどのcountカラムと名前が被らないようにcount_rowsにしている。
+
+        Parameters
+        ----------
+        where : str | None, optional
+            WHERE句, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        int
+            レコード数
+        """
+
+        return await cls.select(where, **options).count()
+
+    @classmethod
+    async def exists(cls, where: str | None = None, **options: Any) -> bool:
+        """条件に一致するレコードがあるか
+
+        Parameters
+        ----------
+        where : str | None, optional
+            WHERE句, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        bool
+            あればTrue
+        """
+
+        return await cls.select(where, **options).exists()
+
+    @classmethod
+    def group_by(
+        cls, *columns: Column | str, where: str | None = None, **options: Any
+    ) -> GroupBy:
+        """GROUP BYで集計する。
+
+        .. code-block:: python
+
+            rows = await Counter.group_by("message_id").agg(total=Agg.sum("count"))
+
+        Parameters
+        ----------
+        *columns : Column | str
+            グループ化するカラム。指定しなければGROUP ALL
+        where : str | None, optional
+            WHERE句, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        GroupBy
+            集計のビルダー
+        """
+
+        return cls.select(where, **options).group_by(*columns)
+
+    @classmethod
+    async def knn(
+        cls,
+        vector: Any,
+        k: int = 10,
+        *,
+        column: Column | str | None = None,
+        where: str | None = None,
+        ef: int | None = None,
+        **options: Any,
+    ) -> list[tuple[Self, float]]:
+        """ベクトルのインデックスで近いレコードをk件取得する。
+
+        距離の計算と探索はデータベースで行う。vectorはlistのほか、array.array、
+        memoryview、numpyの配列、float32のbytesを渡せる。float32のバッファは
+        float32の精度で送信する。
+
+        .. code-block:: python
+
+            for document, distance in await Document.knn(array("f", embedding), 5):
+                ...
+
+        Parameters
+        ----------
+        vector : Any
+            検索するベクトル
+        k : int, optional
+            取得する件数, by default 10
+        column : Column | str | None, optional
+            検索するカラム。ベクトルのインデックスが1つならNoneでよい, by default None
+        where : str | None, optional
+            追加の条件, by default None
+        ef : int | None, optional
+            HNSWの探索時の候補数, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Returns
+        -------
+        list[tuple[Self, float]]
+            距離が近い順のインスタンスと距離
 
         Raises
         ------
         Exception
-            エラー
+            ベクトルのインデックスがない、または複数あってcolumnが指定されていない
         """
-        headers = {
-            "Accept": "application/json",
-            "ns": self.ns,
-            "db": self.db,
-            "content-type": "application/json",
-        }
+        from .query import Query
 
-        for _ in range(5):
-            try:
-                response_data = await self.__request(sql, headers)
-                break
-            except aiohttp.ContentTypeError:
-                continue
-        else:
-            raise Exception("ContentTypeError")
+        if column is None:
+            vectors = [index for index in cls.get_indexes() if index.vector]
+            if len(vectors) != 1:
+                raise Exception("ベクトルのカラムをcolumnで指定してください")
+            column = vectors[0].columns[0]
 
-        if isinstance(response_data, dict):
-            code = response_data.get("code", 0)
-            details = response_data.get("details", "UnknownDetails")
-            information = response_data.get("information", "UnknownInformation")
-            return [code, details, information]
+        template = cls(**options)
+        if isinstance(column, str):
+            column = template.get_column(column)
 
+        q = Query()
+        q.select_knn(template)
+        condition = q.knn(column, vector, k, ef)
+        q.where(f"{condition} AND ({where})" if where else condition)
+        q.order_by("distance")
+        log_select(q)
 
-        else:
-            if isinstance(response_data, list) and isinstance(
-                response_data[0]["result"], dict
-            ):
-                log.warning(response_data)
+        response = (await template.executes(q.to_string()))["result"]
+        log_res(response)
 
-            if isinstance(response_data[0]["result"], list):
-                result_length = len(response_data[0]["result"])
-                if 1 <= result_length:
-                    if response_data[0].get("time"):
-                        self.result_time = response_data[0].get("time", "")
+        if not isinstance(response, list):
+            raise Exception(response)
 
-            return response_data[0]
+        return [
+            (cls(**options).set_data(row), float(row.get("distance") or 0.0))
+            for row in response
+        ]
 
-    async def execute(self, sql: str) -> OneResultResponseType:
-        """sqlを実行する
+    @classmethod
+    async def search(
+        cls,
+        column: Column | str,
+        text: str,
+        limit: int = 10,
+        *,
+        columns: list[Column | str] | None = None,
+        where: str | None = None,
+        highlight: tuple[str, str] | None = ("<b>", "</b>"),
+        **options: Any,
+    ) -> list[tuple[Self, float, str | None]]:
+        """SEARCHインデックスで全文検索し、スコアの高い順に取得する。
+
+        .. code-block:: python
+
+            for panel, score, title in await Panel.search("title", "rules", 5):
+                ...
 
         Parameters
         ----------
-        sql : str
-            任意のsql
+        column : Column | str
+            検索するカラム
+        text : str
+            検索する文字列
+        limit : int, optional
+            取得する件数, by default 10
+        columns : list[Column | str] | None, optional
+            取得するカラム。指定しなかったカラムは ``UNLOADED`` になる, by default None
+        where : str | None, optional
+            追加の条件, by default None
+        highlight : tuple[str, str] | None, optional
+            一致した部分を囲む文字列。Noneならハイライトしない, by default ("<b>", "</b>")
+        **options : Any
+            ns, db, hostなど接続先の設定
 
         Returns
         -------
-        OneResultResponseType
-            resultに1つだけ値が入ってる
+        list[tuple[Self, float, str | None]]
+            インスタンス、スコア、ハイライトしたカラムの値
         """
+        from .query import Query
 
-        response = await self.executes(sql)
-        return {
-            "code": response.get("code", ""),
-            "result": response.get("result", ""),  # type: ignore
-            "description": response.get("description", ""),
-            "time": response["time"],
-        }
+        template = cls(**options)
+        if isinstance(column, str):
+            column = template.get_column(column)
+
+        selected = [
+            template.get_column(c) if isinstance(c, str) else c for c in columns or []
+        ]
+
+        expressions = ["id", *(str(c.name) for c in selected)] if selected else ["*"]
+        expressions.append("search::score(1) AS score")
+        if highlight is not None:
+            prefix, suffix = (json.dumps(h, ensure_ascii=False) for h in highlight)
+            expressions.append(f"search::highlight({prefix}, {suffix}, 1) AS highlight")
+
+        q = Query()
+        q.aggregate(template, expressions)
+        condition = q.matches(column, text)
+        q.where(f"{condition} AND ({where})" if where else condition)
+        q.order_by("score", desc=True)
+        q.limit(limit)
+        log_select(q)
+
+        response = (await template.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        names = {str(c.name) for c in selected}
+        results = []
+        for row in response:
+            obj = cls(**options).set_data(row)
+            if names:
+                for c in obj.get_columns():
+                    if c.name not in names and c.name not in row:
+                        c.set_value(UNLOADED)
+            results.append((obj, float(row.get("score") or 0.0), row.get("highlight")))
+
+        return results
+
+    @classmethod
+    def shard(cls, key: Any) -> dict[str, Any]:
+        """シャードキーの接続先の設定を取得する。クラスの操作に渡す。
+
+        .. code-block:: python
+
+            rows = await Counter.select("count > 10", **Counter.shard(guild_id)).all()
+
+        Parameters
+        ----------
+        key : Any
+            シャードキー
+
+        Returns
+        -------
+        dict[str, Any]
+            ns, db, host
+
+        Raises
+        ------
+        Exception
+            shard_routerが設定されていない
+        """
+
+        if cls.shard_router is None:
+            raise Exception("shard_routerが設定されていません")
+        return cls.shard_router.options_for(key)
+
+    def route(self) -> Self:
+        """シャードキーのカラムの値で接続先を設定する。
+
+        ``shard_router`` と ``__shard_key__`` があれば、送信する前に自動で呼ばれる。
+        シャードキーの値がなければ何もしない。
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        if self.shard_router is None or self.__shard_key__ is None:
+            return self
+
+        value = getattr(self, self.__shard_key__).value
+        if value is None or value is UNLOADED:
+            return self
+
+        for key, option in self.shard_router.options_for(value).items():
+            setattr(self, key, option)
+        return self
+
+    def set_data(self, res: Any) -> Self:
+        """レスポンスのデータをカラムに設定する。
+
+        Parameters
+        ----------
+        res : Any
+            レスポンスデータ
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        if not isinstance(res, dict):
+            self.is_none = True
+            return self
+
+        self.id = res.get("id", self.id)
+        self.set_table_name()
+
+        for column in self.get_columns():
+            column.set_value(_owned(res.get(str(column.name), column.default)))
+
+        self.is_none = False
+        return self
+
+    async def load_columns(self, *columns: Column) -> Self:
+        """SELECTで取得しなかったカラムを取得する。
+
+        Parameters
+        ----------
+        *columns : Column
+            取得するカラム。指定しなければ未取得のカラムを全て取得する。
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+        from .query import Query
+
+        targets = list(columns) or [
+            column for column in self.get_columns() if not column.is_loaded
+        ]
+        if not targets:
+            return self
+
+        q = Query()
+        q.select(self, columns=targets)
+
+        response = (await self.executes(q.to_string(), cache=True))["result"]
+
+        if not isinstance(response, list) or not response:
+            raise Exception(response)
+
+        for column in targets:
+            column.set_value(_owned(response[0].get(str(column.name), column.default)))
+
+        return self
+
+    @classmethod
+    def get_ddl(cls) -> str:
+        """テーブル、カラム、インデックスを定義するsqlを取得する。
+
+        クラスの定義から1回だけ組み立て、以降は同じ文字列を返す。
+
+        Returns
+        -------
+        str
+            sql
+        """
+        from .query import Query
+
+        if cls.__ddl__ is not None:
+            return cls.__ddl__
+
+        table = cls()
+        q = Query()
+        if cls.__schemafull__:
+            q.schemafull(table, cls.__changefeed__)
+        elif cls.__changefeed__:
+            q.changefeed(table, cls.__changefeed__)
+
+        for name in cls.__columns__:
+            q.define_field(table, cls.model_fields[name].default)
+
+        for analyzer in cls.get_analyzers():
+            q.define_analyzer(analyzer)
+
+        for index in cls.get_indexes():
+            q.define_index(table, index)
+
+        cls.__ddl__ = q.to_string()
+        return cls.__ddl__
+
+    def schema_query(self) -> Query:
+        """テーブル、カラム、インデックスを定義するsqlを作成する。
+
+        Returns
+        -------
+        Query
+            クエリ
+        """
+        from .query import Query
+
+        q = Query()
+        q.original(self.get_ddl())
+        return q
+
+    async def create_table(self) -> Self:
+        """テーブルを作成する。
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
 
+        res = (await self.executes(self.schema_query().to_string()))["result"]
+        log_res(res)
+        return self
+
+    async def fetch(self) -> Self:
+        """idのレコードを取得する。
+
+        Returns
+        -------
+        Self
+            インスタンス。見つからなければis_noneがTrue
+        """
+        from .query import Query
+
+        q = Query()
+        q.select(self)
+        log_select(q)
+
+        response = (await self.executes(q.to_string(), cache=True))["result"]
+        log_res(response)
+
+        if not isinstance(response, list) or not response:
+            self.is_none = True
+            return self
+
+        return self.set_data(response[0])
+
+    def _write_query(self, q: Query) -> None:
+        q.add_values(self.__write_plan__, self)
+
+    async def insert(self) -> Self:
+        """レコードを作成する。
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+        from .query import Query
+
+        q = Query()
+        q.insert(self)
+        self._write_query(q)
+        log_insert(q)
+
+        response = (await self.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        if not response:
+            self.is_none = True
+            return self
+
+        return self.set_data(response[0])
+
+    async def update(self) -> Self:
+        """レコードを更新する。取得していないカラムは更新しない。
+
+        Returns
+        -------
+        Self
+            インスタンス。レコードがなければis_noneがTrue
+
+        Raises
+        ------
+        Exception
+            idが設定されていない
+        """
+        from .query import Query
+
+        if self.id is None:
+            raise Exception("idが設定されていないインスタンスは更新できません")
+
+        q = Query()
+        q.update(self)
+        self._write_query(q)
+        log_update(q)
+
+        response = (await self.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        if not response:
+            self.is_none = True
+            return self
+
+        return self.set_data(response[0])
+
+    async def delete(self) -> bool:
+        """レコードを削除する。
+
+        Returns
+        -------
+        bool
+            削除できたらTrue
+
+        Raises
+        ------
+        Exception
+            idが設定されていない
+        """
+        from .query import Query
+
+        if self.id is None:
+            raise Exception("idが設定されていないインスタンスは削除できません")
+
+        q = Query()
+        q.delete(self)
+        log_delete(q)
+
+        res = (await self.executes(q.to_string()))["result"]
+        log_res(res)
+
+        if not isinstance(res, list):
+            return False
+
+        self.is_none = True
+        return True
+
+    def apply_diff(self, patches: list[dict[str, Any]]) -> Self:
+        """RETURN DIFFで返ってきたJSON Patchをカラムに反映する。
+
+        カラムの値の置き換えと配列への追加以外の変更は反映できないので、
+        そのカラムは未取得にする。 ``load_columns()`` で取得し直せる。
+
+        Parameters
+        ----------
+        patches : list[dict[str, Any]]
+            JSON Patch
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        columns = {str(column.name): column for column in self.get_columns()}
+
+        for patch in patches:
+            path = str(patch.get("path", "")).lstrip("/").split("/")
+            column = columns.get(path[0])
+            if column is None:
+                continue
+
+            op = patch.get("op")
+            if len(path) == 1 and op in ("add", "replace"):
+                column.set_value(patch.get("value"))
+            elif len(path) == 1 and op == "remove":
+                column.set_value(column.default)
+            elif (
+                len(path) == 2
+                and op == "add"
+                and isinstance(column.value, list)
+                and path[1] in ("-", str(len(column.value)))
+            ):
+                column.value.append(patch.get("value"))
+            else:
+                column.set_value(UNLOADED)
+
+        self.is_none = False
+        return self
+
+    async def _returning(self, q: Query, returns: ReturnMode) -> Self:
+        """RETURN句を付けて実行し、結果をインスタンスに反映する。"""
+
+        q.returns(returns)
+        log_update(q)
+
+        response = (await self.executes(q.to_string()))["result"]
+        log_res(response)
+
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        if returns == "none":
+            return self
+
+        if not response:
+            self.is_none = True
+            return self
+
+        if returns == "diff":
+            return self.apply_diff(response[0])
+
+        return self.set_data(response[0])
+
+    async def upsert(
+        self, where: str | None = None, *, returns: ReturnMode = "after"
+    ) -> Self:
+        """レコードがあれば更新し、なければ作成する。1つのUPSERTで実行する。
+
+        idがあればそのレコードを、なければwhereに一致するレコードを対象にする。
+        ユニークなカラムで探す時はwhereを指定する。
+        値を設定したカラムだけをSETするので、設定していないカラムは既存の値のまま残る。
+
+        .. code-block:: python
+
+            counter = Counter()
+            counter.message_id.set_value(1)
+            await counter.upsert("message_id = 1")
+
+        Parameters
+        ----------
+        where : str | None, optional
+            idがない時に対象を探すWHERE句, by default None
+        returns : ReturnMode, optional
+            返す値。"after"は更新後のレコード、"diff"は差分, by default "after"
+
+        Returns
+        -------
+        Self
+            インスタンス
+
+        Raises
+        ------
+        Exception
+            idもwhereもない、または値を設定したカラムがない
+        """
+        from .query import Query
+
+        if self.id is None and where is None:
+            raise Exception("upsertにはidかwhereが必要です")
+
+        # デフォルト値のままのカラムで既存の値を上書きしない
+        attrs = [
+            attr
+            for attr in self.__columns__
+            if "value" in getattr(self, attr).model_fields_set
+        ]
+        if not attrs:
+            raise Exception("upsertするカラムの値を設定してください")
+
+        q = Query()
+        q.upsert(self)
+        q.add_values(self.__write_plan__, self, attrs)
+        if self.id is None and where is not None:
+            q.where(where)
+
+        return await self._returning(q, returns)
+
+    async def increment(
+        self,
+        column: Column,
+        amount: float = 1,
+        *,
+        returns: ReturnMode = "after",
+        create: bool = False,
+    ) -> Self:
+        """カラムの値をデータベース上で加算する。読み込まずに1回のリクエストで更新する。
+
+        Parameters
+        ----------
+        column : Column
+            加算するカラム
+        amount : int | float, optional
+            加算する値。負の値なら減算する, by default 1
+        returns : ReturnMode, optional
+            返す値。"after"は更新後のレコード、"diff"は差分, by default "after"
+        create : bool, optional
+            レコードがなければ作成するか, by default False
+
+        Returns
+        -------
+        Self
+            インスタンス。createがFalseでレコードがなければis_noneがTrue
+        """
+
+        q = self._modify_query(create)
+        q.add_increment(column, amount)
+        return await self._returning(q, returns)
+
+    async def append(
+        self,
+        column: Column,
+        value: Any,
+        *,
+        returns: ReturnMode = "after",
+        create: bool = False,
+    ) -> Self:
+        """配列のカラムにデータベース上で値を追加する。
+
+        Parameters
+        ----------
+        column : Column
+            配列のカラム
+        value : Any
+            追加する値
+        returns : ReturnMode, optional
+            返す値。"after"は更新後のレコード、"diff"は差分, by default "after"
+        create : bool, optional
+            レコードがなければ作成するか, by default False
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        q = self._modify_query(create)
+        q.add_append(column, value)
+        return await self._returning(q, returns)
+
+    async def remove(
+        self,
+        column: Column,
+        value: Any,
+        *,
+        returns: ReturnMode = "after",
+    ) -> Self:
+        """配列のカラムからデータベース上で値を削除する。
+
+        Parameters
+        ----------
+        column : Column
+            配列のカラム
+        value : Any
+            削除する値
+        returns : ReturnMode, optional
+            返す値。"after"は更新後のレコード、"diff"は差分, by default "after"
+
+        Returns
+        -------
+        Self
+            インスタンス
+        """
+
+        q = self._modify_query(False)
+        q.add_append(column, value, remove=True)
+        return await self._returning(q, returns)
+
+    def _modify_query(self, create: bool) -> Query:
+        from .query import Query
+
+        if self.id is None:
+            raise Exception("idが設定されていないインスタンスは更新できません")
+
+        q = Query()
+        if create:
+            q.upsert(self)
+        else:
+            q.update(self)
+        return q
+
+    @classmethod
+    async def insert_many(cls, objects: list[Self]) -> list[Self]:
+        """複数のレコードを1回のリクエストで作成する。
+
+        接続先ごとに1つのトランザクションで送るので、途中で失敗した場合は
+        その接続先のレコードは1件も作成されない。
+
+        Parameters
+        ----------
+        objects : list[Self]
+            作成するインスタンス
+
+        Returns
+        -------
+        list[Self]
+            作成したインスタンス
+        """
+        from .query import Query
+
+        if not objects:
+            return []
+
+        # シャードに分かれている場合は接続先ごとに送る
+        groups: dict[tuple[str, str, str], list[Self]] = {}
+        for obj in objects:
+            obj.route()
+            groups.setdefault((obj.host, obj.ns, obj.db), []).append(obj)
+
+        async def send(group: list[Self]) -> None:
+            q = Query()
+            q.begin()
+            for obj in group:
+                q.insert(obj)
+                obj._write_query(q)
+                q.end()
+            q.commit()
+            log_insert(q)
+
+            responses = await group[0].execute_batch(q.to_string())
+            log_res(responses)
+
+            # BEGIN/COMMITの結果が含まれる場合は取り除く
+            if len(responses) == len(group) + 2:
+                responses = responses[1:-1]
+
+            errors = [r["result"] for r in responses if r.get("status") == "ERR"]
+            if errors:
+                raise Exception(*errors)
+
+            for obj, response in zip(group, responses):
+                if not isinstance(response["result"], list):
+                    raise Exception(response["result"])
+                obj.set_data(response["result"][0])
+
+        await asyncio.gather(*(send(group) for group in groups.values()))
+        return objects
+
+    @classmethod
+    def _split_changes(
+        cls, changes: dict[str, Any]
+    ) -> tuple[list[Column], dict[str, Any]]:
+        """キーワード引数をカラムの変更と接続先の設定に分ける。"""
+
+        template: BaseTable = cls()
+        columns, options = [], {}
+        for key, value in changes.items():
+            if key in cls.__columns__:
+                column: Column = getattr(template, key)
+                columns.append(column.model_copy(update={"value": value}))
+            elif key in cls.model_fields:
+                options[key] = value
+            else:
+                raise Exception(f"{cls.__name__}に{key}というカラムはありません")
+
+        return columns, options
+
+    @classmethod
+    async def _where_ids(
+        cls, template: BaseTable, condition: str, last_id: str | None, batch_size: int
+    ) -> list[str]:
+        """条件に一致するidをid順にbatch_size件取得する。"""
+        from .query import Query
+
+        q = Query()
+        q.select_ids(template)
+        if last_id is None:
+            q.where(condition)
+        else:
+            q.where(f"({condition}) AND id > {last_id}")
+        q.order_by("id")
+        q.limit(batch_size)
+        log_select(q)
+
+        response = (await template.executes(q.to_string()))["result"]
+        if not isinstance(response, list):
+            raise Exception(response)
+
+        return response
+
+    @classmethod
+    async def update_where(
+        cls,
+        condition: str,
+        *,
+        returns: Literal["after", "none"] = "none",
+        batch_size: int | None = None,
+        **changes: Any,
+    ) -> list[Self]:
+        """条件に一致するレコードを1つのUPDATEでまとめて更新する。
+
+        batch_sizeを指定すると、id順にbatch_size件ずつ更新する。
+        1回のトランザクションで更新する件数を抑えたい時に使う。
+
+        .. code-block:: python
+
+            await Counter.update_where("count > 100", count=0, ns="test")
+
+        Parameters
+        ----------
+        condition : str
+            WHERE句
+        returns : Literal["after", "none"], optional
+            "after"なら更新後のレコードを返す, by default "none"
+        batch_size : int | None, optional
+            1回に更新する件数。Noneなら1回で更新する, by default None
+        **changes : Any
+            カラム名と新しい値。ns, db, hostなどは接続先の設定
+
+        Returns
+        -------
+        list[Self]
+            更新したレコード。returnsが"none"なら空
+
+        Raises
+        ------
+        Exception
+            存在しないカラムを指定した、またはUPDATEが失敗した
+        """
+        from .query import Query
+
+        columns, options = cls._split_changes(changes)
+        if not columns:
+            raise Exception("更新するカラムを指定してください")
+
+        template = cls(**options)
+        updated: list[Self] = []
+        last_id: str | None = None
+
+        while True:
+            q = Query()
+            if batch_size is None:
+                q.update(template)
+            else:
+                ids = await cls._where_ids(template, condition, last_id, batch_size)
+                if not ids:
+                    break
+                last_id = ids[-1]
+                q.update_records(ids)
+
+            for column in columns:
+                q.add_sqlvalue(column)
+            q.where(condition)
+            q.returns(returns)
+            log_update(q)
+
+            response = (await template.executes(q.to_string()))["result"]
+            log_res(response)
+
+            if not isinstance(response, list):
+                raise Exception(response)
+
+            updated.extend(cls(**options).set_data(res) for res in response)
+
+            if batch_size is None or len(ids) < batch_size:
+                break
+
+        return updated
+
+    @classmethod
+    async def delete_where(
+        cls, condition: str, *, batch_size: int | None = None, **options: Any
+    ) -> None:
+        """条件に一致するレコードを1つのDELETEでまとめて削除する。
+
+        batch_sizeを指定すると、id順にbatch_size件ずつ削除する。
+
+        Parameters
+        ----------
+        condition : str
+            WHERE句
+        batch_size : int | None, optional
+            1回に削除する件数。Noneなら1回で削除する, by default None
+        **options : Any
+            ns, db, hostなど接続先の設定
+
+        Raises
+        ------
+        Exception
+            DELETEが失敗した
+        """
+        from .query import Query
+
+        template = cls(**options)
+        last_id: str | None = None
+
+        while True:
+            q = Query()
+            if batch_size is None:
+                q.delete(template)
+            else:
+                ids = await cls._where_ids(template, condition, last_id, batch_size)
+                if not ids:
+                    break
+                last_id = ids[-1]
+                q.delete_records(ids)
+
+            q.where(condition)
+            q.returns("none")
+            log_delete(q)
+
+            response = (await template.executes(q.to_string()))["result"]
+            log_res(response)
+
+            if not isinstance(response, list):
+                raise Exception(response)
+
+            if batch_size is None or len(ids) < batch_size:
+                break
+
+    async def __post(
+        self,
+        path: str,
+        data: Any,
+        headers: dict[str, str],
+        auth: aiohttp.BasicAuth | None = None,
+    ) -> Any:
+        """POSTしてレスポンスのjsonを返す。routerがあればrouterを通す。"""
+
+        sql = data if isinstance(data, str) else None
+        read = None
+        if self.compression is not None:
+            data, headers = self.compression.encode(data, headers)
+            read = self.compression.read_json
+
+        if self.router is not None:
+            # hostを変更したインスタンスは、routerのノードでなければそのhostに送る
+            return await self.router.request(
+                path,
+                data,
+                headers,
+                sql=sql,
+                read=read,
+                host=self.host if self.host != DB else None,
+                auth=auth,
+            )
+
+        async with (
+            aiohttp.ClientSession(auth=auth, auto_decompress=read is None) as session,
+            session.post(
+                self.host + path,
+                data=data,
+                headers=headers,
+            ) as response,
+        ):
+            if read is None:
+                return await response.json()
+            return await read(response)
+
+    async def __request(self, sql: str, headers: dict[str, str]) -> list[dict]:
+        """sqlを実行する。
+
+        token_authがあれば、signinで取得したトークンで認証する。
+        トークンが使えなければBasic認証を使う。
+
+        Parameters
+        ----------
+        sql : str
+            実行するsql
+        headers : dict[str, str]
+            ヘッダー
+
+        Returns
+        -------
+        レスポンス
+        """
+
+        if self.token_auth is not None:
+            for _ in range(2):
+                token = await self.token_auth.get_token(
+                    self.host, self.user, self.password, self.ns, self.db, self.__post
+                )
+                if token is None:
+                    break
+
+                response = await self.__post(
+                    "/sql", sql, {**headers, "Authorization": f"Bearer {token}"}
+                )
+                if not (
+                    isinstance(response, dict) and response.get("code") in (401, 403)
+                ):
+                    return response
+
+                # 期限切れなどで使えなくなったトークンは破棄してsigninし直す
+                self.token_auth.invalidate(self.host, self.user, self.ns, self.db)
+
+        return await self.__post(
+            "/sql",
+            sql,
+            headers,
+            aiohttp.BasicAuth(login=self.user, password=self.password),
+        )
+
+    async def __send(self, sql: str, cache: bool = False) -> list[dict] | dict:
+        """sqlを送信し、レスポンスをそのまま返す。
+
+        query_cacheがあれば、読み込みの結果をキャッシュから返し、
+        書き込みの後に変更したテーブルのキャッシュを無効にする。
+
+        Parameters
+        ----------
+        sql : str
+            任意のsql
+        cache : bool, optional
+            Trueならキャッシュを使う, by default False
+
+        Returns
+        -------
+        list[dict] | dict
+            レスポンス
+        """
+
+        self.route()
+
+        query_cache = self.query_cache
+        if query_cache is None:
+            return await self.__send_timed(sql)
+
+        scope = (self.host, self.ns, self.db)
+        if not query_cache.is_cacheable(sql):
+            try:
+                return await self.__send_timed(sql)
+            finally:
+                query_cache.invalidate_sql(scope, sql)
+
+        if not cache:
+            return await self.__send_timed(sql)
+
+        hit = query_cache.get(scope, sql)
+        if hit is not MISSING:
+            return hit
+
+        generation = query_cache.generation(scope)
+        response_data = await self.__send_timed(sql)
+        query_cache.put(scope, sql, response_data, generation)
+        return response_data
+
+    async def __send_timed(self, sql: str) -> list[dict] | dict:
+        """sqlを送信し、レスポンスをそのまま返す。slow_query_logがあれば時間を計測する。
+
+        Parameters
+        ----------
+        sql : str
+            任意のsql
+
+        Returns
+        -------
+        list[dict] | dict
+            レスポンス
+        """
+
+        if self.slow_query_log is None:
+            return await self.__send_raw(sql)
+
+        started = time.perf_counter()
+        response_data = await self.__send_raw(sql)
+        self.slow_query_log.observe(
+            sql,
+            response_data,
+            time.perf_counter() - started,
+            host=self.host,
+            ns=self.ns,
+            db=self.db,
+            send=self.__send_raw,
+        )
+        return response_data
+
+    async def __send_raw(self, sql: str) -> list[dict] | dict:
+        """sqlを送信し、レスポンスをそのまま返す。
+
+        Parameters
+        ----------
+        sql : str
+            任意のsql
+
+        Returns
+        -------
+        list[dict] | dict
+            レスポンス
+
+        Raises
+        ------
+        Exception
+            エラー
+        """
+        headers = {
+            "Accept": "application/json",
+            "ns": self.ns,
+            "db": self.db,
+            "content-type": "application/json",
+        }
+
+        for _ in range(5):
+            try:
+                response_data = await self.__request(sql, headers)
+                break
+            except aiohttp.ContentTypeError:
+                continue
+        else:
+            raise Exception("ContentTypeError")
+
+        return response_data
+
+    async def execute_batch(
+        self, sql: str, *, cache: bool = False
+    ) -> list[ManyResultResponseType]:
+        """複数ステートメントのsqlを実行し、全ステートメントの結果を返す。
+
+        Parameters
+        ----------
+        sql : str
+            セミコロン区切りのsql
+        cache : bool, optional
+            Trueならquery_cacheを使う。書き込みのキャッシュの無効化は常に行う, by default False
+
+        Returns
+        -------
+        list[ManyResultResponseType]
+            ステートメントごとの結果
+
+        Raises
+        ------
+        Exception
+            エラー
+        """
+
+        response_data = await self.__send(sql, cache)
+
+        if isinstance(response_data, dict):
+            raise Exception(
+                response_data.get("code", 0),
+                response_data.get("details", "UnknownDetails"),
+                response_data.get("information", "UnknownInformation"),
+            )
+
+        return response_data  # type: ignore
+
+    async def executes(
+        self, sql: str, *, cache: bool = False
+    ) -> ManyResultResponseType:
+        """sqlを実行する
+
+        Parameters
+        ----------
+        sql : str
+            任意のsql
+        cache : bool, optional
+            Trueならquery_cacheを使う。書き込みのキャッシュの無効化は常に行う, by default False
+
+        Returns
+        -------
+        ManyResultResponseType
+            resultがリスト
+
+        Raises
+        ------
+        Exception
+            エラー
+        """
+        response_data = await self.__send(sql, cache)
+
+        if isinstance(response_data, dict):
+            code = response_data.get("code", 0)
+            details = response_data.get("details", "UnknownDetails")
+            information = response_data.get("information", "UnknownInformation")
+            return [code, details, information]
+
+        else:
+            if isinstance(response_data, list) and isinstance(
+                response_data[0]["result"], dict
+            ):
+                log.warning(response_data)
+
+            if isinstance(response_data[0]["result"], list):
+                result_length = len(response_data[0]["result"])
+                if 1 <= result_length:
+                    if response_data[0].get("time"):
+                        self.result_time = response_data[0].get("time", "")
+
+            return response_data[0]
+
+    async def execute(self, sql: str, *, cache: bool = False) -> OneResultResponseType:
+        """sqlを実行する
+
+        Parameters
+        ----------
+        sql : str
+            任意のsql
+        cache : bool, optional
+            Trueならquery_cacheを使う。書き込みのキャッシュの無効化は常に行う, by default False
+
+        Returns
+        -------
+        OneResultResponseType
+            resultに1つだけ値が入ってる
+        """
+
+        response = await self.executes(sql, cache=cache)
+        return {
+            "code": response.get("code", ""),
+            "result": response.get("result", ""),  # type: ignore
+            "description": response.get("description", ""),
+            "time": response["time"],
+        }
@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import asyncio
+import gzip
+import json
+import mmap
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import IO, Any
+
+from ._types import Array, Datetime, Record
+from .query import Query
+from .table import BaseTable
+from .utils import log
+
+__all__ = ("dump", "load")
+
+
+def _is_gzip(path: Path, compress: bool | None = None) -> bool:
+    if compress is not None:
+        return compress
+    return path.suffix == ".gz"
+
+
+def _open(path: Path, mode: str, compress: bool | None = None) -> IO[bytes]:
+    """gzipならgzipとして、それ以外は通常のファイルとして開く。"""
+    if _is_gzip(path, compress):
+        return gzip.open(path, mode)  # type: ignore
+    return path.open(mode)  # type: ignore
+
+
+def _datetime(value: Any) -> str:
+    """日時の文字列を文字列ではなく日時としてsqlに埋め込む。"""
+    if isinstance(value, str):
+        return f"<datetime>{json.dumps(value, ensure_ascii=False)}"
+    if isinstance(value, list):
+        return "[" + ", ".join(_datetime(v) for v in value) + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+def _raw(value: Any) -> str:
+    """レコードIDを文字列ではなくレコードIDとしてsqlに埋め込む。"""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return "[" + ", ".join(_raw(v) for v in value) + "]"
+    return json.dumps(value, ensure_ascii=False)
+
+
+class _Literal:
+    """NDJSONの行をINSERTするオブジェクトのsqlにする"""
+
+    def __init__(self, template: BaseTable):
+        self.records: set[str] = {"id"}
+        self.datetimes: set[str] = set()
+
+        for column in template.get_columns():
+            _type = column.type
+            if isinstance(_type, Array):
+                _type = _type.sub_type
+            if isinstance(_type, Record):
+                self.records.add(str(column.name))
+            elif isinstance(_type, Datetime):
+                self.datetimes.add(str(column.name))
+
+    def __call__(self, row: dict[str, Any]) -> str:
+        parts = []
+        for key, value in row.items():
+            if key in self.records and value is not None:
+                sql = _raw(value)
+            elif key in self.datetimes:
+                sql = _datetime(value)
+            else:
+                sql = json.dumps(value, ensure_ascii=False)
+
+            parts.append(f"{json.dumps(key, ensure_ascii=False)}: {sql}")
+
+        return "{" + ", ".join(parts) + "}"
+
+
+class _Checkpoint:
+    """並列に読み込んだチャンクのうち、先頭から連続して完了したところまでを保存する"""
+
+    def __init__(self, path: Path | None, source: Path, chunk_size: int):
+        self.path = path
+        self.source = str(source)
+        self.chunk_size = chunk_size
+        self.offset = 0
+        self.rows = 0
+        # 連続していない完了済みのチャンク 開始位置 -> (終了位置, 行数)
+        self.done: dict[int, tuple[int, int]] = {}
+
+        if path is not None and path.exists():
+            data = json.loads(path.read_text())
+            if (
+                data.get("source") == self.source
+                and data.get("chunk_size") == chunk_size
+            ):
+                self.offset = data["offset"]
+                self.rows = data["rows"]
+                self.done = {int(k): tuple(v) for k, v in data["done"].items()}  # type: ignore
+
+    def complete(self, start: int, end: int, rows: int) -> None:
+        self.done[start] = (end, rows)
+        while self.offset in self.done:
+            self.offset, rows = self.done.pop(self.offset)
+            self.rows += rows
+        self.save()
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(
+            json.dumps(
+                {
+                    "source": self.source,
+                    "chunk_size": self.chunk_size,
+                    "offset": self.offset,
+                    "rows": self.rows,
+                    "done": {str(k): list(v) for k, v in self.done.items()},
+                }
+            )
+        )
+        os.replace(tmp, self.path)
+
+
+def _read_chunks(
+    path: Path, start: int, chunk_size: int, compress: bool | None
+) -> Iterator[tuple[int, int, list[dict[str, Any]]]]:
+    """ファイルをチャンクごとに読み込む。圧縮されていなければmmapで読む。
+
+    Yields
+    ------
+    tuple[int, int, list[dict[str, Any]]]
+        開始位置、終了位置、行
+    """
+
+    def chunks(f: Any) -> Iterator[tuple[int, int, list[dict[str, Any]]]]:
+        f.seek(start)
+        offset = start
+        rows: list[dict[str, Any]] = []
+        while line := f.readline():
+            if line.strip():
+                rows.append(json.loads(line))
+            if len(rows) >= chunk_size:
+                end = f.tell()
+                yield offset, end, rows
+                offset, rows = end, []
+        if rows:
+            yield offset, f.tell(), rows
+
+    if _is_gzip(path, compress):
+        with gzip.open(path, "rb") as f:
+            yield from chunks(f)
+        return
+
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            yield from chunks(mm)
+
+
+async def dump(
+    model: type[BaseTable],
+    path: str | Path,
+    *,
+    batch_size: int = 1000,
+    where: str | None = None,
+    compress: bool | None = None,
+    **options: Any,
+) -> int:
+    """テーブルをNDJSONに書き出す。
+
+    idの順にbatch_size件ずつ取得するので、テーブルの大きさに関係なくメモリの使用量は一定になる。
+
+    Parameters
+    ----------
+    model : type[BaseTable]
+        モデル
+    path : str | Path
+        書き出すファイル。拡張子が.gzならgzipで圧縮する
+    batch_size : int, optional
+        1回に取得する件数, by default 1000
+    where : str | None, optional
+        WHERE句, by default None
+    compress : bool | None, optional
+        gzipで圧縮するか。Noneなら拡張子で判断する, by default None
+    **options : Any
+        ns, db, hostなど接続先の設定
+
+    Returns
+    -------
+    int
+        書き出した件数
+    """
+
+    path = Path(path)
+    template = model(**options)
+    last_id: str | None = None
+    count = 0
+
+    with _open(path, "wb", compress) as f:
+        while True:
+            q = Query()
+            q.select(template, True)
+
+            conditions = [
+                c for c in (where, f"id > {last_id}" if last_id else None) if c
+            ]
+            if conditions:
+                q.where(" AND ".join(f"({c})" for c in conditions))
+
+            q.order_by("id")
+            q.limit(batch_size)
+
+            response = (await template.executes(q.to_string(), cache=False))["result"]
+            if not isinstance(response, list):
+                raise Exception(response)
+
+            for row in response:
+                f.write(json.dumps(row, ensure_ascii=False, default=str).encode())
+                f.write(b"\n")
+
+            count += len(response)
+            log.debug(f"dump {template.__table__}: {count}")
+
+            if len(response) < batch_size:
+                break
+            last_id = response[-1]["id"]
+
+    return count
+
+
+async def load(
+    model: type[BaseTable],
+    path: str | Path,
+    *,
+    chunk_size: int = 500,
+    concurrency: int = 4,
+    checkpoint: str | Path | None = None,
+    compress: bool | None = None,
+    **options: Any,
+) -> int:
+    """NDJSONをテーブルに読み込む。
+
+    ファイルはチャンクごとに読み込み、チャンクごとに1つのINSERTにして
+    concurrency個まで並列に送信する。送信中のチャンクがconcurrency個になったら
+    ファイルの読み込みを待つ。checkpointを指定すると完了したところを保存し、
+    途中で失敗しても同じcheckpointで再開できる。
+
+    Parameters
+    ----------
+    model : type[BaseTable]
+        モデル
+    path : str | Path
+        読み込むファイル。拡張子が.gzならgzipとして読む
+    chunk_size : int, optional
+        1回のINSERTの件数, by default 500
+    concurrency : int, optional
+        並列に送信するINSERTの数, by default 4
+    checkpoint : str | Path | None, optional
+        進捗を保存するファイル, by default None
+    compress : bool | None, optional
+        gzipか。Noneなら拡張子で判断する, by default None
+    **options : Any
+        ns, db, hostなど接続先の設定
+
+    Returns
+    -------
+    int
+        読み込んだ件数(再開した場合は前回までの件数を含む)
+
+    Raises
+    ------
+    Exception
+        INSERTが失敗した
+    """
+
+    path = Path(path)
+    template = model(**options)
+    literal = _Literal(template)
+    progress = _Checkpoint(
+        Path(checkpoint) if checkpoint is not None else None, path, chunk_size
+    )
+    skip = set(progress.done)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks: set[asyncio.Task] = set()
+    errors: list[BaseException] = []
+
+    async def send(start: int, end: int, rows: list[dict[str, Any]]) -> None:
+        try:
+            q = Query()
+            q.insert_values(template, [literal(row) for row in rows])
+
+            response = await template.executes(q.to_string(clean=False), cache=False)
+            if not isinstance(response, dict) or response.get("status") == "ERR":
+                raise Exception(response)
+
+            progress.complete(start, end, len(rows))
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            semaphore.release()
+
+    for start, end, rows in _read_chunks(path, progress.offset, chunk_size, compress):
+        if start in skip:
+            continue
+
+        await semaphore.acquire()
+        if errors:
+            semaphore.release()
+            break
+
+        task = asyncio.create_task(send(start, end, rows))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    if tasks:
+        await asyncio.gather(*tasks)
+
+    if errors:
+        raise errors[0]
+
+    progress.save()
+    return progress.rows
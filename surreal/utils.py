@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import re
 from typing import TYPE_CHECKING, Any
 
 import colorama
@@ -13,14 +14,17 @@ if TYPE_CHECKING:
 
 __all__ = (
     "MISSING",
-    "validate",
+    "UNLOADED",
+    "is_read_query",
     "log",
-    "log_sql",
+    "log_delete",
+    "log_flush",
+    "log_insert",
     "log_res",
     "log_select",
-    "log_insert",
+    "log_sql",
     "log_update",
-    "log_delete",
+    "validate",
 )
 
 log = logging.getLogger(__name__)
@@ -39,11 +43,11 @@ def log_sql(q: Query, _type: str, color):
 
 def log_delsql(q: Query, _type: str, color):
     """実行するsqlのログ"""
-    log.warn(
+    log.warning(
         f"{color}======DEBUG {_type}================================================={colorama.Fore.RESET}"
     )
-    log.warn(q.to_string())
-    log.warn(
+    log.warning(q.to_string())
+    log.warning(
         f"{color}==================================================================={colorama.Fore.RESET}"
     )
 
@@ -68,11 +72,53 @@ def log_delete(q: Query):
     log_delsql(q, "DELETE", colorama.Fore.LIGHTRED_EX)
 
 
+def log_flush(q: Query):
+    """ログ"""
+    log_sql(q, "FLUSH", colorama.Fore.YELLOW)
+
+
 def log_res(res):
     """レスポンスログ"""
     log.debug(f"RESPONSE: {res}")
 
 
+_READ_STATEMENTS = ("SELECT", "INFO", "SHOW")
+_TRANSACTION_STATEMENTS = ("BEGIN", "COMMIT", "CANCEL")
+# 括弧の中のステートメントとカスタム関数は書き込みかもしれない
+_SUBQUERY = re.compile(
+    r"\(\s*(?:SELECT|CREATE|UPDATE|UPSERT|DELETE|INSERT|RELATE|LET|RETURN|DEFINE"
+    r"|REMOVE|IF|FOR|THROW)\b|\bfn::",
+    re.IGNORECASE,
+)
+
+
+def is_read_query(sql: str) -> bool:
+    """sqlが読み込みだけかどうか
+
+    SELECT、INFO、SHOWだけで、サブクエリとカスタム関数を含まない時だけTrue。
+    LETやRETURNは書き込みを含められるので書き込みとみなす。
+    判定できない場合は書き込みとみなす。
+    """
+
+    if _SUBQUERY.search(sql):
+        return False
+
+    has_statement = False
+    for statement in sql.split(";"):
+        words = statement.split(None, 1)
+        if not words:
+            continue
+
+        keyword = words[0].upper()
+        if keyword in _TRANSACTION_STATEMENTS:
+            continue
+        if keyword not in _READ_STATEMENTS:
+            return False
+        has_statement = True
+
+    return has_statement
+
+
 def validate(v: DBType, info: ValidationInfo):
     """pydantic BaseModelでstrやdictに変換できない型を定義する用"""
     return v
@@ -95,3 +141,30 @@ class _MissingSentinel:
 
 
 MISSING: Any = _MissingSentinel()
+
+
+class _UnloadedSentinel:
+    """SELECTで取得しなかったカラムの値"""
+
+    __slots__ = ()
+
+    def __eq__(self, other) -> bool:
+        return other is self
+
+    def __bool__(self) -> bool:
+        return False
+
+    def __hash__(self) -> int:
+        return 0
+
+    def __repr__(self):
+        return "<unloaded>"
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+UNLOADED: Any = _UnloadedSentinel()
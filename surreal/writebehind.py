@@ -0,0 +1,286 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from collections.abc import Callable
+from typing import Any, Self
+
+from .column import Column
+from .query import Query
+from .table import BaseTable
+from .utils import log, log_flush, log_res
+
+__all__ = ("WriteBehind",)
+
+
+class _Pending:
+    """1レコード分のまとめた変更"""
+
+    def __init__(self, obj: BaseTable):
+        self.obj = obj
+        self.sets: dict[str, Column] = {}
+        self.deltas: dict[str, tuple[Column, int | float]] = {}
+
+    def set(self, column: Column, value: Any) -> None:
+        self.sets[str(column.name)] = column.model_copy(update={"value": value})
+        self.deltas.pop(str(column.name), None)
+
+    def increment(self, column: Column, amount: float) -> None:
+        name = str(column.name)
+        if name in self.sets and isinstance(self.sets[name].value, (int, float)):
+            self.sets[name].value += amount
+            return
+
+        _, current = self.deltas.get(name, (column, 0))
+        self.deltas[name] = (column, current + amount)
+
+    def merge(self, newer: _Pending) -> None:
+        """後から来た変更を重ねる。"""
+        for name, column in newer.sets.items():
+            self.sets[name] = column
+            self.deltas.pop(name, None)
+        for column, amount in newer.deltas.values():
+            self.increment(column, amount)
+
+
+class WriteBehind:
+    """更新をメモリにためて、まとめて書き込む
+
+    同じレコードへの変更はレコードIDごとにまとめる。値の設定は最後の値だけを、
+    数値の加算は合計だけを書き込む。``interval`` 秒ごと、またはためたレコードが
+    ``max_pending`` 件になった時に、1つのトランザクションでまとめて書き込む。
+
+    耐久性と一貫性について
+
+    - flushされるまで変更はメモリにしかない。プロセスが落ちると失われるので、
+      終了時は必ず ``close()`` (または ``async with``) でflushすること。
+    - flushされるまでデータベースから読み込んだ値には変更が反映されていない。
+    - 1回のflushは接続先ごとに1つのトランザクションなので、全て反映されるか何も反映されない。
+    - flushが失敗した時、``retry`` がTrueなら変更を戻して次のflushで再送する。
+      送信後に通信が切れた場合は反映済みの可能性があり、加算が二重になることがある。
+
+    .. code-block:: python
+
+        async with WriteBehind(interval=1.0) as writes:
+            writes.increment(counter, counter.count)
+
+    Parameters
+    ----------
+    interval : float, optional
+        flushする間隔(秒), by default 1.0
+    max_pending : int, optional
+        この件数のレコードがたまったらflushする, by default 500
+    retry : bool, optional
+        flushが失敗した変更を次のflushで再送するか, by default True
+    on_error : Callable[[Exception], Any] | None, optional
+        flushが失敗した時に呼ぶ関数, by default None
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 1.0,
+        max_pending: int = 500,
+        retry: bool = True,
+        on_error: Callable[[Exception], Any] | None = None,
+    ):
+        self.interval = interval
+        self.max_pending = max_pending
+        self.retry = retry
+        self.on_error = on_error
+        self._pending: dict[str, _Pending] = {}
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        # max_pendingを超えた時のflush。実行中は新しく作らない
+        self._flush_task: asyncio.Task | None = None
+
+    async def __aenter__(self) -> Self:
+        self.start()
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        await self.close()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        """定期的なflushを開始する。"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def close(self) -> None:
+        """定期的なflushを止め、残っている変更を全て書き込む。"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._flush_task is not None:
+            await asyncio.gather(self._flush_task, return_exceptions=True)
+            self._flush_task = None
+
+        await self.flush()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            # 失敗はflushの中でログに出し、on_errorとretryで処理済み
+            with contextlib.suppress(Exception):
+                await self.flush()
+
+    def _get(self, obj: BaseTable) -> _Pending:
+        if obj.id is None:
+            raise Exception("idが設定されていないインスタンスは登録できません")
+
+        pending = self._pending.get(obj.table_name)
+        if pending is None:
+            pending = self._pending[obj.table_name] = _Pending(obj)
+        return pending
+
+    def _check_size(self) -> None:
+        if len(self._pending) < self.max_pending:
+            return
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+
+        try:
+            task = asyncio.get_running_loop().create_task(self.flush())
+        except RuntimeError:
+            return
+        self._flush_task = task
+        task.add_done_callback(lambda t: t.cancelled() or t.exception())
+
+    def set(self, obj: BaseTable, column: Column, value: Any = ...) -> None:
+        """カラムに値を設定する。同じカラムへの設定は最後の値だけを書き込む。
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+        column : Column
+            カラム
+        value : Any, optional
+            値。省略するとカラムの今の値
+        """
+
+        self._get(obj).set(column, column.value if value is ... else value)
+        self._check_size()
+
+    def increment(self, obj: BaseTable, column: Column, amount: float = 1) -> None:
+        """カラムの値に加算する。同じカラムへの加算は合計して書き込む。
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+        column : Column
+            カラム
+        amount : int | float, optional
+            加算する値, by default 1
+        """
+
+        self._get(obj).increment(column, amount)
+        self._check_size()
+
+    def pending(self, obj: BaseTable, column: Column) -> int | float:
+        """まだ書き込んでいない加算の合計を返す。
+
+        データベースから読み込んだ値にこの値を足すと、加算を反映した値になる。
+        ``set`` でためた値は含まない。
+
+        Parameters
+        ----------
+        obj : BaseTable
+            インスタンス
+        column : Column
+            カラム
+
+        Returns
+        -------
+        int | float
+            加算の合計。なければ0
+        """
+
+        item = self._pending.get(obj.table_name)
+        if item is None:
+            return 0
+        _, amount = item.deltas.get(str(column.name), (column, 0))
+        return amount
+
+    def _build(
+        self, pending: dict[str, _Pending]
+    ) -> dict[tuple[str, str, str], tuple[Query, list[_Pending]]]:
+        batches: dict[tuple[str, str, str], tuple[Query, list[_Pending]]] = {}
+
+        for item in pending.values():
+            obj = item.obj.route()
+            key = (obj.host, obj.ns, obj.db)
+            if key not in batches:
+                q = Query()
+                q.begin()
+                batches[key] = (q, [])
+
+            q, items = batches[key]
+            items.append(item)
+
+            q.update(obj)
+            for column in item.sets.values():
+                q.add_sqlvalue(column)
+            for column, amount in item.deltas.values():
+                q.add_increment(column, amount)
+            q.end()
+
+        for q, _ in batches.values():
+            q.commit()
+
+        return batches
+
+    async def flush(self) -> None:
+        """ためた変更を書き込む。
+
+        Raises
+        ------
+        Exception
+            書き込みが失敗した
+        """
+
+        async with self._lock:
+            pending, self._pending = self._pending, {}
+            if not pending:
+                return
+
+            error: Exception | None = None
+            for q, items in self._build(pending).values():
+                log_flush(q)
+                try:
+                    responses = await items[0].obj.execute_batch(q.to_string())
+                    log_res(responses)
+
+                    errors = [
+                        r["result"] for r in responses if r.get("status") == "ERR"
+                    ]
+                    if errors:
+                        raise Exception(*errors)
+                except Exception as e:
+                    log.warning(f"write behind flush failed: {e!r}")
+                    error = e
+                    if self.retry:
+                        self._requeue(items)
+
+            if error is not None:
+                if self.on_error is not None:
+                    self.on_error(error)
+                raise error
+
+    def _requeue(self, items: list[_Pending]) -> None:
+        """失敗した変更を、その後に来た変更の前に戻す。"""
+        for item in items:
+            key = item.obj.table_name
+            newer = self._pending.get(key)
+            if newer is not None:
+                item.merge(newer)
+            self._pending[key] = item
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import os
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+
+# surreal.tableはimport時に接続先の環境変数を確認する
+os.environ.setdefault("SurrealDB_HOST", "http://localhost:8000")
+os.environ.setdefault("SurrealDB_USER", "root")
+os.environ.setdefault("SurrealDB_PASSWORD", "root")
+
+from surreal import BaseTable
+
+Handler = Callable[[str], Any]
+
+
+def statements(sql: str) -> list[str]:
+    return [s.strip() for s in sql.split(";") if s.strip()]
+
+
+class FakeDB:
+    """送信されたsqlを記録し、handlerの結果をレスポンスとして返す"""
+
+    def __init__(self):
+        self.sent: list[str] = []
+        self.handler: Handler | None = None
+
+    def respond(self, handler: Handler) -> None:
+        self.handler = handler
+
+    async def send(self, sql: str) -> Any:
+        self.sent.append(sql)
+        if self.handler is not None:
+            return self.handler(sql)
+
+        return [
+            {"result": [], "status": "OK", "time": "1ms"}
+            for s in statements(sql)
+            if s.split(None, 1)[0].upper() not in ("BEGIN", "COMMIT", "CANCEL")
+        ]
+
+
+@pytest.fixture
+def db(monkeypatch: pytest.MonkeyPatch) -> FakeDB:
+    """HTTPの代わりにFakeDBへ送信する"""
+
+    fake = FakeDB()
+
+    async def send_raw(self: BaseTable, sql: str) -> Any:
+        return await fake.send(sql)
+
+    monkeypatch.setattr(BaseTable, "_BaseTable__send_raw", send_raw)
+    monkeypatch.setattr(BaseTable, "query_cache", None)
+    return fake
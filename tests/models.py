@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from typing import ClassVar
+
+from surreal import BaseTable, Column, Index
+from surreal._types import Array, Bool, Datetime, Float, Int, Record, String
+
+
+class Counter(BaseTable):
+    message_id: Column[int] = Column(name="message_id", type=Int(), index=True)
+    count: Column[int] = Column(name="count", type=Int(), default=0)
+    tags: Column[list[str]] = Column(name="tags", type=Array(String()))
+
+
+class Reading(BaseTable):
+    value: Column[float] = Column(name="value", type=Float())
+    at: Column[str] = Column(name="at", type=Datetime())
+    ok: Column[bool] = Column(name="ok", type=Bool())
+
+
+class Member(BaseTable):
+    # 属性名とカラム名が違うシャードキー
+    __shard_key__ = "guild"
+
+    guild: Column[str] = Column(name="guild_id", type=String())
+    count: Column[int] = Column(name="count", type=Int(), default=0)
+
+
+class Event(BaseTable):
+    at: Column[str] = Column(name="at", type=Datetime())
+    times: Column[list[str]] = Column(name="times", type=Array(Datetime()))
+    owner: Column[str] = Column(name="owner", type=Record("counter"))
+
+
+class Document(BaseTable):
+    __indexes__: ClassVar[list[Index]] = [Index.hnsw("embedding", dimension=3, efc=150)]
+
+    embedding: Column[list[float]] = Column(name="embedding", type=Array(Float()))
+
+
+class Guild(BaseTable):
+    name: Column[str] = Column(name="name", type=String())
+
+
+class Owner(BaseTable):
+    name: Column[str] = Column(name="name", type=String())
+    guild: Column[str] = Column(name="guild", type=Record(Guild))
+
+
+class Panel(BaseTable):
+    title: Column[str] = Column(name="title", type=String())
+    owner: Column[str] = Column(name="owner", type=Record(Owner))
+    count: Column[int] = Column(name="count", type=Int(), default=0)
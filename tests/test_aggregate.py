@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from conftest import FakeDB
+from models import Counter
+
+from surreal import Agg
+
+
+def test_group_by_sql():
+    q = Counter.group_by("message_id", where="count > 1").to_query(
+        total=Agg.sum("count"), n=Agg.count()
+    )
+
+    assert q.to_string() == (
+        "SELECT message_id, math::sum(count) AS total, count() AS n FROM counter"
+        " WHERE count > 1  GROUP BY message_id ;"
+    )
+
+
+def test_group_all_without_columns():
+    q = Counter.select().group_by().to_query(avg=Agg.avg("count"), hi=Agg.max("count"))
+
+    assert q.to_string() == (
+        "SELECT math::mean(count) AS avg, math::max(count) AS hi FROM counter"
+        " GROUP ALL ;"
+    )
+
+
+def test_agg_returns_rows_as_dicts(db: FakeDB):
+    rows = [{"message_id": 1, "total": 3}, {"message_id": 2, "total": 5}]
+    db.respond(lambda sql: [{"result": rows, "status": "OK"}])
+
+    result = asyncio.run(Counter.group_by("message_id").agg(total=Agg.sum("count")))
+
+    assert result == rows
+    assert db.sent == [
+        "SELECT message_id, math::sum(count) AS total FROM counter GROUP BY message_id ;"
+    ]
+
+
+def test_agg_raises_on_error(db: FakeDB):
+    db.respond(lambda sql: [{"result": "bad query", "status": "ERR"}])
+
+    with pytest.raises(Exception, match="bad query"):
+        asyncio.run(Counter.group_by().agg(n=Agg.count()))
+
+
+def test_count_uses_group_all(db: FakeDB):
+    db.respond(lambda sql: [{"result": [{"count": 4}], "status": "OK"}])
+
+    assert asyncio.run(Counter.count_rows("count > 1")) == 4
+    assert db.sent == [
+        "SELECT count() AS count FROM counter WHERE count > 1  GROUP ALL ;"
+    ]
+
+
+def test_count_of_no_rows_is_zero(db: FakeDB):
+    assert asyncio.run(Counter.select().count()) == 0
+
+
+@pytest.mark.parametrize(
+    ("rows", "expected"), [([{"id": "counter:a"}], True), ([], False)]
+)
+def test_exists_selects_one_id(db: FakeDB, rows: list[dict], expected: bool):
+    db.respond(lambda sql: [{"result": rows, "status": "OK"}])
+
+    assert asyncio.run(Counter.exists("message_id = 1")) is expected
+    assert db.sent == ["SELECT id FROM counter WHERE message_id = 1  LIMIT 1 ;"]
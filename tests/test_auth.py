@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import base64
+import json
+import time
+
+import pytest
+
+from surreal import BaseTable, Token, TokenAuth
+
+
+def jwt(payload: str) -> str:
+    encoded = base64.urlsafe_b64encode(payload.encode()).rstrip(b"=").decode()
+    return f"header.{encoded}.signature"
+
+
+def test_token_auth_is_opt_in():
+    assert BaseTable.token_auth is None
+
+
+def test_from_jwt_uses_issued_lifetime():
+    # サーバーの時計が1時間進んでいても、有効期間の600秒で判断する
+    iat = time.time() + 3600
+    token = Token.from_jwt(jwt(json.dumps({"iat": iat, "exp": iat + 600})), 60)
+
+    assert token.expires_in() == pytest.approx(600, abs=1)
+    assert token.is_fresh(60)
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "not a jwt",
+        jwt("[1, 2, 3]"),
+        jwt('"exp"'),
+        jwt("{broken"),
+        "header.\xff\xfe.signature",
+        "header." + base64.urlsafe_b64encode(b"\xff\xfe").decode() + ".signature",
+    ],
+)
+def test_from_jwt_falls_back_to_default_ttl(value: str):
+    token = Token.from_jwt(value, 120)
+
+    assert token.expires_in() == pytest.approx(120, abs=1)
+
+
+def test_token_is_refreshed_before_expiry():
+    token = Token("t", time.time() + 30)
+    # 1時間前に発行されたトークン
+    token.lifetime = 3600
+
+    assert not token.is_fresh(60)
+    assert token.is_fresh(10)
+
+
+def test_expired_token_is_not_fresh():
+    token = Token("t", time.time() - 10)
+
+    assert not token.is_fresh(60)
+
+
+def test_from_jwt_without_iat_uses_exp():
+    exp = time.time() + 300
+    token = Token.from_jwt(jwt(json.dumps({"exp": exp})), 60)
+
+    assert token.expires_at == exp
+
+
+@pytest.mark.parametrize("claims", [{}, {"exp": "soon"}, {"iat": 1}])
+def test_from_jwt_without_numeric_exp_uses_default_ttl(claims: dict):
+    token = Token.from_jwt(jwt(json.dumps(claims)), 120)
+
+    assert token.expires_in() == pytest.approx(120, abs=1)
+
+
+def test_get_token_signs_in_once_and_refreshes_near_expiry():
+    sent: list[tuple[str, dict]] = []
+    tokens = iter([jwt(json.dumps({"exp": 1})), jwt("{}")])
+
+    async def send(path: str, body: str, headers: dict[str, str]) -> dict:
+        sent.append((path, json.loads(body)))
+        return {"token": next(tokens)}
+
+    auth = TokenAuth(level="database", refresh_margin=60, default_ttl=3600)
+
+    async def main() -> list[str | None]:
+        return [await auth.get_token("h", "u", "p", "ns", "db", send) for _ in range(3)]
+
+    first, second, third = asyncio.run(main())
+
+    # 期限切れのトークンはすぐに更新し、expのないトークンはdefault_ttlまで使う
+    assert first != second == third
+    assert sent == [("/signin", {"user": "u", "pass": "p", "ns": "ns", "db": "db"})] * 2
+
+
+def test_failed_signin_falls_back_to_basic_auth():
+    calls = 0
+
+    async def send(path: str, body: str, headers: dict[str, str]) -> dict:
+        nonlocal calls
+        calls += 1
+        return {"details": "bad credentials"}
+
+    auth = TokenAuth(retry_after=300)
+
+    async def main() -> list[str | None]:
+        return [await auth.get_token("h", "u", "p", "ns", "db", send) for _ in range(2)]
+
+    assert asyncio.run(main()) == [None, None]
+    assert calls == 1
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from conftest import FakeDB
+from models import Counter
+
+from surreal import BaseTable, QueryCache, read_tables, written_tables
+
+ROW = {"id": "counter:a", "message_id": 1, "count": 2, "tags": ["x"]}
+
+
+@pytest.fixture
+def cache(db: FakeDB, monkeypatch: pytest.MonkeyPatch) -> QueryCache:
+    def respond(sql: str) -> list[dict]:
+        if sql.startswith("SELECT"):
+            return [{"result": [ROW], "status": "OK"}]
+        return [{"result": [], "status": "OK"}]
+
+    db.respond(respond)
+    query_cache = QueryCache()
+    monkeypatch.setattr(BaseTable, "query_cache", query_cache)
+    return query_cache
+
+
+def selects(db: FakeDB) -> list[str]:
+    return [sql for sql in db.sent if sql.startswith("SELECT")]
+
+
+def test_fetch_is_cached_and_hydration_copies(db: FakeDB, cache: QueryCache):
+    async def main() -> None:
+        first = await Counter(id="a").fetch()
+        first.tags.value.append("changed")
+
+        second = await Counter(id="a").fetch()
+        assert second.tags.value == ["x"]
+
+    asyncio.run(main())
+
+    assert len(selects(db)) == 1
+    assert cache.hits == 1
+
+
+def test_executes_does_not_use_cache_by_default(db: FakeDB, cache: QueryCache):
+    async def main() -> None:
+        counter = Counter(id="a")
+        await counter.executes("SELECT * FROM counter:a;")
+        await counter.executes("SELECT * FROM counter:a;")
+
+    asyncio.run(main())
+
+    assert len(selects(db)) == 2
+    assert len(cache) == 0
+
+
+def test_write_invalidates_only_the_written_table(db: FakeDB, cache: QueryCache):
+    async def main() -> None:
+        counter = Counter(id="a")
+        await counter.fetch()
+        await counter.executes("SELECT * FROM panel;", cache=True)
+
+        await counter.executes("UPDATE counter:a SET count = 3;")
+
+        await counter.fetch()
+        await counter.executes("SELECT * FROM panel;", cache=True)
+
+    asyncio.run(main())
+
+    assert selects(db) == [
+        "SELECT * FROM counter:a;",
+        "SELECT * FROM panel;",
+        "SELECT * FROM counter:a;",
+    ]
+
+
+def test_read_only_statements_do_not_invalidate(db: FakeDB, cache: QueryCache):
+    async def main() -> None:
+        counter = Counter(id="a")
+        await counter.fetch()
+        await counter.executes("SELECT * FROM panel;", cache=True)
+
+        await counter.executes("SHOW CHANGES FOR TABLE counter SINCE 1;")
+        await counter.executes("INFO FOR DB;")
+
+    asyncio.run(main())
+
+    assert len(cache) == 2
+
+
+def test_record_link_reads_are_invalidated_by_any_write():
+    assert read_tables("SELECT owner.name FROM panel;") == {"*"}
+    assert read_tables("SELECT ->likes->post FROM user;") == {"*"}
+    assert read_tables("SELECT * FROM panel WHERE name = 'a.b' AND x = 1.5;") == {
+        "panel"
+    }
+    assert written_tables("SHOW CHANGES FOR TABLE counter SINCE 1;") == set()
+    assert written_tables("UPDATE counter:a SET count = 1;SELECT * FROM panel;") == {
+        "counter"
+    }
@@ -0,0 +1,84 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from datetime import UTC, datetime
+from pathlib import Path
+
+from conftest import FakeDB
+from models import Counter
+
+from surreal import Change
+
+ENTRIES = [
+    {
+        "versionstamp": 3,
+        "changes": [
+            {"define_table": {"name": "counter"}},
+            {"update": {"id": "counter:a", "message_id": 1, "count": 2}},
+        ],
+    },
+    {"versionstamp": 5, "changes": [{"delete": {"id": "counter:b"}}]},
+]
+
+
+def read_all(**kwargs) -> list[Change[Counter]]:
+    async def main() -> list[Change[Counter]]:
+        return [change async for change in Counter.changes(follow=False, **kwargs)]
+
+    return asyncio.run(main())
+
+
+def test_checkpoint_stores_next_versionstamp(db: FakeDB, tmp_path: Path):
+    db.respond(lambda sql: [{"result": ENTRIES, "status": "OK"}])
+    checkpoint = tmp_path / "counter.json"
+
+    changes = read_all(checkpoint=checkpoint, batch_size=10)
+
+    assert db.sent == ["SHOW CHANGES FOR TABLE counter SINCE 0 LIMIT 10;"]
+    assert [(c.kind, c.versionstamp, c.record.id) for c in changes] == [
+        ("update", 3, "counter:a"),
+        ("delete", 5, "counter:b"),
+    ]
+    assert changes[0].record.count.value == 2
+    # 最後に読み込んだversionstampの次から読み込む
+    assert json.loads(checkpoint.read_text()) == {"table": "counter", "versionstamp": 6}
+
+
+def test_resumes_from_checkpoint(db: FakeDB, tmp_path: Path):
+    checkpoint = tmp_path / "counter.json"
+    checkpoint.write_text(json.dumps({"table": "counter", "versionstamp": 6}))
+
+    assert read_all(checkpoint=checkpoint, since=1) == []
+    assert db.sent == ["SHOW CHANGES FOR TABLE counter SINCE 6 LIMIT 100;"]
+
+
+def test_checkpoint_of_another_table_is_ignored(db: FakeDB, tmp_path: Path):
+    checkpoint = tmp_path / "counter.json"
+    checkpoint.write_text(json.dumps({"table": "panel", "versionstamp": 6}))
+
+    read_all(checkpoint=checkpoint, since=2)
+
+    assert db.sent == ["SHOW CHANGES FOR TABLE counter SINCE 2 LIMIT 100;"]
+
+
+def test_full_batch_is_followed_by_another_fetch(db: FakeDB):
+    def respond(sql: str) -> list[dict]:
+        entries = ENTRIES[:1] if "SINCE 0" in sql else []
+        return [{"result": entries, "status": "OK"}]
+
+    db.respond(respond)
+
+    assert len(read_all(batch_size=1)) == 1
+    assert db.sent == [
+        "SHOW CHANGES FOR TABLE counter SINCE 0 LIMIT 1;",
+        "SHOW CHANGES FOR TABLE counter SINCE 4 LIMIT 1;",
+    ]
+
+
+def test_since_datetime_is_sent_as_utc_literal(db: FakeDB):
+    read_all(since=datetime(2024, 1, 2, 3, 4, 5, tzinfo=UTC))
+
+    assert db.sent == [
+        'SHOW CHANGES FOR TABLE counter SINCE d"2024-01-02T03:04:05Z" LIMIT 100;'
+    ]
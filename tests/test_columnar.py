@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+from array import array
+from datetime import UTC, datetime
+
+import pytest
+from conftest import FakeDB
+from models import Counter, Reading
+
+from surreal import ColumnBatch
+
+READINGS = [
+    {"id": "reading:1", "value": 1.5, "at": "2024-01-01T00:00:00Z", "ok": True},
+    {"id": "reading:2", "value": None, "at": "2024-01-01T00:00:01.5Z", "ok": False},
+    {"id": "reading:3", "value": 3, "at": None, "ok": None},
+]
+
+
+def scan(db: FakeDB, model: type, rows: list[dict], **kwargs) -> list[ColumnBatch]:
+    def respond(sql: str) -> list[dict]:
+        return [{"result": rows if "id >" not in sql else [], "status": "OK"}]
+
+    db.respond(respond)
+    return asyncio.run(model.columnar(**kwargs).collect())
+
+
+def test_scan_pages_by_id(db: FakeDB):
+    batches = scan(db, Reading, READINGS, backend="array", batch_size=3)
+
+    assert db.sent == [
+        "SELECT id, value, at, ok FROM reading ORDER BY id ASC  LIMIT 3 ;",
+        (
+            "SELECT id, value, at, ok FROM reading WHERE (id > reading:3)"
+            "  ORDER BY id ASC  LIMIT 3 ;"
+        ),
+    ]
+    assert len(batches) == 1
+
+
+def test_array_backend(db: FakeDB):
+    [batch] = scan(db, Reading, READINGS, backend="array")
+
+    assert batch.ids == ["reading:1", "reading:2", "reading:3"]
+    assert batch["value"] == array("d", [1.5, 0, 3])
+    assert list(batch.nulls["value"]) == [1, 0, 1]
+    assert batch["at"][1] - batch["at"][0] == 1_500_000
+    assert list(batch["ok"]) == [1, 0, 0]
+    assert list(batch.nulls["ok"]) == [1, 1, 0]
+
+
+@pytest.mark.parametrize("odd", [2.5, "many", [1]])
+def test_value_that_does_not_fit_falls_back_to_list(db: FakeDB, odd: object):
+    rows = [
+        {"id": "counter:1", "count": 1},
+        {"id": "counter:2", "count": None},
+        {"id": "counter:3", "count": odd},
+        {"id": "counter:4", "count": 4},
+    ]
+
+    [batch] = scan(db, Counter, rows, columns=["count"], backend="auto")
+
+    assert batch["count"] == [1, None, odd, 4]
+    assert "count" not in batch.nulls
+
+
+def test_datetime_falls_back_to_datetimes(db: FakeDB):
+    rows = [
+        {"id": "reading:1", "at": "2024-01-01T00:00:00Z"},
+        {"id": "reading:2", "at": "not a date"},
+    ]
+
+    [batch] = scan(db, Reading, rows, columns=["at"], backend="array")
+
+    assert batch["at"] == [datetime(2024, 1, 1, tzinfo=UTC), "not a date"]
+
+
+def test_numpy_backend(db: FakeDB):
+    numpy = pytest.importorskip("numpy")
+
+    [batch] = scan(db, Reading, READINGS, backend="numpy")
+
+    assert batch["value"].dtype == numpy.float64
+    assert batch["ok"].dtype == bool
+    assert batch["at"][0] == numpy.datetime64("2024-01-01T00:00:00", "us")
+    assert batch.nulls["value"].tolist() == [True, False, True]
+
+
+def test_to_arrow(db: FakeDB):
+    pyarrow = pytest.importorskip("pyarrow")
+
+    [batch] = scan(db, Reading, READINGS, backend="array")
+    record_batch = batch.to_arrow()
+
+    assert record_batch.schema.field("value").type == pyarrow.float64()
+    assert record_batch.schema.field("at").type == pyarrow.timestamp("us", tz="UTC")
+    assert record_batch.column("value").to_pylist() == [1.5, None, 3.0]
+    assert record_batch.column("ok").to_pylist() == [True, False, None]
+
+
+def test_to_arrow_with_numpy_and_fallback(db: FakeDB):
+    pytest.importorskip("numpy")
+    pyarrow = pytest.importorskip("pyarrow")
+
+    rows = [{"id": "counter:1", "count": 1}, {"id": "counter:2", "count": 2.5}]
+    [batch] = scan(db, Counter, rows, columns=["count"], backend="numpy")
+    record_batch = batch.to_arrow()
+
+    assert record_batch.schema.field("count").type == pyarrow.float64()
+    assert record_batch.column("count").to_pylist() == [1.0, 2.5]
@@ -0,0 +1,86 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+
+import pytest
+
+from surreal import Compression
+
+SQL = ("SELECT * FROM counter WHERE message_id = 1;" * 100).encode()
+
+
+class FakeContent:
+    def __init__(self, body: bytes, size: int):
+        self.body = body
+        self.size = size
+
+    async def iter_chunked(self, n: int) -> AsyncIterator[bytes]:
+        # 小さいチャンクに分けて、途中で切れた圧縮データの展開も確かめる
+        for i in range(0, len(self.body), self.size):
+            yield self.body[i : i + self.size]
+
+
+class FakeResponse:
+    content_type = "application/json"
+
+    def __init__(self, body: bytes, encoding: str | None = None, size: int = 7):
+        self.headers = {"Content-Encoding": encoding} if encoding else {}
+        self.content = FakeContent(body, size)
+
+
+@pytest.mark.parametrize("algorithm", ["gzip", "deflate"])
+def test_encode_and_read_json_round_trip(algorithm: str):
+    compression = Compression(algorithm, threshold=100)  # type: ignore[arg-type]
+
+    body, headers = compression.encode(SQL.decode(), {"Accept": "application/json"})
+
+    assert headers["Content-Encoding"] == algorithm
+    assert headers["Accept"] == "application/json"
+    assert len(body) < len(SQL)
+
+    payload = json.dumps([{"result": SQL.decode(), "status": "OK"}]).encode()
+    compressed = compression.compress(payload)
+    result = asyncio.run(compression.read_json(FakeResponse(compressed, algorithm)))  # type: ignore[arg-type]
+
+    assert result == [{"result": SQL.decode(), "status": "OK"}]
+    assert compression.stats.compressed_requests == 1
+    assert compression.stats.compressed_responses == 1
+    assert compression.stats.response_bytes == len(payload)
+    assert compression.stats.response_wire_bytes == len(compressed)
+    assert compression.stats.request_ratio < 1
+
+
+def test_small_body_is_not_compressed():
+    compression = Compression(threshold=len(SQL) + 1)
+
+    body, headers = compression.encode(SQL, {})
+
+    assert body == SQL
+    assert "Content-Encoding" not in headers
+    assert "gzip" in headers["Accept-Encoding"]
+    assert compression.stats.request_ratio == 1
+
+
+def test_body_is_sent_as_is_when_compression_does_not_shrink_it():
+    compression = Compression(threshold=10)
+    noise = os.urandom(4096)
+
+    body, headers = compression.encode(noise, {})
+
+    assert body == noise
+    assert "Content-Encoding" not in headers
+    assert compression.stats.compressed_requests == 0
+    assert compression.stats.request_wire_bytes == len(noise)
+
+
+def test_uncompressed_response_is_read_as_is():
+    compression = Compression()
+    payload = json.dumps([{"result": [], "status": "OK"}]).encode()
+
+    result = asyncio.run(compression.read_json(FakeResponse(payload)))  # type: ignore[arg-type]
+
+    assert result == [{"result": [], "status": "OK"}]
+    assert compression.stats.compressed_responses == 0
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from conftest import FakeDB
+from models import Counter
+
+from surreal import UNLOADED
+
+
+def test_write_plan_is_compiled_per_class():
+    assert [attr for attr, _, _ in Counter.__write_plan__] == [
+        "message_id",
+        "count",
+        "tags",
+    ]
+    assert Counter.__write_plan__ is Counter.__write_plan__
+
+
+def test_insert(db: FakeDB):
+    db.respond(lambda sql: [{"result": [{"id": "counter:x"}], "status": "OK"}])
+
+    counter = Counter()
+    counter.message_id.set_value(1)
+    counter.tags.set_value(["a", "b"])
+    asyncio.run(counter.insert())
+
+    assert db.sent == [
+        "CREATE counter SET message_id = 1,count = None,tags = ['a','b'];"
+    ]
+    assert counter.table_name == "counter:x"
+
+
+def test_update_skips_unloaded_columns(db: FakeDB):
+    db.respond(lambda sql: [{"result": [{"id": "counter:a"}], "status": "OK"}])
+
+    counter = Counter(id="a")
+    counter.count.set_value(3)
+    counter.message_id.set_value(UNLOADED)
+    counter.tags.set_value(UNLOADED)
+    asyncio.run(counter.update())
+
+    assert db.sent == ["UPDATE counter:a SET count = 3;"]
+
+
+def test_insert_many_is_one_transaction(db: FakeDB):
+    db.respond(
+        lambda sql: [
+            {"result": [{"id": "counter:1", "message_id": 1}], "status": "OK"},
+            {"result": [{"id": "counter:2", "message_id": 2}], "status": "OK"},
+        ]
+    )
+
+    objects = [Counter(), Counter()]
+    for i, obj in enumerate(objects, 1):
+        obj.message_id.set_value(i)
+    asyncio.run(Counter.insert_many(objects))
+
+    assert db.sent[0] == (
+        "BEGIN TRANSACTION;"
+        "CREATE counter SET message_id = 1,count = None,tags = [];"
+        "CREATE counter SET message_id = 2,count = None,tags = [];"
+        "COMMIT TRANSACTION;"
+    )
+    assert [obj.table_name for obj in objects] == ["counter:1", "counter:2"]
+
+
+def test_insert_many_raises_when_transaction_fails(db: FakeDB):
+    db.respond(
+        lambda sql: [
+            {"result": "not executed due to a failed transaction", "status": "ERR"},
+            {"result": "unique index violated", "status": "ERR"},
+        ]
+    )
+
+    with pytest.raises(Exception, match="unique index violated"):
+        asyncio.run(Counter.insert_many([Counter(), Counter()]))
+
+
+def test_update_and_delete_require_id(db: FakeDB):
+    with pytest.raises(Exception, match="id"):
+        asyncio.run(Counter().update())
+    with pytest.raises(Exception, match="id"):
+        asyncio.run(Counter().delete())
+
+    assert db.sent == []
+
+
+def test_update_missing_record_sets_is_none(db: FakeDB):
+    db.respond(lambda sql: [{"result": [], "status": "OK"}])
+
+    counter = Counter(id="missing")
+    counter.count.set_value(1)
+    asyncio.run(counter.update())
+
+    assert counter.is_none
+
+
+def test_insert_empty_result_sets_is_none(db: FakeDB):
+    db.respond(lambda sql: [{"result": [], "status": "OK"}])
+
+    counter = asyncio.run(Counter().insert())
+
+    assert counter.is_none
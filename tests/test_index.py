@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from typing import ClassVar
+
+from models import Counter
+
+from surreal import BaseTable, Column, Index
+from surreal._types import Int, String
+
+
+class Vote(BaseTable):
+    __indexes__: ClassVar[list[Index]] = [
+        Index("guild_id", "message_id", unique=True),
+        Index("guild_id", name="by_guild"),
+    ]
+
+    guild_id: Column[str] = Column(name="guild_id", type=String(), unique=True)
+    message_id: Column[int] = Column(name="message_id", type=Int(), index=True)
+
+
+def test_column_and_composite_indexes_are_defined():
+    assert Vote.get_ddl() == (
+        "DEFINE FIELD guild_id ON TABLE vote TYPE string ;"
+        "DEFINE FIELD message_id ON TABLE vote TYPE int ;"
+        "DEFINE INDEX vote_guild_id_unique ON TABLE vote FIELDS guild_id UNIQUE;"
+        "DEFINE INDEX vote_message_id_idx ON TABLE vote FIELDS message_id;"
+        "DEFINE INDEX vote_guild_id_message_id_unique ON TABLE vote"
+        " FIELDS guild_id, message_id UNIQUE;"
+        "DEFINE INDEX by_guild ON TABLE vote FIELDS guild_id;"
+    )
+
+
+def test_index_accepts_columns():
+    assert Index(Counter().message_id, Counter().count).columns == [
+        "message_id",
+        "count",
+    ]
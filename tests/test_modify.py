@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from conftest import FakeDB
+from models import Counter, Event
+
+ROW = {"id": "counter:a", "message_id": 1, "count": 7, "tags": ["x"]}
+
+
+def test_upsert_sets_only_assigned_columns(db: FakeDB):
+    db.respond(lambda sql: [{"result": [ROW], "status": "OK"}])
+
+    counter = Counter()
+    counter.message_id.set_value(1)
+    asyncio.run(counter.upsert("message_id = 1"))
+
+    assert db.sent == [
+        "UPSERT counter SET message_id = 1 WHERE message_id = 1  RETURN AFTER;"
+    ]
+    assert counter.count.value == 7
+    assert counter.tags.value == ["x"]
+
+
+def test_upsert_by_id(db: FakeDB):
+    db.respond(lambda sql: [{"result": [ROW], "status": "OK"}])
+
+    counter = Counter(id="a")
+    counter.count.set_value(2)
+    counter.tags.set_value([])
+    asyncio.run(counter.upsert(returns="none"))
+
+    assert db.sent == ["UPSERT counter:a SET count = 2,tags = [] RETURN NONE;"]
+
+
+def test_upsert_requires_target_and_values(db: FakeDB):
+    with pytest.raises(Exception, match="idかwhere"):
+        asyncio.run(Counter().upsert())
+    with pytest.raises(Exception, match="カラムの値"):
+        asyncio.run(Counter(id="a").upsert())
+
+    assert db.sent == []
+
+
+def test_update_where_is_one_statement(db: FakeDB):
+    asyncio.run(Counter.update_where("count > 100", count=0))
+
+    assert db.sent == ["UPDATE counter SET count = 0 WHERE count > 100  RETURN NONE;"]
+
+
+def test_update_where_in_batches(db: FakeDB):
+    def respond(sql: str) -> list[dict]:
+        if sql.startswith("SELECT"):
+            ids = (
+                ["counter:3"] if "id > counter:2" in sql else ["counter:1", "counter:2"]
+            )
+            return [{"result": ids, "status": "OK"}]
+        return [{"result": [{**ROW, "id": "counter:1", "count": 0}], "status": "OK"}]
+
+    db.respond(respond)
+    updated = asyncio.run(
+        Counter.update_where("count > 100", count=0, batch_size=2, returns="after")
+    )
+
+    assert db.sent == [
+        "SELECT VALUE id FROM counter WHERE count > 100  ORDER BY id ASC  LIMIT 2 ;",
+        "UPDATE [counter:1, counter:2] SET count = 0 WHERE count > 100  RETURN AFTER;",
+        (
+            "SELECT VALUE id FROM counter WHERE (count > 100) AND id > counter:2 "
+            " ORDER BY id ASC  LIMIT 2 ;"
+        ),
+        "UPDATE [counter:3] SET count = 0 WHERE count > 100  RETURN AFTER;",
+    ]
+    assert [obj.count.value for obj in updated] == [0, 0]
+
+
+def test_update_where_rejects_unknown_column(db: FakeDB):
+    with pytest.raises(Exception, match="missing"):
+        asyncio.run(Counter.update_where("true", missing=1))
+    with pytest.raises(Exception, match="更新するカラム"):
+        asyncio.run(Counter.update_where("true", ns="test"))
+
+    assert db.sent == []
+
+
+def test_append_datetime_uses_datetime_literal(db: FakeDB):
+    event = Event(id="a")
+    asyncio.run(event.append(event.times, datetime(2024, 1, 2, 3, 4, 5)))
+    asyncio.run(event.remove(event.times, datetime(2024, 1, 2, 3, 4, 5)))
+
+    literal = "return type::datetime('2024-01-02T03:04:05Z')"
+    assert db.sent == [
+        f"UPDATE event:a SET times += {literal} RETURN AFTER;",
+        f"UPDATE event:a SET times -= {literal} RETURN AFTER;",
+    ]
+
+
+def test_append_plain_value(db: FakeDB):
+    counter = Counter(id="a")
+    asyncio.run(counter.append(counter.tags, "x"))
+
+    assert db.sent == ["UPDATE counter:a SET tags += ['x'] RETURN AFTER;"]
@@ -0,0 +1,146 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+from models import Counter
+
+from surreal import BaseTable, Router, is_read_query
+
+
+@pytest.mark.parametrize(
+    ("sql", "read"),
+    [
+        ("SELECT * FROM counter;", True),
+        ("INFO FOR DB;", True),
+        ("BEGIN TRANSACTION;SELECT * FROM counter;COMMIT TRANSACTION;", True),
+        ("UPDATE counter SET count += 1;", False),
+        ("LET $x = (DELETE counter); RETURN $x;", False),
+        ("RETURN 1;", False),
+        ("SELECT * FROM (DELETE counter RETURN BEFORE);", False),
+        ("SELECT fn::reset() FROM counter;", False),
+        ("", False),
+    ],
+)
+def test_is_read_query(sql: str, read: bool):
+    assert is_read_query(sql) is read
+
+
+class StandIn:
+    """/sqlと/healthだけを持つSurrealDBの代わりのサーバー"""
+
+    def __init__(self, name: str, delay: float = 0.0):
+        self.name = name
+        self.delay = delay
+        self.received: list[str] = []
+        app = web.Application()
+        app.router.add_post("/sql", self.sql)
+        app.router.add_get("/health", self.health)
+        self.server = TestServer(app)
+
+    @property
+    def url(self) -> str:
+        return str(self.server.make_url("")).rstrip("/")
+
+    async def sql(self, request: web.Request) -> web.Response:
+        self.received.append(await request.text())
+        await asyncio.sleep(self.delay)
+        return web.json_response(
+            [{"result": [{"id": "counter:a", "node": self.name}], "status": "OK"}]
+        )
+
+    async def health(self, request: web.Request) -> web.Response:
+        return web.Response(text="")
+
+
+@asynccontextmanager
+async def cluster(*servers: StandIn) -> AsyncIterator[None]:
+    for server in servers:
+        await server.server.start_server()
+    try:
+        yield
+    finally:
+        for server in servers:
+            await server.server.close()
+        if BaseTable.router is not None:
+            await BaseTable.router.close()
+
+
+@pytest.fixture(autouse=True)
+def _no_auth(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(BaseTable, "token_auth", None)
+    monkeypatch.setattr(BaseTable, "query_cache", None)
+    monkeypatch.setattr(BaseTable, "router", None)
+
+
+def test_reads_are_balanced_and_writes_pinned():
+    primary, replica = StandIn("primary"), StandIn("replica")
+
+    async def main() -> None:
+        async with cluster(primary, replica):
+            BaseTable.router = Router(
+                [primary.url, replica.url], write_host=primary.url
+            )
+            counter = Counter(id="a")
+            await asyncio.gather(
+                *(counter.executes("SELECT * FROM counter;") for _ in range(6))
+            )
+            await counter.executes("LET $x = (DELETE counter); RETURN $x;")
+            await counter.executes("UPDATE counter SET count += 1;")
+
+    asyncio.run(main())
+
+    assert primary.received and replica.received
+    writes = ["LET $x = (DELETE counter); RETURN $x;", "UPDATE counter SET count += 1;"]
+    assert [sql for sql in primary.received if sql in writes] == writes
+    assert not any(sql in writes for sql in replica.received)
+
+
+def test_failed_read_is_retried_on_another_node():
+    slow, fast = StandIn("slow", delay=1.0), StandIn("fast")
+
+    async def main() -> list:
+        async with cluster(slow, fast):
+            BaseTable.router = Router([slow.url, fast.url], timeout=0.2)
+            # slowのノードが必ず先に選ばれるようにする
+            BaseTable.router.endpoints[1].outstanding = 10
+            return await Counter(id="a").execute_batch("SELECT * FROM counter;")
+
+    responses = asyncio.run(main())
+
+    assert len(slow.received) == 1
+    assert len(fast.received) == 1
+    assert responses[0]["result"][0]["node"] == "fast"
+
+
+def test_failed_write_is_not_retried():
+    first, second = StandIn("first", delay=1.0), StandIn("second", delay=1.0)
+
+    async def main() -> None:
+        async with cluster(first, second):
+            BaseTable.router = Router([first.url, second.url], timeout=0.2)
+            await Counter(id="a").executes("LET $x = (DELETE counter); RETURN $x;")
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(main())
+
+    assert len(first.received) + len(second.received) == 1
+
+
+def test_instance_host_outside_router_is_respected():
+    node, other = StandIn("node"), StandIn("other")
+
+    async def main() -> None:
+        async with cluster(node, other):
+            BaseTable.router = Router([node.url])
+            await Counter(id="a", host=other.url).executes("SELECT * FROM counter;")
+            await Counter(id="a").executes("SELECT * FROM counter;")
+
+    asyncio.run(main())
+
+    assert other.received == ["SELECT * FROM counter;"]
+    assert node.received == ["SELECT * FROM counter;"]
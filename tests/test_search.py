@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import asyncio
+
+from conftest import FakeDB
+
+from surreal import UNLOADED, Analyzer, BaseTable, Column
+from surreal._types import String
+from surreal.query import Query
+
+
+class Post(BaseTable):
+    title: Column[str] = Column(
+        name="title", type=String(), search=Analyzer(name="simple")
+    )
+    body: Column[str] = Column(name="body", type=String())
+
+
+def test_define_analyzer():
+    q = Query()
+    q.define_analyzer(Analyzer(name="simple"))
+    q.define_analyzer(Analyzer(name="plain", tokenizers=[], filters=["lowercase"]))
+
+    assert q.to_string() == (
+        "DEFINE ANALYZER simple TOKENIZERS blank,class FILTERS lowercase,ascii;"
+        "DEFINE ANALYZER plain FILTERS lowercase;"
+    )
+
+
+def test_search_column_defines_analyzer_and_index():
+    assert Post.get_ddl().endswith(
+        "DEFINE ANALYZER simple TOKENIZERS blank,class FILTERS lowercase,ascii;"
+        "DEFINE INDEX post_title_search ON TABLE post FIELDS title"
+        " SEARCH ANALYZER simple BM25 HIGHLIGHTS;"
+    )
+
+
+def test_matches_quotes_text():
+    assert (
+        Query().matches(Post().title, 'say "日本"', 2) == 'title @2@ "say \\"日本\\""'
+    )
+
+
+def test_search_sql_orders_by_score(db: FakeDB):
+    row = {"id": "post:a", "title": "rules", "score": 1.5, "highlight": "<b>rules</b>"}
+    db.respond(lambda sql: [{"result": [row], "status": "OK"}])
+
+    [(post, score, highlight)] = asyncio.run(
+        Post.search("title", "rules", 5, columns=["title"], where="body != NONE")
+    )
+
+    assert db.sent == [
+        (
+            'SELECT id, title, search::score(1) AS score, search::highlight("<b>",'
+            ' "</b>", 1) AS highlight FROM post WHERE title @1@ "rules" AND'
+            " (body != NONE)  ORDER BY score DESC  LIMIT 5 ;"
+        )
+    ]
+    assert (post.id, score, highlight) == ("post:a", 1.5, "<b>rules</b>")
+    assert post.body.value is UNLOADED
+
+
+def test_search_without_highlight(db: FakeDB):
+    asyncio.run(Post.search(Post().title, "rules", highlight=None))
+
+    assert db.sent == [
+        (
+            "SELECT *, search::score(1) AS score FROM post"
+            ' WHERE title @1@ "rules"  ORDER BY score DESC  LIMIT 10 ;'
+        )
+    ]
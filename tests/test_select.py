@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from conftest import FakeDB
+from models import Guild, Owner, Panel
+
+from surreal import UNLOADED
+
+GUILD = {"id": "guild:g", "name": "guild"}
+OWNER = {"id": "owner:o", "name": "owner", "guild": "guild:g"}
+
+
+def test_only_and_include_use_fetch():
+    q = Panel.select("count > 1").only("title").include("owner.guild").to_query()
+
+    # FETCHするownerもSELECTに含める
+    assert q.to_string() == (
+        "SELECT id, title, owner FROM panel WHERE count > 1  FETCH owner, owner.guild ;"
+    )
+
+
+def test_include_with_fetch_hydrates_models(db: FakeDB):
+    row = {"id": "panel:p", "title": "t", "owner": {**OWNER, "guild": GUILD}}
+    db.respond(lambda sql: [{"result": [row], "status": "OK"}])
+
+    [panel] = asyncio.run(Panel.select().include("owner.guild").all())
+
+    owner = panel.owner.value
+    assert isinstance(owner, Owner)
+    assert isinstance(owner.guild.value, Guild)
+    assert owner.guild.value.name.value == "guild"
+    assert len(db.sent) == 1
+
+
+def test_include_with_batch_selects_each_level_once(db: FakeDB):
+    panels = [
+        {"id": "panel:1", "title": "a", "owner": "owner:o"},
+        {"id": "panel:2", "title": "b", "owner": "owner:o"},
+    ]
+
+    def respond(sql: str) -> list[dict]:
+        if "FROM panel" in sql:
+            return [{"result": panels, "status": "OK"}]
+        if "owner:o" in sql:
+            return [{"result": [OWNER], "status": "OK"}]
+        return [{"result": [GUILD], "status": "OK"}]
+
+    db.respond(respond)
+    first, second = asyncio.run(Panel.select().include("owner.guild", batch=True).all())
+
+    assert db.sent == [
+        "SELECT * FROM panel;",
+        "SELECT * FROM [owner:o];",
+        "SELECT * FROM [guild:g];",
+    ]
+    assert first.owner.value is second.owner.value
+    assert first.owner.value.guild.value.name.value == "guild"
+
+
+def test_only_marks_other_columns_unloaded_and_load_columns_fetches_them(
+    db: FakeDB,
+):
+    def respond(sql: str) -> list[dict]:
+        if sql.startswith("SELECT id, title"):
+            return [{"result": [{"id": "panel:p", "title": "t"}], "status": "OK"}]
+        return [{"result": [{"owner": "owner:o", "count": 3}], "status": "OK"}]
+
+    db.respond(respond)
+
+    async def main() -> Panel:
+        [panel] = await Panel.select().only("title").all()
+        assert panel.owner.value is UNLOADED
+        assert panel.count.value is UNLOADED
+        assert not panel.count.is_loaded
+        return await panel.load_columns()
+
+    panel = asyncio.run(main())
+
+    assert db.sent == [
+        "SELECT id, title FROM panel;",
+        "SELECT id, owner, count FROM panel:p;",
+    ]
+    assert panel.owner.value == "owner:o"
+    assert panel.count.value == 3
+
+
+def test_update_after_only_skips_unloaded_columns(db: FakeDB):
+    db.respond(
+        lambda sql: [{"result": [{"id": "panel:p", "title": "t"}], "status": "OK"}]
+    )
+
+    async def main() -> None:
+        [panel] = await Panel.select().only("title").all()
+        panel.title.set_value("new")
+        await panel.update()
+
+    asyncio.run(main())
+
+    assert db.sent[-1] == "UPDATE panel:p SET title = 'new';"
+
+
+def test_values_selects_one_column(db: FakeDB):
+    db.respond(lambda sql: [{"result": ["a", "b"], "status": "OK"}])
+
+    titles = asyncio.run(Panel.select("count > 1").values("title"))
+
+    assert titles == ["a", "b"]
+    assert db.sent == ["SELECT VALUE title FROM panel WHERE count > 1 ;"]
+
+
+def test_unloaded_column_cannot_be_read(db: FakeDB):
+    db.respond(
+        lambda sql: [{"result": [{"id": "panel:p", "title": "t"}], "status": "OK"}]
+    )
+
+    [panel] = asyncio.run(Panel.select().only(Panel().title).all())
+
+    with pytest.raises(Exception, match="load_columns"):
+        panel.count.get_value()
+
+
+def test_unknown_column_is_rejected():
+    with pytest.raises(Exception, match="missing"):
+        Panel.select().only("missing")
@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from conftest import FakeDB
+from models import Counter
+
+from surreal import Session
+
+ROW = {"id": "counter:a", "message_id": 1, "count": 2, "tags": ["x"]}
+
+
+def respond(sql: str) -> list[dict]:
+    if sql.startswith("SELECT"):
+        return [{"result": [ROW], "status": "OK"}]
+    return [
+        {
+            "result": [{"id": "counter:new", "message_id": 5, "count": 0}],
+            "status": "OK",
+        },
+        {"result": [{**ROW, "count": 3}], "status": "OK"},
+        {"result": [], "status": "OK"},
+    ]
+
+
+def test_flush_sends_one_transaction(db: FakeDB):
+    db.respond(respond)
+
+    async def main() -> Counter:
+        async with Session() as session:
+            counter = await session.get(Counter, "a")
+            assert counter is not None
+            counter.count.set_value(3)
+
+            new = Counter()
+            new.message_id.set_value(5)
+            session.add(new)
+
+            session.delete(Counter(id="b"))
+        return new
+
+    new = asyncio.run(main())
+
+    assert db.sent[-1] == (
+        "BEGIN TRANSACTION;"
+        "CREATE counter SET message_id = 5,count = None,tags = [];"
+        "UPDATE counter:a SET count = 3;"
+        "DELETE FROM counter:b ;"
+        "COMMIT TRANSACTION;"
+    )
+    assert new.table_name == "counter:new"
+
+
+def test_identity_map_returns_same_instance(db: FakeDB):
+    db.respond(respond)
+
+    async def main() -> None:
+        session = Session()
+        first = await session.get(Counter, "a")
+        second = await session.get(Counter, "a")
+        assert first is second
+
+    asyncio.run(main())
+    assert len(db.sent) == 1
+
+
+def test_flush_without_changes_sends_nothing(db: FakeDB):
+    db.respond(respond)
+
+    async def main() -> None:
+        async with Session() as session:
+            await session.get(Counter, "a")
+
+    asyncio.run(main())
+    assert [sql for sql in db.sent if not sql.startswith("SELECT")] == []
+
+
+def test_flush_raises_on_error(db: FakeDB):
+    db.respond(lambda sql: [{"result": "conflict", "status": "ERR"}])
+
+    async def main() -> None:
+        session = Session()
+        session.add(Counter())
+        await session.flush()
+
+    with pytest.raises(Exception, match="conflict"):
+        asyncio.run(main())
+
+
+def test_delete_requires_id():
+    session = Session()
+
+    with pytest.raises(Exception, match="id"):
+        session.delete(Counter())
+
+    new = session.add(Counter())
+    session.delete(new)
+    assert session._new == []
+
+
+def test_committed_batches_are_not_resent(db: FakeDB):
+    def respond(sql: str) -> list[dict]:
+        # 2つ目の接続先の最初のflushだけ失敗させる
+        if "message_id = 2" in sql and len(db.sent) == 2:
+            return [{"result": "conflict", "status": "ERR"}]
+        return [{"result": [{"id": "counter:new"}], "status": "OK"}]
+
+    db.respond(respond)
+    session = Session()
+    first, second = Counter(), Counter(ns="other")
+    first.message_id.set_value(1)
+    second.message_id.set_value(2)
+    session.add(first)
+    session.add(second)
+
+    with pytest.raises(Exception, match="conflict"):
+        asyncio.run(session.flush())
+    asyncio.run(session.flush())
+
+    assert [sql.count("CREATE") for sql in db.sent] == [1, 1, 1]
+    assert "message_id = 2" in db.sent[2]
+    assert session._new == []
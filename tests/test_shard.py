@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+import asyncio
+from collections.abc import Callable
+from typing import Any
+
+import pytest
+from models import Member
+
+from surreal import BaseTable, Shard, ShardRouter
+
+Sent = list[tuple[str, str]]
+
+
+@pytest.fixture
+def shards(monkeypatch: pytest.MonkeyPatch) -> Callable[..., Sent]:
+    """送信先のdbとsqlを記録し、dbごとのhandlerの結果を返す"""
+
+    def install(handler: Callable[[str, str], Any] | None = None) -> Sent:
+        sent: Sent = []
+
+        async def send_raw(self: BaseTable, sql: str) -> Any:
+            sent.append((self.db, sql))
+            if handler is not None:
+                return handler(self.db, sql)
+            return [{"result": [], "status": "OK"}]
+
+        monkeypatch.setattr(BaseTable, "_BaseTable__send_raw", send_raw)
+        monkeypatch.setattr(BaseTable, "query_cache", None)
+        return sent
+
+    return install
+
+
+def router(**kwargs: Any) -> ShardRouter:
+    return ShardRouter([Shard("a", db="a"), Shard("b", db="b")], **kwargs)
+
+
+def test_ring_is_stable_and_mapping_wins():
+    first, second = router(), router()
+    keys = [str(i) for i in range(200)]
+
+    assert [first.shard_for(k) for k in keys] == [second.shard_for(k) for k in keys]
+    assert {first.shard_for(k).name for k in keys} == {"a", "b"}
+
+    pinned = router(mapping={"7": "b", 8: "a"})
+    assert pinned.shard_for(7).name == "b"
+    assert pinned.shard_for("8").name == "a"
+    assert pinned.options_for(7) == {"ns": "same", "db": "b"}
+
+
+def test_adding_a_shard_moves_only_some_keys():
+    before = router()
+    after = ShardRouter([Shard("a", db="a"), Shard("b", db="b"), Shard("c", db="c")])
+    keys = [str(i) for i in range(300)]
+
+    moved = [k for k in keys if before.shard_for(k) != after.shard_for(k)]
+
+    assert 0 < len(moved) < len(keys) / 2
+    assert all(after.shard_for(k).name == "c" for k in moved)
+
+
+def test_unknown_mapping_shard_is_rejected():
+    with pytest.raises(Exception, match="z"):
+        router(mapping={"1": "z"})
+
+
+def test_fan_out_runs_on_every_shard():
+    async def name(shard: Shard) -> str:
+        return shard.name
+
+    assert asyncio.run(router().fan_out(name, concurrency=1)) == ["a", "b"]
+
+
+def test_select_merges_sorts_and_limits(shards: Callable[..., Sent]):
+    rows = {
+        "a": [{"id": "member:1", "count": 5}, {"id": "member:2", "count": 1}],
+        "b": [{"id": "member:3", "count": 9}, {"id": "member:4", "count": None}],
+    }
+    sent = shards(lambda db, sql: [{"result": rows[db], "status": "OK"}])
+
+    objects = asyncio.run(router().select(Member, order_by="count", desc=True, limit=3))
+
+    assert [obj.id for obj in objects] == ["member:3", "member:1", "member:2"]
+    assert sent == [
+        ("a", "SELECT * FROM member ORDER BY count DESC  LIMIT 3 ;"),
+        ("b", "SELECT * FROM member ORDER BY count DESC  LIMIT 3 ;"),
+    ]
+
+
+def test_route_and_rebalance_use_the_same_key(shards: Callable[..., Sent]):
+    source = router(mapping={"g1": "a", "g2": "a"})
+    target = router(mapping={"g1": "a", "g2": "b"})
+
+    def respond(db: str, sql: str) -> list[dict]:
+        if db == "a" and sql.startswith("SELECT"):
+            result = [
+                {"id": "member:1", "guild_id": "g1", "count": 1},
+                {"id": "member:2", "guild_id": "g2", "count": 2},
+            ]
+            return [{"result": result, "status": "OK"}]
+        return [{"result": [], "status": "OK"}]
+
+    sent = shards(respond)
+    moved = asyncio.run(source.rebalance(Member, target))
+
+    assert moved == 1
+    # 移動先に書き込んでから元のシャードから削除する
+    assert sent[1][0] == "b"
+    assert sent[1][1] == 'UPSERT member:2 CONTENT {"guild_id": "g2", "count": 2};'
+    assert sent[2] == ("a", "DELETE [member:2]  RETURN NONE;")
+
+    member = Member(id="2")
+    member.guild.set_value("g2")
+    BaseTable.shard_router = target
+    try:
+        assert member.route().db == target.shard_for("g2").db == "b"
+    finally:
+        BaseTable.shard_router = None
+
+
+def test_rebalance_requires_a_shard_key_column():
+    class Broken(Member):
+        __shard_key__ = "guild_id"
+
+    with pytest.raises(Exception, match="guild_id"):
+        asyncio.run(router().rebalance(Broken))
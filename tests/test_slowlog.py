@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Any
+
+from surreal import SlowQueryLog
+
+SQL = "SELECT * FROM user WHERE email = 'someone@example.com';"
+RESPONSE = [{"result": [{"id": "user:1"}], "status": "OK", "time": "2ms"}]
+
+
+async def send(sql: str) -> Any:
+    return [{"result": {"plan": sql}, "status": "OK"}]
+
+
+def test_raw_sql_is_not_kept_by_default():
+    log = SlowQueryLog(threshold=0.0, explain_rate=0.0)
+
+    record = log.observe(SQL, RESPONSE, 1.0, host="h", ns="n", db="d", send=send)
+
+    assert record is not None
+    assert record.sql is None
+    assert record.fingerprint == "SELECT * FROM user WHERE email = ?;"
+    assert "sql" not in record.to_dict()
+    assert "example.com" not in repr(record.to_dict())
+
+
+def test_raw_sql_is_opt_in():
+    log = SlowQueryLog(threshold=0.0, explain_rate=0.0, include_sql=True)
+
+    record = log.observe(SQL, RESPONSE, 1.0, host="h", ns="n", db="d", send=send)
+
+    assert record is not None
+    assert record.to_dict()["sql"] == SQL
+
+
+def test_explain_uses_raw_sql_without_storing_it():
+    log = SlowQueryLog(threshold=0.0)
+
+    async def main() -> Any:
+        record = log.observe(SQL, RESPONSE, 1.0, host="h", ns="n", db="d", send=send)
+        await log.wait()
+        return record
+
+    record = asyncio.run(main())
+
+    assert record.explain == {"plan": SQL.rstrip(";") + " EXPLAIN;"}
+    assert record.sql is None
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+import json
+from pathlib import Path
+
+import pytest
+from conftest import FakeDB
+from models import Event
+
+from surreal import dump, load
+from surreal.transfer import _Checkpoint
+
+ROWS = [
+    {
+        "id": f"event:{i}",
+        "at": "2024-01-01T00:00:00Z",
+        "times": ["2024-01-02T00:00:00Z"],
+        "owner": "counter:a",
+    }
+    for i in range(1, 4)
+]
+
+
+def inserts(db: FakeDB) -> list[str]:
+    return [sql for sql in db.sent if sql.startswith("INSERT")]
+
+
+def write_rows(path: Path) -> list[int]:
+    """1行ずつ書き込み、各行の開始位置を返す"""
+
+    offsets = []
+    with path.open("wb") as f:
+        for row in ROWS:
+            offsets.append(f.tell())
+            f.write(json.dumps(row).encode() + b"\n")
+    return offsets
+
+
+@pytest.mark.parametrize("name", ["events.ndjson", "events.ndjson.gz"])
+def test_dump_and_load_round_trip(db: FakeDB, tmp_path: Path, name: str):
+    def respond(sql: str) -> list[dict]:
+        if sql.startswith("SELECT"):
+            rows = ROWS[:2] if "id >" not in sql else ROWS[2:]
+            return [{"result": rows, "status": "OK"}]
+        return [{"result": [], "status": "OK"}]
+
+    db.respond(respond)
+    path = tmp_path / name
+
+    assert asyncio.run(dump(Event, path, batch_size=2)) == 3
+    assert asyncio.run(load(Event, path, chunk_size=10)) == 3
+
+    assert db.sent[:2] == [
+        "SELECT * FROM event ORDER BY id ASC  LIMIT 2 ;",
+        "SELECT * FROM event WHERE (id > event:2)  ORDER BY id ASC  LIMIT 2 ;",
+    ]
+    [insert] = inserts(db)
+    assert insert.startswith("INSERT INTO event [")
+    # Array(Datetime())とRecordも文字列ではなくその型として読み込む
+    assert (
+        '{"id": event:1, "at": <datetime>"2024-01-01T00:00:00Z", '
+        '"times": [<datetime>"2024-01-02T00:00:00Z"], "owner": counter:a}'
+    ) in insert
+
+
+def test_load_resumes_from_checkpoint(db: FakeDB, tmp_path: Path):
+    path = tmp_path / "events.ndjson"
+    offsets = write_rows(path)
+    checkpoint = tmp_path / "events.checkpoint"
+    # 1行目は完了、3行目は先に完了していて、2行目だけが残っている
+    checkpoint.write_text(
+        json.dumps(
+            {
+                "source": str(path),
+                "chunk_size": 1,
+                "offset": offsets[1],
+                "rows": 1,
+                "done": {str(offsets[2]): [path.stat().st_size, 1]},
+            }
+        )
+    )
+
+    assert asyncio.run(load(Event, path, chunk_size=1, checkpoint=checkpoint)) == 3
+
+    [insert] = inserts(db)
+    assert '"id": event:2' in insert
+    saved = json.loads(checkpoint.read_text())
+    assert saved["offset"] == path.stat().st_size
+    assert saved["done"] == {}
+
+
+def test_checkpoint_for_another_file_is_ignored(db: FakeDB, tmp_path: Path):
+    path = tmp_path / "events.ndjson"
+    write_rows(path)
+    checkpoint = tmp_path / "events.checkpoint"
+    checkpoint.write_text(
+        json.dumps(
+            {"source": "other", "chunk_size": 1, "offset": 10, "rows": 1, "done": {}}
+        )
+    )
+
+    assert asyncio.run(load(Event, path, chunk_size=1, checkpoint=checkpoint)) == 3
+    assert len(inserts(db)) == 3
+
+
+def test_out_of_order_chunks_advance_only_contiguous_offset(tmp_path: Path):
+    progress = _Checkpoint(tmp_path / "cp", tmp_path / "src", 10)
+
+    progress.complete(20, 30, 10)
+    progress.complete(10, 20, 10)
+    assert (progress.offset, progress.rows) == (0, 0)
+
+    progress.complete(0, 10, 10)
+    assert (progress.offset, progress.rows, progress.done) == (30, 30, {})
+
+
+def test_failed_chunk_is_not_checkpointed(db: FakeDB, tmp_path: Path):
+    path = tmp_path / "events.ndjson"
+    offsets = write_rows(path)
+    checkpoint = tmp_path / "events.checkpoint"
+
+    def respond(sql: str) -> list[dict]:
+        if "event:2" in sql:
+            return [{"result": "conflict", "status": "ERR"}]
+        return [{"result": [], "status": "OK"}]
+
+    db.respond(respond)
+    with pytest.raises(Exception, match="conflict"):
+        asyncio.run(
+            load(Event, path, chunk_size=1, concurrency=1, checkpoint=checkpoint)
+        )
+
+    saved = json.loads(checkpoint.read_text())
+    assert saved["offset"] == offsets[1]
+    assert saved["rows"] == 1
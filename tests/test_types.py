@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import copy
+import pickle
+
+import pytest
+
+from surreal import BaseTable, Column
+from surreal._types import Array, Datetime, DBType, Float, Int, Record, String
+
+
+class Mixed(BaseTable):
+    value: Column[int | str | None] = Column(
+        name="value", type=Int(_or=[String()], is_none=True)
+    )
+    times: Column[list[str]] = Column(name="times", type=Array(Datetime()))
+
+
+TYPES: list[DBType] = [
+    Int(),
+    Float(is_none=True),
+    Int(_or=[String(), Float()]),
+    Array(Array(Int())),
+    Datetime("%Y-%m-%d"),
+    Record("counter"),
+]
+
+
+@pytest.mark.parametrize("value", TYPES, ids=str)
+def test_equal_types_hash_the_same_and_survive_pickle(value: DBType):
+    restored = pickle.loads(pickle.dumps(value))
+
+    assert restored == value
+    assert hash(restored) == hash(value)
+    assert restored.type_string == value.type_string
+    assert copy.deepcopy(value) is value
+
+
+def test_types_differ_by_options():
+    assert Int() != Int(is_none=True)
+    assert Int() != Float()
+    assert Datetime("%Y") != Datetime("%m")
+    assert Array(Int()) != Array(String())
+    assert len({Int(), Int(), Int(_or=[String()])}) == 2
+
+
+def test_types_are_immutable():
+    value = Int()
+
+    with pytest.raises(AttributeError):
+        value.sub_type = String()  # type: ignore[misc]
+
+
+def test_or_types_are_rendered():
+    value = Int(_or=[String()], is_none=True)
+
+    assert str(value) == "option<Int | String>"
+    assert value.type_string == "option<int | string>"
+    assert Array(Int(_or=[Float()])).type_string == "array<int | float>"
+
+
+def test_get_ddl_is_memoized():
+    ddl = Mixed.get_ddl()
+
+    assert ddl == (
+        "DEFINE FIELD value ON TABLE mixed TYPE option<int | string> ;"
+        "DEFINE FIELD times ON TABLE mixed TYPE array<datetime> ;"
+    )
+    assert Mixed.get_ddl() is ddl
@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import asyncio
+import struct
+from array import array
+
+import pytest
+from conftest import FakeDB
+from models import Document
+
+from surreal import Index
+from surreal.query import Query
+
+
+def test_vector_index_requires_dimension():
+    with pytest.raises(Exception, match="dimension"):
+        Index("embedding", vector="hnsw")
+    with pytest.raises(Exception, match="dimension"):
+        Index("embedding", vector="mtree", dimension=0)
+
+
+def test_vector_index_ddl():
+    assert Document.get_ddl().endswith(
+        "DEFINE INDEX document_embedding_hnsw ON TABLE document FIELDS embedding"
+        " HNSW DIMENSION 3 DIST COSINE EFC 150;"
+    )
+
+
+def test_float32_vector_literal_round_trips():
+    values = array("f", [0.1, -2.5, 1e-8])
+    literal = Query().vector(values)
+
+    assert literal == "[0.1,-2.5,1e-08]"
+    parsed = [float(v) for v in literal.strip("[]").split(",")]
+    assert array("f", parsed) == values
+
+
+def test_float32_bytes_and_float64_lists():
+    buffer = struct.pack("2f", 0.1, 0.2)
+
+    assert Query().vector(buffer) == "[0.1,0.2]"
+    assert Query().vector([0.1, 0.2]) == "[0.1,0.2]"
+    assert Query().vector([1 / 3]) == "[0.3333333333333333]"
+
+
+def test_knn_sql(db: FakeDB):
+    db.respond(
+        lambda sql: [
+            {
+                "result": [
+                    {"id": "document:a", "embedding": [0.1, 0.2, 0.3], "distance": 0.5}
+                ],
+                "status": "OK",
+            }
+        ]
+    )
+
+    results = asyncio.run(
+        Document.knn(array("f", [0.1, 0.2, 0.3]), 5, ef=40, where="lang = 'ja'")
+    )
+
+    assert db.sent[0] == (
+        "SELECT *, vector::distance::knn() AS distance FROM document"
+        " WHERE embedding <|5,40|> [0.1,0.2,0.3] AND (lang = 'ja')"
+        "  ORDER BY distance ASC ;"
+    )
+    [(document, distance)] = results
+    assert document.table_name == "document:a"
+    assert distance == 0.5
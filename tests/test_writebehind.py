@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import asyncio
+
+from conftest import FakeDB
+from models import Counter
+
+from surreal import WriteBehind
+
+
+def test_increments_are_coalesced_into_one_delta(db: FakeDB):
+    async def main() -> int:
+        writes = WriteBehind()
+        counter = Counter(id="a")
+        counter.count.set_value(5)
+
+        for _ in range(3):
+            writes.increment(counter, counter.count)
+        shown = counter.count.value + writes.pending(counter, counter.count)
+
+        await writes.flush()
+        assert writes.pending(counter, counter.count) == 0
+        return shown
+
+    assert asyncio.run(main()) == 8
+    assert db.sent == [
+        "BEGIN TRANSACTION;UPDATE counter:a SET count += 3;COMMIT TRANSACTION;"
+    ]
+
+
+def test_only_one_size_triggered_flush_runs_at_a_time(db: FakeDB):
+    async def main() -> None:
+        writes = WriteBehind(max_pending=1)
+        writes.increment(Counter(id="0"), Counter().count)
+        task = writes._flush_task
+        assert task is not None
+
+        # 実行中のflushがある間は新しいflushを作らない
+        for i in range(1, 10):
+            writes.increment(Counter(id=str(i)), Counter().count)
+            assert writes._flush_task is task
+
+        await writes.close()
+
+    asyncio.run(main())
+
+    assert sum(sql.count("UPDATE") for sql in db.sent) == 10